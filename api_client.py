@@ -1,5 +1,9 @@
-import os, sys, requests
-from typing import List
+import codecs, json, os, re, sys, threading, time, requests
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
 from settings import (
     API_HOST,
     API_PORT,
@@ -9,9 +13,17 @@ from settings import (
     API_HOST_HEADER,
     API_VERIFY,
     API_CA,
+    API_WORKERS,
+    API_RATE_LIMIT,
+    API_STICKY_TTL,
+    API_DEAD_TTL,
+    API_PROBE_TIMEOUT,
+    API_RACE,
+    API_RACE_HEDGE_MS,
     resolve_verify_param,
 )
-
+import local_cache
+from timing import add as add_timing, stage
 
 try:
     from requests_toolbelt.adapters.host_header_ssl import HostHeaderSSLAdapter
@@ -46,30 +58,399 @@ def _build_api_urls(sn: str) -> List[str]:
     return uniq
 
 
-def call_api(sn: str) -> dict:
-    urls = _build_api_urls(sn)
+def _new_session(pool_size: int = 10) -> requests.Session:
     sess = requests.Session()
     sess.trust_env = USE_SYSTEM_PROXY
-    verify_param = resolve_verify_param()
     if API_HOST_HEADER and _HAS_HOSTHEADER_ADAPTER:
-        sess.mount("https://", HostHeaderSSLAdapter())
-    headers = {"Host": API_HOST_HEADER} if API_HOST_HEADER else None
+        sess.mount("https://", HostHeaderSSLAdapter(pool_maxsize=pool_size))
+    else:
+        sess.mount("https://", HTTPAdapter(pool_maxsize=pool_size))
+    sess.mount("http://", HTTPAdapter(pool_maxsize=pool_size))
+    sess.headers["Accept-Encoding"] = "gzip, deflate"
+    return sess
 
-    last_err, tried = None, []
-    for url in urls:
-        tried.append(url)
+
+_SESSION: Optional[requests.Session] = None
+_SESSION_LOCK = threading.Lock()
+
+_ENDPOINT_LOCK = threading.Lock()
+_ENDPOINT = {"preferred": None, "since": 0.0, "probing": False}
+_DEAD: Dict[str, float] = {}
+
+_RACE_POOL: Optional[ThreadPoolExecutor] = None
+
+
+def _get_session() -> requests.Session:
+    global _SESSION
+    if _SESSION is None:
+        with _SESSION_LOCK:
+            if _SESSION is None:
+                _SESSION = _new_session(pool_size=max(10, API_WORKERS))
+    return _SESSION
+
+
+def _url_base(url: str) -> str:
+    u = urlsplit(url)
+    return f"{u.scheme}://{u.netloc}"
+
+
+def _is_conn_error(e: Exception) -> bool:
+    return isinstance(
+        e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+    )
+
+
+def _mark_ok(url: str):
+    base = _url_base(url)
+    with _ENDPOINT_LOCK:
+        if _ENDPOINT["preferred"] != base:
+            _ENDPOINT["preferred"] = base
+            _ENDPOINT["since"] = time.monotonic()
+        _DEAD.pop(base, None)
+
+
+def _mark_dead(url: str):
+    base = _url_base(url)
+    with _ENDPOINT_LOCK:
+        _DEAD[base] = time.monotonic() + API_DEAD_TTL
+        if _ENDPOINT["preferred"] == base:
+            _ENDPOINT["preferred"] = None
+
+
+def _ordered_urls(urls: List[str]) -> List[str]:
+    now = time.monotonic()
+    with _ENDPOINT_LOCK:
+        pref = _ENDPOINT["preferred"]
+        dead = {b for b, until in _DEAD.items() if until > now}
+    alive = [u for u in urls if _url_base(u) not in dead]
+    gone = [u for u in urls if _url_base(u) in dead]
+    if pref:
+        alive.sort(key=lambda u: _url_base(u) != pref)
+    return alive + gone
+
+
+def _maybe_reprobe(urls: List[str], sess, verify_param, headers):
+    now = time.monotonic()
+    with _ENDPOINT_LOCK:
+        pref = _ENDPOINT["preferred"]
+        if (
+            not pref
+            or _ENDPOINT["probing"]
+            or now - _ENDPOINT["since"] < API_STICKY_TTL
+        ):
+            return
+        _ENDPOINT["since"] = now
+        bases = [_url_base(u) for u in urls]
+        if pref not in bases:
+            return
+        better = urls[: bases.index(pref)]
+        if not better:
+            return
+        _ENDPOINT["probing"] = True
+
+    def probe():
         try:
-            resp = sess.get(
-                url, timeout=API_TIMEOUT, verify=verify_param, headers=headers
+            for url in better:
+                try:
+                    resp = sess.get(
+                        url,
+                        timeout=API_PROBE_TIMEOUT,
+                        verify=verify_param,
+                        headers=headers,
+                    )
+                    resp.raise_for_status()
+                    _mark_ok(url)
+                    return
+                except Exception as e:
+                    if _is_conn_error(e):
+                        _mark_dead(url)
+        finally:
+            with _ENDPOINT_LOCK:
+                _ENDPOINT["probing"] = False
+
+    threading.Thread(target=probe, daemon=True).start()
+
+
+class _RateLimiter:
+    def __init__(self, per_second: float):
+        self.interval = 1.0 / per_second if per_second > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            at = max(now, self._next)
+            self._next = at + self.interval
+        if at > now:
+            time.sleep(at - now)
+
+
+def call_api(
+    sn: str,
+    use_cache: bool = True,
+    timings: Optional[Dict] = None,
+    summary_only: bool = False,
+) -> dict:
+    # summary_only：邊下載邊解析，只回傳摘要欄位（api_summary 的格式），不建立完整文件
+    source = "api_summary" if summary_only else "api"
+    with stage(timings, "total"):
+        if use_cache:
+            return local_cache.cached_lookup(
+                source,
+                sn,
+                lambda: _fetch_api(sn, timings=timings, summary_only=summary_only),
             )
-            resp.raise_for_status()
+        return _fetch_api(sn, timings=timings, summary_only=summary_only)
+
+
+def call_api_many(
+    sns: Iterable[str],
+    workers: int = API_WORKERS,
+    rate_limit: float = API_RATE_LIMIT,
+    use_cache: bool = True,
+    summary_only: bool = False,
+) -> Iterator[Tuple[str, Optional[dict], Optional[str]]]:
+
+    workers = max(1, int(workers))
+    sess = _get_session()
+    limiter = _RateLimiter(rate_limit)
+    source = "api_summary" if summary_only else "api"
+
+    def fetch(sn: str) -> dict:
+        limiter.wait()
+        return _fetch_api(sn, sess=sess, summary_only=summary_only)
+
+    def one(sn: str) -> dict:
+        if use_cache:
+            return local_cache.cached_lookup(source, sn, lambda: fetch(sn))
+        return fetch(sn)
+
+    it = iter(sns)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+        try:
+            while True:
+                while len(pending) < workers * 2:
+                    sn = next(it, None)
+                    if sn is None:
+                        break
+                    pending[pool.submit(one, sn)] = sn
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    sn = pending.pop(fut)
+                    try:
+                        yield sn, fut.result(), None
+                    except Exception as e:
+                        yield sn, None, str(e)
+        finally:
+            for fut in pending:
+                fut.cancel()
+
+
+def _race_pool() -> ThreadPoolExecutor:
+    global _RACE_POOL
+    if _RACE_POOL is None:
+        with _SESSION_LOCK:
+            if _RACE_POOL is None:
+                _RACE_POOL = ThreadPoolExecutor(
+                    max_workers=max(4, API_WORKERS * 3),
+                    thread_name_prefix="api-race",
+                )
+    return _RACE_POOL
+
+
+def _payload(resp) -> dict:
+    try:
+        return resp.json()
+    except Exception:
+        return {"status": resp.status_code, "text": resp.text}
+
+
+# 摘要只需要各類最後一筆的這幾個欄位
+_SUMMARY_FIELDS = {
+    "REPAIR STATUS": ("repair", ("TEST_CODE", "DATA1")),
+    "WIP STATUS": ("wip", ("MODEL_NAME", "WIP_GROUP")),
+}
+_STREAM_CHUNK = 64 * 1024
+_WS_RE = re.compile(r"[ \t\n\r]*")
+_scan_once = json.JSONDecoder().scan_once
+_NUMBER_CHARS = frozenset("0123456789.eE+-")
+# 只用在已確認沒有跳脫字元的文字上
+_TABLES_RE = re.compile(r'"TABLES"[ \t\n\r]*:[ \t\n\r]*"([^"]*)"')
+_NESTED_RE = re.compile(r":[ \t\n\r]*\{")
+
+
+class _SummaryBuilder:
+    def __init__(self, status=None):
+        self.status = status
+        self.counts = {"repair": 0, "wip": 0}
+        self.last: Dict[str, dict] = {}
+
+    def add(self, row):
+        if not isinstance(row, dict):
+            return
+        kind = _SUMMARY_FIELDS.get(row.get("TABLES"))
+        if kind is None:
+            return
+        self.counts[kind[0]] += 1
+        self.last[kind[0]] = row
+
+    def add_flat_rows(self, text: str) -> bool:
+        # text 為連續的多列 {...},{...}。沒有跳脫字元、沒有巢狀結構、每列恰好一個 TABLES 時，
+        # 直接用字串運算計數，各類最後一列只留原文；不符合就回傳 False，由呼叫端逐列解碼
+        if "\\" in text or "[" in text or "]" in text or text.count('"') % 2:
+            return False
+        found = _TABLES_RE.findall(text)
+        n = len(found)
+        if text.count("{") != n or text.count("}") != n or _NESTED_RE.search(text):
+            return False
+        want = set()
+        for tables, k in Counter(found).items():
+            kind = _SUMMARY_FIELDS.get(tables)
+            if kind is not None:
+                self.counts[kind[0]] += k
+                want.add(kind[0])
+        end = len(text)
+        for tables in reversed(found):
+            if not want:
+                break
+            start = text.rfind("{", 0, end)
+            kind = _SUMMARY_FIELDS.get(tables)
+            if kind is not None and kind[0] in want:
+                want.discard(kind[0])
+                self.last[kind[0]] = text[start : text.find("}", start) + 1]
+            end = start
+        return True
+
+    def result(self) -> dict:
+        out = {
+            "status": self.status,
+            "repair_count": self.counts["repair"],
+            "wip_count": self.counts["wip"],
+        }
+        for name, fields in _SUMMARY_FIELDS.values():
+            row = self.last.get(name)
+            if isinstance(row, str):
+                row = json.loads(row)
+            out[f"{name}_last"] = {f: row.get(f, "") for f in fields} if row else None
+        return out
+
+
+class _JsonStream:
+    # 逐塊讀入文字，每次只解碼目前位置的下一個值；已處理的文字會被丟棄
+    def __init__(self, chunks: Iterator[str]):
+        self._chunks = chunks
+        self.buf, self.pos, self.eof = "", 0, False
+
+    def _more(self) -> bool:
+        for piece in self._chunks:
+            if piece:
+                self.buf = self.buf[self.pos :] + piece
+                self.pos = 0
+                return True
+        self.eof = True
+        return False
+
+    def peek(self) -> str:
+        while True:
+            self.pos = _WS_RE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._more():
+                return ""
+
+    def take(self, expected: str) -> str:
+        ch = self.peek()
+        if not ch or ch not in expected:
+            raise ValueError(f"預期 {expected!r}，遇到 {ch!r}")
+        self.pos += 1
+        return ch
+
+    def value(self):
+        self.peek()
+        while True:
             try:
-                return resp.json()
-            except Exception:
-                return {"status": resp.status_code, "text": resp.text}
-        except Exception as e:
-            last_err = f"{url} -> {e}"
-    raise RuntimeError(
+                obj, end = _scan_once(self.buf, self.pos)
+                # 數字停在緩衝區結尾（或 1. / 1e 之前）時可能還沒讀完
+                if self.eof or (
+                    end < len(self.buf) and self.buf[end] not in _NUMBER_CHARS
+                ):
+                    self.pos = end
+                    return obj
+            except (StopIteration, ValueError):
+                if self.eof:
+                    raise ValueError("JSON 格式錯誤")
+            self._more()
+
+
+def _flat_rows(js: _JsonStream, acc: _SummaryBuilder) -> bool:
+    # 緩衝區裡已完整的列（到陣列結尾或最後一個 } 為止）整段交給 add_flat_rows
+    buf, pos = js.buf, js.pos
+    stop = buf.find("]", pos)
+    cut = buf.rfind("}", pos, len(buf) if stop < 0 else stop) + 1
+    if cut <= pos or not acc.add_flat_rows(buf[pos:cut]):
+        return False
+    js.pos = cut
+    return True
+
+
+def _scan_rows(js: _JsonStream, acc: _SummaryBuilder):
+    failed = None
+    while True:
+        # 同一段緩衝區整段處理失敗後就逐列解碼，讀入下一塊才再試
+        if js.peek() == "{" and js.buf is not failed and _flat_rows(js, acc):
+            pass
+        else:
+            failed = js.buf
+            acc.add(js.value())
+        if js.take(",]") == "]":
+            return
+
+
+def _scan_summary(chunks: Iterator[str]) -> dict:
+    js = _JsonStream(chunks)
+    acc = _SummaryBuilder()
+    js.take("{")
+    if js.peek() == "}":
+        return acc.result()
+    while True:
+        key = js.value()
+        js.take(":")
+        if key == "result" and js.peek() == "[":
+            js.take("[")
+            if js.peek() == "]":
+                js.take("]")
+            else:
+                _scan_rows(js, acc)
+        else:
+            value = js.value()
+            if key == "status":
+                acc.status = value
+        if js.take(",}") == "}":
+            return acc.result()
+
+
+def _iter_text(resp) -> Iterator[str]:
+    dec = codecs.getincrementaldecoder("utf-8-sig")()
+    for chunk in resp.iter_content(_STREAM_CHUNK):
+        yield dec.decode(chunk)
+    yield dec.decode(b"", final=True)
+
+
+def _summary_payload(resp) -> dict:
+    try:
+        return _scan_summary(_iter_text(resp))
+    except ValueError:
+        return {"status": resp.status_code, "text": "(回應不是合法的 JSON)"}
+
+
+def _api_error(tried: List[str], last_err: Optional[str]) -> RuntimeError:
+    return RuntimeError(
         "API 連線失敗；已嘗試：\n  - "
         + "\n  - ".join(tried)
         + f"\n設定：host={API_HOST} port={API_PORT} timeout={API_TIMEOUT}s "
@@ -81,25 +462,153 @@ def call_api(sn: str) -> dict:
     )
 
 
+def _race_api(
+    urls: List[str],
+    sess,
+    verify_param,
+    headers,
+    timings: Optional[Dict] = None,
+    summary_only: bool = False,
+) -> dict:
+    stop = threading.Event()
+
+    def attempt(url: str) -> Tuple[dict, Dict]:
+        if stop.is_set():
+            raise RuntimeError("已取消")
+        t: Dict = {}
+        # stream=True：先拿到標頭，輸家就不必再下載本文
+        resp = sess.get(
+            url,
+            timeout=API_TIMEOUT,
+            verify=verify_param,
+            headers=headers,
+            stream=True,
+        )
+        try:
+            add_timing(t, "execute", resp.elapsed.total_seconds())
+            if stop.is_set():
+                raise RuntimeError("已取消")
+            resp.raise_for_status()
+            with stage(t, "fetch"):
+                payload = _summary_payload(resp) if summary_only else _payload(resp)
+            return payload, t
+        finally:
+            resp.close()
+
+    pool = _race_pool()
+    queue = list(urls)
+    pending: Dict = {}
+    tried: List[str] = []
+    last_err, launch = None, True
+    try:
+        while queue or pending:
+            if queue and (launch or not pending):
+                url = queue.pop(0)
+                tried.append(url)
+                pending[pool.submit(attempt, url)] = url
+            done, _ = wait(
+                pending,
+                timeout=API_RACE_HEDGE_MS / 1000 if queue else None,
+                return_when=FIRST_COMPLETED,
+            )
+            launch = not done
+            for fut in done:
+                url = pending.pop(fut)
+                try:
+                    payload, t = fut.result()
+                except Exception as e:
+                    if _is_conn_error(e):
+                        _mark_dead(url)
+                    last_err = f"{url} -> {e}"
+                    continue
+                _mark_ok(url)
+                if timings is not None:
+                    timings.update(t, url=url, attempts=len(tried))
+                return payload
+    finally:
+        stop.set()
+        for fut in pending:
+            fut.cancel()
+    raise _api_error(tried, last_err)
+
+
+def _fetch_api(
+    sn: str,
+    sess: Optional[requests.Session] = None,
+    timings: Optional[Dict] = None,
+    summary_only: bool = False,
+) -> dict:
+    urls = _build_api_urls(sn)
+    if sess is None:
+        sess = _get_session()
+    verify_param = resolve_verify_param()
+    headers = {"Host": API_HOST_HEADER} if API_HOST_HEADER else None
+    _maybe_reprobe(urls, sess, verify_param, headers)
+
+    ordered = _ordered_urls(urls)
+    if API_RACE and len(ordered) > 1:
+        return _race_api(ordered, sess, verify_param, headers, timings, summary_only)
+
+    last_err, tried = None, []
+    for url in ordered:
+        tried.append(url)
+        try:
+            t0 = time.perf_counter()
+            resp = sess.get(
+                url,
+                timeout=API_TIMEOUT,
+                verify=verify_param,
+                headers=headers,
+                stream=summary_only,
+            )
+            with resp:
+                resp.raise_for_status()
+                _mark_ok(url)
+                # elapsed 是送出到收到標頭的時間，其餘為下載本文
+                head = resp.elapsed.total_seconds()
+                if timings is not None:
+                    add_timing(timings, "execute", head)
+                    timings.update(url=url, attempts=len(tried))
+                if summary_only:
+                    # 下載與解析同時進行，一併計入 fetch
+                    with stage(timings, "fetch"):
+                        return _summary_payload(resp)
+                add_timing(timings, "fetch", time.perf_counter() - t0 - head)
+                with stage(timings, "convert"):
+                    return _payload(resp)
+        except Exception as e:
+            if _is_conn_error(e):
+                _mark_dead(url)
+            last_err = f"{url} -> {e}"
+    raise _api_error(tried, last_err)
+
+
+def api_summary(payload: dict) -> dict:
+    if "repair_count" in payload:
+        return payload
+    acc = _SummaryBuilder(payload.get("status"))
+    for r in payload.get("result", []):
+        acc.add(r)
+    return acc.result()
+
+
 def summarize_api_payload(payload: dict) -> str:
+    # payload 可以是完整文件，也可以是 summary_only 取得的摘要
     try:
-        status = payload.get("status")
-        results = payload.get("result", [])
-        repair = [r for r in results if r.get("TABLES") == "REPAIR STATUS"]
-        wip = [r for r in results if r.get("TABLES") == "WIP STATUS"]
+        summary = api_summary(payload)
         lines = [
-            f"status: {status}",
-            f"REPAIR STATUS 筆數: {len(repair)}",
-            f"WIP STATUS 筆數: {len(wip)}",
+            f"status: {summary['status']}",
+            f"REPAIR STATUS 筆數: {summary['repair_count']}",
+            f"WIP STATUS 筆數: {summary['wip_count']}",
         ]
+        wip = summary["wip_last"]
         if wip:
-            last = wip[-1]
-            lines.append(f"MODEL_NAME: {last.get('MODEL_NAME','')}")
-            lines.append(f"WIP_GROUP: {last.get('WIP_GROUP','')}")
+            lines.append(f"MODEL_NAME: {wip['MODEL_NAME']}")
+            lines.append(f"WIP_GROUP: {wip['WIP_GROUP']}")
+        repair = summary["repair_last"]
         if repair:
-            last = repair[-1]
-            lines.append(f"最後測試 TEST_CODE: {last.get('TEST_CODE','')}")
-            lines.append(f"最後測試 DATA1: {last.get('DATA1','')}")
+            lines.append(f"最後測試 TEST_CODE: {repair['TEST_CODE']}")
+            lines.append(f"最後測試 DATA1: {repair['DATA1']}")
         return "\n".join(lines)
     except Exception:
         return "(無法產生摘要)"
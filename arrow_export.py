@@ -0,0 +1,194 @@
+import os
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import settings
+from settings import SQL_MAX_ROWS
+
+
+ARROW_ROW_GROUP_ROWS = getattr(settings, "ARROW_ROW_GROUP_ROWS", 100000)
+PARQUET_COMPRESSION = getattr(settings, "PARQUET_COMPRESSION", "zstd")
+
+FORMATS = ("parquet", "arrow")
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow as pa
+    except Exception as e:
+        raise RuntimeError("缺少 pyarrow，請先 pip install pyarrow") from e
+    return pa
+
+
+def _oracle_arrow_type(pa, d) -> Optional[Any]:
+    name = str(getattr(d[1], "name", d[1])).upper()
+    if name.startswith("DB_TYPE_"):
+        name = name[len("DB_TYPE_") :]
+    if name in ("VARCHAR", "NVARCHAR", "CHAR", "NCHAR", "LONG", "CLOB", "NCLOB"):
+        return pa.string()
+    if name in ("ROWID", "UROWID"):
+        return pa.string()
+    if name in ("DATE", "TIMESTAMP"):
+        return pa.timestamp("us")
+    if name in ("BINARY_DOUBLE", "BINARY_FLOAT"):
+        return pa.float64()
+    if name in ("RAW", "LONG_RAW", "BLOB"):
+        return pa.binary()
+    if name == "BOOLEAN":
+        return pa.bool_()
+    if name == "NUMBER":
+        # 沒有宣告精度的 NUMBER 交給 pyarrow 依值推斷（整數 int64、其餘 double）
+        precision, scale = d[4], d[5]
+        if scale == 0 and precision and precision <= 18:
+            return pa.int64()
+        if precision and scale is not None and scale >= 0:
+            decimal = pa.decimal128 if precision <= 38 else pa.decimal256
+            return decimal(precision, scale)
+    return None
+
+
+def _column(pa, values: List[Any], typ):
+    try:
+        return pa.array(values, type=typ)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, ValueError):
+        if typ is not None and pa.types.is_string(typ):
+            return pa.array([None if v is None else str(v) for v in values], typ)
+        if typ is not None and pa.types.is_decimal(typ):
+            # 驅動回傳 float 時以最短的十進位表示轉回 Decimal
+            return pa.array([_to_decimal(v, typ.scale) for v in values], typ)
+        raise
+
+
+def _to_decimal(v: Any, scale: int) -> Any:
+    if not isinstance(v, float):
+        return v
+    return Decimal(repr(v)).quantize(Decimal(1).scaleb(-scale))
+
+
+def _record_batches(
+    batches: Iterable[Tuple[List[Any], List[Tuple[Any, ...]]]], typer=None
+) -> Iterator[Any]:
+
+    pa = _import_pyarrow()
+    schema = None
+    for desc, rows in batches:
+        if schema is None:
+            names = [str(d[0]) for d in desc]
+            hints = [typer(pa, d) if typer else None for d in desc]
+        cols = list(zip(*rows)) if rows else [()] * len(names)
+        if schema is None:
+            arrays = []
+            for values, typ in zip(cols, hints):
+                arr = _column(pa, list(values), typ)
+                if pa.types.is_null(arr.type):
+                    arr = arr.cast(pa.string())
+                arrays.append(arr)
+            schema = pa.schema([pa.field(n, a.type) for n, a in zip(names, arrays)])
+        else:
+            arrays = [
+                _column(pa, list(values), f.type) for values, f in zip(cols, schema)
+            ]
+        yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _df_record_batches(dfs: Iterable[Any]) -> Iterator[Any]:
+    pa = _import_pyarrow()
+    for df in dfs:
+        try:
+            tbl = pa.table(df)
+        except Exception:
+            tbl = pa.Table.from_arrays(
+                [pa.array(c) for c in df.column_arrays()], names=df.column_names()
+            )
+        yield from tbl.to_batches()
+
+
+def write_batches(record_batches: Iterable[Any], path: str, fmt: str = "parquet"):
+
+    if fmt not in FORMATS:
+        raise RuntimeError(f"不支援的匯出格式：{fmt}")
+    pa = _import_pyarrow()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    writer, schema = None, None
+    pending: List[Any] = []
+    pending_rows, total = 0, 0
+
+    def flush():
+        nonlocal pending, pending_rows
+        if not pending:
+            return
+        tbl = pa.Table.from_batches(pending, schema=schema)
+        if fmt == "parquet":
+            writer.write_table(tbl, row_group_size=ARROW_ROW_GROUP_ROWS)
+        else:
+            for b in tbl.combine_chunks().to_batches(ARROW_ROW_GROUP_ROWS):
+                writer.write_batch(b)
+        pending, pending_rows = [], 0
+
+    try:
+        for rb in record_batches:
+            if writer is None:
+                schema = rb.schema
+                if fmt == "parquet":
+                    import pyarrow.parquet as pq
+
+                    writer = pq.ParquetWriter(
+                        path, schema, compression=PARQUET_COMPRESSION or None
+                    )
+                else:
+                    writer = pa.ipc.new_file(path, schema)
+            pending.append(rb)
+            pending_rows += rb.num_rows
+            total += rb.num_rows
+            if pending_rows >= ARROW_ROW_GROUP_ROWS:
+                flush()
+        if writer is None:
+            raise RuntimeError("查詢沒有回傳欄位，無法匯出")
+        flush()
+    finally:
+        if writer is not None:
+            writer.close()
+    return list(schema.names), total
+
+
+def export_oracle(
+    sql_text: str,
+    path: str,
+    fmt: str = "parquet",
+    max_rows: int = SQL_MAX_ROWS,
+    params: Optional[Dict[str, Any]] = None,
+):
+
+    import db_oracle
+
+    if db_oracle.supports_native_df(exact_decimals=True):
+        dfs = db_oracle.iter_sql_raw_df(sql_text, max_rows=max_rows, params=params)
+        return write_batches(_df_record_batches(dfs), path, fmt)
+    batches = db_oracle.iter_sql_raw_values(sql_text, max_rows=max_rows, params=params)
+    return write_batches(_record_batches(batches, _oracle_arrow_type), path, fmt)
+
+
+def export_mysql(
+    sql_text: str,
+    path: str,
+    fmt: str = "parquet",
+    max_rows: int = SQL_MAX_ROWS,
+    params: Optional[Dict[str, Any]] = None,
+):
+
+    import db_mysql
+
+    batches = db_mysql.iter_sql_raw_mysql_values(
+        sql_text, max_rows=max_rows, params=params
+    )
+    return write_batches(_record_batches(batches), path, fmt)
+
+
+def export_rows(
+    columns: List[str], rows: List[Dict[str, Any]], path: str, fmt: str = "parquet"
+):
+
+    desc = [(c,) for c in columns]
+    tuples = [tuple(r.get(c) for c in columns) for r in rows]
+    return write_batches(_record_batches([(desc, tuples)]), path, fmt)
@@ -0,0 +1,74 @@
+# 基準測試用的 GetAssetInfoWithParams 替身；SN 形如 BENCH-10000 代表回傳 10000 筆 REPAIR STATUS
+import gzip, json, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+_bodies = {}
+_lock = threading.Lock()
+
+
+def payload(sn: str, repair_rows: int) -> dict:
+    result = [
+        {
+            "TABLES": "REPAIR STATUS",
+            "SERIAL_NUMBER": sn,
+            "TEST_CODE": f"TC{i % 97:03d}",
+            "DATA1": f"FAIL-{i % 13}",
+            "TEST_STATION": f"FT{i % 8}",
+            "TEST_TIME": f"2024-01-01T{(i // 60) % 24:02d}:{i % 60:02d}:00",
+            "REPAIR_CODE": f"R{i % 41:02d}",
+        }
+        for i in range(repair_rows)
+    ]
+    result.append(
+        {
+            "TABLES": "WIP STATUS",
+            "SERIAL_NUMBER": sn,
+            "MODEL_NAME": "MODEL-001",
+            "WIP_GROUP": "PACKING",
+        }
+    )
+    return {"status": "OK", "result": result}
+
+
+def _body(sn: str, gz: bool) -> bytes:
+    key = (sn, gz)
+    with _lock:
+        body = _bodies.get(key)
+    if body is None:
+        try:
+            rows = int(sn.rsplit("-", 1)[-1])
+        except ValueError:
+            rows = 3
+        body = json.dumps(payload(sn, rows), ensure_ascii=False).encode("utf-8")
+        if gz:
+            body = gzip.compress(body, compresslevel=1)
+        with _lock:
+            _bodies[key] = body
+    return body
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        sn = parse_qs(urlsplit(self.path).query).get("sn", [""])[0]
+        gz = "gzip" in self.headers.get("Accept-Encoding", "")
+        body = _body(sn, gz)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        if gz:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start(host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,216 @@
+# 基準測試用的 python-oracledb 替身：不連線，依 SQL 的列數限制產生合成資料
+import re
+from datetime import datetime, timedelta
+
+
+class DbType:
+    def __init__(self, name: str):
+        self.name = name
+
+    def __repr__(self):
+        return f"<DbType {self.name}>"
+
+
+DB_TYPE_VARCHAR = DbType("DB_TYPE_VARCHAR")
+DB_TYPE_NVARCHAR = DbType("DB_TYPE_NVARCHAR")
+DB_TYPE_CHAR = DbType("DB_TYPE_CHAR")
+DB_TYPE_NUMBER = DbType("DB_TYPE_NUMBER")
+DB_TYPE_BINARY_DOUBLE = DbType("DB_TYPE_BINARY_DOUBLE")
+DB_TYPE_DATE = DbType("DB_TYPE_DATE")
+DB_TYPE_TIMESTAMP = DbType("DB_TYPE_TIMESTAMP")
+DB_TYPE_CLOB = DbType("DB_TYPE_CLOB")
+STRING = DB_TYPE_VARCHAR
+NUMBER = DB_TYPE_NUMBER
+DATETIME = DB_TYPE_DATE
+
+POOL_GETMODE_WAIT = 1
+POOL_GETMODE_NOWAIT = 2
+POOL_GETMODE_TIMEDWAIT = 3
+
+# (name, type, display_size, internal_size, precision, scale, null_ok)
+DESCRIPTION = [
+    ("ID", DB_TYPE_NUMBER, 11, None, 10, 0, False),
+    ("SERIAL_NUMBER", DB_TYPE_VARCHAR, 25, 25, None, None, True),
+    ("MODEL_NAME", DB_TYPE_VARCHAR, 25, 25, None, None, True),
+    ("WIP_GROUP", DB_TYPE_VARCHAR, 25, 25, None, None, True),
+    ("QTY", DB_TYPE_NUMBER, 127, None, 0, -127, True),
+    ("IN_STATION_TIME", DB_TYPE_DATE, 23, None, None, None, True),
+]
+
+_TEMPLATE_ROWS = 4096
+_BASE_TIME = datetime(2024, 1, 1)
+TEMPLATE = [
+    (
+        i,
+        f"SN{i:010d}",
+        f"MODEL-{i % 37:03d}",
+        ("REPAIR", "PACKING", "FQC", "SMT")[i % 4],
+        (i % 1000) / 10,
+        _BASE_TIME + timedelta(minutes=i),
+    )
+    for i in range(_TEMPLATE_ROWS)
+]
+
+_FETCH_FIRST_RE = re.compile(r"FETCH\s+FIRST\s+(\d+)\s+ROWS", re.I)
+
+# EXPLAIN PLAN 之後查 PLAN_TABLE 的結果：單表全表掃描
+# (ID, DEPTH, OPERATION, OPTIONS, OBJECT_OWNER, OBJECT_NAME, CARDINALITY, COST)
+PLAN_ROWS = [
+    (0, 0, "SELECT STATEMENT", None, None, None, 200, 4521),
+    (1, 1, "VIEW", None, None, None, 200, 4521),
+    (2, 2, "WINDOW", "NOSORT STOPKEY", None, None, 1_000_000, 4521),
+    (3, 3, "TABLE ACCESS", "FULL", "BENCH", "BENCH_ROWS", 1_000_000, 4521),
+]
+
+
+class DatabaseError(Exception):
+    pass
+
+
+class Var:
+    def __init__(self, typ, size=None, arraysize=None):
+        self.type = typ
+
+
+class Cursor:
+    def __init__(self, conn):
+        self.connection = conn
+        self.description = None
+        self.arraysize = 100
+        self.prefetchrows = 2
+        self.outputtypehandler = None
+        self._remaining = 0
+        self._pos = 0
+        self._rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._remaining = 0
+
+    def setinputsizes(self, *args, **kwargs):
+        pass
+
+    def var(self, typ, *args, **kwargs):
+        return Var(typ, *args, **kwargs)
+
+    def execute(self, sql, binds=None):
+        binds = binds or {}
+        self._rows = None
+        if sql.lstrip().upper().startswith("EXPLAIN PLAN"):
+            self.description = None
+            return
+        if "PLAN_TABLE" in sql.upper():
+            self.description = [(c, DB_TYPE_VARCHAR) for c in ("ID", "OPERATION")]
+            self._rows = list(PLAN_ROWS)
+            self._remaining = len(self._rows)
+            self._pos = 0
+            return
+        m = _FETCH_FIRST_RE.search(sql)
+        if m:
+            n = int(m.group(1))
+        elif "max_rows" in binds:
+            n = int(binds["max_rows"])
+        else:
+            n = self.connection.rows
+        self.description = list(DESCRIPTION)
+        self._remaining = min(n, self.connection.rows)
+        self._pos = 0
+
+    def fetchmany(self, size=None):
+        size = min(size or self.arraysize, self._remaining)
+        if size <= 0:
+            return []
+        self._remaining -= size
+        if self._rows is not None:
+            out = self._rows[self._pos : self._pos + size]
+            self._pos += size
+            return out
+        out = []
+        pos = self._pos
+        while size:
+            start = pos % _TEMPLATE_ROWS
+            take = min(size, _TEMPLATE_ROWS - start)
+            out.extend(TEMPLATE[start : start + take])
+            pos += take
+            size -= take
+        self._pos = pos
+        return out
+
+    def fetchall(self):
+        return self.fetchmany(self._remaining)
+
+    def fetchone(self):
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+
+class Connection:
+    # 每次查詢最多回傳幾列，由基準測試調整
+    rows = 1_000_000
+    outputtypehandler = None
+
+    def __init__(self, pool=None):
+        self._pool = pool
+        self.call_timeout = 0
+        self.stmtcachesize = 20
+        self.version = "19.3.0.0.0"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def cursor(self):
+        return Cursor(self)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.busy -= 1
+            self._pool = None
+
+    def cancel(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def ping(self):
+        pass
+
+
+class ConnectionPool:
+    def __init__(self, **kwargs):
+        self.min = kwargs.get("min", 1)
+        self.max = kwargs.get("max", 4)
+        self.opened = self.min
+        self.busy = 0
+
+    def acquire(self):
+        self.busy += 1
+        self.opened = max(self.opened, self.busy)
+        return Connection(self)
+
+    def close(self, force=False):
+        pass
+
+
+def create_pool(**kwargs):
+    return ConnectionPool(**kwargs)
+
+
+def connect(**kwargs):
+    return Connection()
+
+
+def is_thin_mode():
+    return True
+
+
+def init_oracle_client(**kwargs):
+    pass
@@ -0,0 +1,159 @@
+# 基準測試用的 PyMySQL 替身：依 LIMIT 產生合成資料
+import re
+import types
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+# (name, type_code, display_size, internal_size, precision, scale, null_ok)
+DESCRIPTION = [
+    ("id", 3, None, 11, 11, 0, False),
+    ("serial_number", 253, None, 100, 100, 0, True),
+    ("model_name", 253, None, 100, 100, 0, True),
+    ("station", 253, None, 100, 100, 0, True),
+    ("qty", 246, None, 12, 10, 2, True),
+    ("updated_at", 12, None, 19, 19, 0, True),
+]
+
+_TEMPLATE_ROWS = 4096
+_BASE_TIME = datetime(2024, 1, 1)
+TEMPLATE = [
+    (
+        i,
+        f"SN{i:010d}",
+        f"MODEL-{i % 37:03d}",
+        ("REPAIR", "PACKING", "FQC", "SMT")[i % 4],
+        Decimal(i % 1000) / 10,
+        _BASE_TIME + timedelta(minutes=i),
+    )
+    for i in range(_TEMPLATE_ROWS)
+]
+
+_LIMIT_RE = re.compile(r"\bLIMIT\s+(\d+)", re.I)
+
+# EXPLAIN 的結果：單表全表掃描
+EXPLAIN_DESCRIPTION = [
+    (name, 253, None, 64, 64, 0, True)
+    for name in ("id", "select_type", "table", "type", "key", "rows", "Extra")
+]
+EXPLAIN_ROW = (1, "SIMPLE", "wip", "ALL", None, 1_000_000, None)
+EXPLAIN_JSON = '{"query_block": {"cost_info": {"query_cost": "101234.50"}}}'
+
+
+class Error(Exception):
+    pass
+
+
+class Cursor:
+    def __init__(self, conn):
+        self.connection = conn
+        self.description = None
+        self._remaining = 0
+        self._pos = 0
+        self._rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._remaining = 0
+
+    def execute(self, sql, args=None):
+        args = args or {}
+        if sql.lstrip().upper().startswith(("SET ", "KILL ")):
+            self.description = None
+            return 0
+        if sql.lstrip().upper().startswith("EXPLAIN"):
+            if "FORMAT=JSON" in sql.upper():
+                self.description = [("EXPLAIN", 252, None, 0, 0, 0, True)]
+                self._rows = [(EXPLAIN_JSON,)]
+            else:
+                self.description = list(EXPLAIN_DESCRIPTION)
+                self._rows = [EXPLAIN_ROW]
+            self._remaining = len(self._rows)
+            self._pos = 0
+            return self._remaining
+        self._rows = None
+        m = _LIMIT_RE.search(sql)
+        if m:
+            n = int(m.group(1))
+        elif "max_rows" in args:
+            n = int(args["max_rows"])
+        else:
+            n = self.connection.rows
+        self.description = list(DESCRIPTION)
+        self._remaining = min(n, self.connection.rows)
+        self._pos = 0
+        return self._remaining
+
+    def fetchmany(self, size=None):
+        size = min(size or 1, self._remaining)
+        if size <= 0:
+            return []
+        self._remaining -= size
+        if self._rows is not None:
+            out = self._rows[self._pos : self._pos + size]
+            self._pos += size
+            return out
+        out = []
+        pos = self._pos
+        while size:
+            start = pos % _TEMPLATE_ROWS
+            take = min(size, _TEMPLATE_ROWS - start)
+            out.extend(TEMPLATE[start : start + take])
+            pos += take
+            size -= take
+        self._pos = pos
+        return out
+
+    def fetchall(self):
+        return self.fetchmany(self._remaining)
+
+    def fetchone(self):
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+
+class SSCursor(Cursor):
+    pass
+
+
+class DictCursor(Cursor):
+    def fetchmany(self, size=None):
+        names = [d[0] for d in self.description or ()]
+        return [dict(zip(names, r)) for r in super().fetchmany(size)]
+
+
+cursors = types.SimpleNamespace(Cursor=Cursor, SSCursor=SSCursor, DictCursor=DictCursor)
+
+
+class Connection:
+    rows = 1_000_000
+
+    def __init__(self, **kwargs):
+        self.open = True
+        self.cursorclass = kwargs.get("cursorclass") or Cursor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def cursor(self, cursor=None):
+        return (cursor or self.cursorclass)(self)
+
+    def thread_id(self):
+        return 1
+
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        self.open = False
+
+
+def connect(**kwargs):
+    return Connection(**kwargs)
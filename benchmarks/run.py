@@ -0,0 +1,310 @@
+import argparse, gc, json, os, platform, shutil, subprocess, sys, tempfile, time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+FAKES = os.path.join(HERE, "fakes")
+BASELINE = os.path.join(HERE, "baseline.json")
+
+# sop_probe 啟動時不應載入的重量級模組
+HEAVY_MODULES = ("oracledb", "requests", "tkinter", "pyarrow", "mysql", "pymysql")
+
+BENCH_SQL = "SELECT * FROM BENCH_ROWS"
+
+
+def _setup_env(api_port: int, workdir: str):
+    os.environ.update(
+        {
+            "API_HOST": "127.0.0.1",
+            "API_PORT": str(api_port),
+            "API_HOST_HEADER": "",
+            "API_RACE": "0",
+            "USE_SYSTEM_PROXY": "0",
+            "LOCAL_DB": os.path.join(workdir, "local_cache.db"),
+            "CACHE_ENABLED": "0",
+            "RESULT_CACHE_ENABLED": "0",
+        }
+    )
+    # 讓 db_mysql 走 PyMySQL 替身，即使本機裝了 mysql-connector
+    sys.modules["mysql"] = None
+
+
+def _measure(run: Callable[[], Any], repeat: int, memory: bool) -> Dict[str, Any]:
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        run()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    peak = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            run()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return {"seconds": best, "peak_mb": None if peak is None else peak / 1024**2}
+
+
+def _rows(n: int, template: List[Tuple[Any, ...]]) -> List[Tuple[Any, ...]]:
+    k = len(template)
+    return (template * (n // k + 1))[:n]
+
+
+def _cases(sizes: List[int], api_sizes: List[int], workdir: str):
+    import oracledb as fake_oracle
+    import pymysql as fake_mysql
+
+    import db_oracle, db_mysql, sql_utils, sop_probe
+
+    cases = []
+
+    def oracle_raw(n):
+        return lambda: db_oracle.call_sql_raw(BENCH_SQL, max_rows=n, use_cache=False)
+
+    def mysql_raw(n):
+        return lambda: db_mysql.call_sql_raw_mysql(
+            BENCH_SQL, max_rows=n, use_cache=False
+        )
+
+    def jsonable_rows(n):
+        rows = _rows(n, fake_oracle.TEMPLATE)
+        conv = sql_utils.jsonable
+        return lambda: [[conv(v) for v in r] for r in rows]
+
+    def rows_to_dicts(n):
+        rows = _rows(n, fake_mysql.TEMPLATE)
+        desc = fake_mysql.DESCRIPTION
+        cols = [d[0] for d in desc]
+        convs = sql_utils.column_converters(desc, rows[:100])
+        return lambda: sql_utils.rows_to_dicts(cols, rows, convs)
+
+    def write_csv(n):
+        res = db_oracle.call_sql_raw(BENCH_SQL, max_rows=n, use_cache=False)
+        path = os.path.join(workdir, "bench.csv")
+        return lambda: sop_probe._write_csv(res["columns"], res["rows"], path)
+
+    for n in sizes:
+        cases.append((f"oracle_raw:{n}", n, lambda n=n: oracle_raw(n)))
+        cases.append((f"mysql_raw:{n}", n, lambda n=n: mysql_raw(n)))
+        cases.append((f"jsonable:{n}", n, lambda n=n: jsonable_rows(n)))
+        cases.append((f"rows_to_dicts:{n}", n, lambda n=n: rows_to_dicts(n)))
+        cases.append((f"write_csv:{n}", n, lambda n=n: write_csv(n)))
+
+    def api(n, summary_only=False):
+        from api_client import call_api, summarize_api_payload
+
+        sn = f"BENCH-{n}"
+        call_api(sn, use_cache=False)  # 預熱：建立連線並記住可用端點
+        return lambda: summarize_api_payload(
+            call_api(sn, use_cache=False, summary_only=summary_only)
+        )
+
+    for n in api_sizes:
+        cases.append((f"api:{n}", n, lambda n=n: api(n)))
+        cases.append((f"api_summary:{n}", n, lambda n=n: api(n, True)))
+
+    app = {}
+
+    def set_table(n):
+        if "app" not in app:
+            from ui_tk import App
+
+            app["app"] = App()
+            app["app"].withdraw()
+        res = db_oracle.call_sql_raw(BENCH_SQL, max_rows=n, use_cache=False)
+        ui = app["app"]
+
+        def run():
+            ui._set_table(res["columns"], res["rows"])
+            ui.update_idletasks()
+
+        return run
+
+    for n in sizes:
+        cases.append((f"tk_set_table:{n}", n, lambda n=n: set_table(n)))
+    return cases
+
+
+def _import_check(budget_ms: float, runs: int = 5) -> Dict[str, Any]:
+    code = (
+        "import json, sys, time\n"
+        "t0 = time.perf_counter()\n"
+        "import sop_probe\n"
+        "ms = (time.perf_counter() - t0) * 1000\n"
+        f"heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+        "print(json.dumps({'ms': ms, 'heavy': heavy}))\n"
+    )
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([FAKES, ROOT]))
+    best, heavy = None, []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=ROOT,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        info = json.loads(out.stdout.strip().splitlines()[-1])
+        best = info["ms"] if best is None else min(best, info["ms"])
+        heavy = info["heavy"]
+    problems = []
+    if best > budget_ms:
+        problems.append(f"import sop_probe {best:.1f}ms 超過預算 {budget_ms:.0f}ms")
+    if heavy:
+        problems.append(f"import sop_probe 時載入了 {', '.join(heavy)}")
+    return {"ms": best, "heavy": heavy, "problems": problems}
+
+
+def _compare(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    tolerance: float,
+) -> List[str]:
+    regressions = []
+    for name, cur in results.items():
+        base = baseline.get(name)
+        if not base or cur.get("skipped") or base.get("skipped"):
+            continue
+        if base.get("items_per_s") and cur["items_per_s"] < base["items_per_s"] * (
+            1 - tolerance
+        ):
+            slower = 1 - cur["items_per_s"] / base["items_per_s"]
+            regressions.append(f"{name}: 吞吐量下降 {slower:.0%}")
+        if (
+            base.get("peak_mb") is not None
+            and cur.get("peak_mb") is not None
+            and cur["peak_mb"] > base["peak_mb"] * (1 + tolerance)
+            and cur["peak_mb"] - base["peak_mb"] > 1
+        ):
+            regressions.append(
+                f"{name}: 記憶體峰值 {base['peak_mb']:.1f}MB -> {cur['peak_mb']:.1f}MB"
+            )
+    return regressions
+
+
+def _print_row(name: str, r: Dict[str, Any], base: Optional[Dict[str, Any]]):
+    if r.get("skipped"):
+        print(f"{name:<24} (略過：{r['skipped']})")
+        return
+    peak = "-" if r["peak_mb"] is None else f"{r['peak_mb']:.1f}"
+    delta = ""
+    if base and base.get("items_per_s"):
+        delta = f"{r['items_per_s'] / base['items_per_s'] - 1:+.0%}"
+    print(
+        f"{name:<24} {r['seconds'] * 1000:>10.1f} {r['items_per_s']:>14,.0f}"
+        f" {peak:>10} {delta:>8}"
+    )
+
+
+def main():
+    p = argparse.ArgumentParser(
+        description="離線效能基準：以替身 oracledb / PyMySQL 驅動與本機 FPORTAL 伺服器量測熱路徑"
+    )
+    p.add_argument(
+        "--sizes", default="1000,100000,1000000", help="SQL 筆數（逗號分隔）"
+    )
+    p.add_argument(
+        "--api_sizes", default="1000,10000,100000", help="API 回傳 REPAIR 筆數"
+    )
+    p.add_argument("--quick", action="store_true", help="只跑小量（省略 1M 筆）")
+    p.add_argument("--only", help="只跑名稱含此字串的項目")
+    p.add_argument("--repeat", type=int, default=3, help="每項重複次數（取最快）")
+    p.add_argument("--no_memory", action="store_true", help="不量記憶體峰值（較快）")
+    p.add_argument("--baseline", default=BASELINE, help="基準檔路徑")
+    p.add_argument("--save_baseline", action="store_true", help="將結果寫入基準檔")
+    p.add_argument(
+        "--tolerance", type=float, default=0.25, help="容許的退步比例（0.25 = 25%%）"
+    )
+    p.add_argument(
+        "--import_budget_ms", type=float, default=150, help="import sop_probe 時間上限"
+    )
+    p.add_argument("--json", help="另存完整結果 JSON")
+    args = p.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    api_sizes = [int(s) for s in args.api_sizes.split(",") if s.strip()]
+    if args.quick:
+        sizes = [n for n in sizes if n <= 100000]
+        api_sizes = [n for n in api_sizes if n <= 10000]
+
+    baseline: Dict[str, Dict[str, Any]] = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f).get("results", {})
+
+    workdir = tempfile.mkdtemp(prefix="sop_bench_")
+    sys.path[:0] = [FAKES, ROOT]
+    import fportal
+
+    server = fportal.start()
+    _setup_env(server.server_address[1], workdir)
+
+    problems: List[str] = []
+    results: Dict[str, Dict[str, Any]] = {}
+
+    if not args.only or "import" in args.only:
+        imp = _import_check(args.import_budget_ms)
+        problems.extend(imp["problems"])
+        print(
+            f"import sop_probe: {imp['ms']:.1f}ms（預算 {args.import_budget_ms:.0f}ms）"
+            f"  重量級模組：{', '.join(imp['heavy']) or '無'}"
+        )
+
+    print(f"\n{'項目':<22} {'耗時(ms)':>10} {'筆/秒':>12} {'峰值MB':>8} {'對基準':>6}")
+    for name, items, setup in _cases(sizes, api_sizes, workdir):
+        if args.only and args.only not in name:
+            continue
+        try:
+            run = setup()
+        except Exception as e:
+            # 沒有 DISPLAY 時 Tk 無法建立視窗
+            results[name] = {"skipped": f"{type(e).__name__}: {e}"}
+            _print_row(name, results[name], None)
+            continue
+        r = _measure(run, max(1, args.repeat), not args.no_memory)
+        r["items"] = items
+        r["items_per_s"] = items / r["seconds"] if r["seconds"] else 0.0
+        results[name] = r
+        _print_row(name, r, baseline.get(name))
+    server.shutdown()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    regressions = _compare(results, baseline, args.tolerance)
+    problems.extend(regressions)
+
+    doc = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(doc, f, ensure_ascii=False, indent=2)
+    if args.save_baseline:
+        if baseline:
+            # 只覆寫這次有跑的項目，其餘沿用舊基準
+            doc["results"] = {**baseline, **results}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(doc, f, ensure_ascii=False, indent=2)
+        print(f"\n基準已寫入：{os.path.abspath(args.baseline)}")
+    elif not baseline:
+        print(f"\n尚無基準檔，可加 --save_baseline 建立：{args.baseline}")
+
+    if problems:
+        print("\n發現退步：")
+        for msg in problems:
+            print(f"  - {msg}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# 讓 tests/ 底下的測試可以直接 import 根目錄的模組（pytest 會把這個檔案所在目錄加入 sys.path）
@@ -1,5 +1,6 @@
-import re
-from typing import Any, Dict, List
+import json, re, threading, time
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import settings
 from settings import (
@@ -12,11 +13,21 @@ from settings import (
     MYSQL_CHARSET,
     SQL_MAX_ROWS,
 )
-from sql_utils import jsonable, normalize_sql_user_friendly
+from sql_utils import (
+    column_converters,
+    expand_array_binds,
+    fetch_batch_size,
+    normalize_sql_user_friendly,
+    rows_to_dicts,
+)
+import paging
+import result_cache
+from timing import add as add_timing, stage
 
 
+@lru_cache(maxsize=1)
 def _import_driver():
-
+    # 只解析一次；import 失敗不會被快取，裝好驅動後可直接重試
     try:
         import mysql.connector
 
@@ -33,7 +44,7 @@ def _import_driver():
         ) from e
 
 
-def get_conn():
+def _connect():
     drv_name, mod = _import_driver()
     if drv_name == "mysql.connector":
 
@@ -45,6 +56,7 @@ def get_conn():
             database=MYSQL_DB,
             connection_timeout=MYSQL_TIMEOUT,
             charset=MYSQL_CHARSET,
+            autocommit=True,
         )
     else:
 
@@ -57,9 +69,172 @@ def get_conn():
             connect_timeout=MYSQL_TIMEOUT,
             charset=MYSQL_CHARSET,
             cursorclass=mod.cursors.DictCursor,
+            autocommit=True,
         )
 
 
+_POOL_COND = threading.Condition()
+_IDLE: List[Tuple[Any, float]] = []
+_POOL_OPEN = 0
+_POOL_STATS = {
+    "acquires": 0,
+    "created": 0,
+    "reconnects": 0,
+    "discarded": 0,
+    "wait_total": 0.0,
+    "wait_max": 0.0,
+}
+
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def _is_stale_error(e: BaseException) -> bool:
+    code = e.args[0] if getattr(e, "args", None) else None
+    if code in (2006, 2013, 2055):
+        return True
+    s = str(e)
+    return "gone away" in s or "Lost connection" in s
+
+
+class _PooledConnection:
+    # with 區塊結束時歸還連線池；區塊內出錯（含串流中途取消）就丟棄，
+    # 因為非緩衝游標可能還留著沒讀完的結果
+    def __init__(self, conn):
+        self._conn = conn
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release(discard=exc_type is not None)
+
+    def close(self):
+        self.release(discard=True)
+
+    def release(self, discard: bool = False):
+        if self._released:
+            return
+        self._released = True
+        _release(self._conn, discard)
+
+
+def _checkout_health(conn, idle: float):
+    if idle > settings.MYSQL_POOL_IDLE_TIMEOUT:
+        _close_quietly(conn)
+        return None
+    if idle > settings.MYSQL_POOL_PING_INTERVAL:
+        try:
+            conn.ping(reconnect=True)
+        except Exception:
+            _close_quietly(conn)
+            return None
+    return conn
+
+
+def _acquire() -> _PooledConnection:
+    global _POOL_OPEN
+    t0 = time.monotonic()
+    deadline = t0 + settings.MYSQL_POOL_WAIT_TIMEOUT
+    conn, idle = None, 0.0
+    with _POOL_COND:
+        while True:
+            if _IDLE:
+                conn, last = _IDLE.pop()
+                idle = time.monotonic() - last
+                break
+            if _POOL_OPEN < max(1, settings.MYSQL_POOL_SIZE):
+                _POOL_OPEN += 1
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise RuntimeError(
+                    f"MySQL 連線池已滿（{settings.MYSQL_POOL_SIZE}），"
+                    f"等待 {settings.MYSQL_POOL_WAIT_TIMEOUT}s 逾時"
+                )
+            _POOL_COND.wait(remaining)
+        waited = time.monotonic() - t0
+        _POOL_STATS["acquires"] += 1
+        _POOL_STATS["wait_total"] += waited
+        _POOL_STATS["wait_max"] = max(_POOL_STATS["wait_max"], waited)
+
+    if conn is not None:
+        conn = _checkout_health(conn, idle)
+        if conn is None:
+            with _POOL_COND:
+                _POOL_STATS["reconnects"] += 1
+    if conn is None:
+        try:
+            conn = _connect()
+        except Exception:
+            with _POOL_COND:
+                _POOL_OPEN -= 1
+                _POOL_COND.notify()
+            raise
+        with _POOL_COND:
+            _POOL_STATS["created"] += 1
+    return _PooledConnection(conn)
+
+
+def _release(conn, discard: bool = False):
+    global _POOL_OPEN
+    if discard:
+        _close_quietly(conn)
+    with _POOL_COND:
+        if discard:
+            _POOL_OPEN -= 1
+            _POOL_STATS["discarded"] += 1
+        else:
+            _IDLE.append((conn, time.monotonic()))
+        _POOL_COND.notify()
+
+
+def get_conn():
+    if settings.MYSQL_POOL_ENABLED:
+        return _acquire()
+    return _connect()
+
+
+def mysql_pool_stats() -> Dict[str, Any]:
+    with _POOL_COND:
+        st = dict(_POOL_STATS)
+        opened, idle = _POOL_OPEN, len(_IDLE)
+    acquires = int(st["acquires"])
+    return {
+        "open": opened,
+        "busy": opened - idle,
+        "max": settings.MYSQL_POOL_SIZE,
+        "acquires": acquires,
+        "created": st["created"],
+        "reconnects": st["reconnects"],
+        "discarded": st["discarded"],
+        "wait_total_ms": round(st["wait_total"] * 1000, 3),
+        "wait_avg_ms": (
+            round(st["wait_total"] * 1000 / acquires, 3) if acquires else 0.0
+        ),
+        "wait_max_ms": round(st["wait_max"] * 1000, 3),
+    }
+
+
+def close_mysql_pool():
+    global _POOL_OPEN
+    with _POOL_COND:
+        conns = [c for c, _ in _IDLE]
+        _IDLE.clear()
+        _POOL_OPEN -= len(conns)
+        _POOL_COND.notify_all()
+    for conn in conns:
+        _close_quietly(conn)
+
+
 def _strip_trailing_semicolon(s: str) -> str:
     return re.sub(r";\s*\Z", "", s)
 
@@ -69,9 +244,12 @@ def _oracle_binds_to_mysql_pyformat(sql: str) -> str:
     return re.sub(r"(?<!:):([A-Za-z_][\w]*)", r"%(\1)s", sql)
 
 
-def call_sql_raw_mysql(
-    sql_text: str, max_rows: int = SQL_MAX_ROWS, params: Dict[str, Any] | None = None
-) -> Dict[str, Any]:
+_LIMIT_SUFFIX = " LIMIT %(max_rows)s"
+
+
+def _prepare_raw_mysql(
+    sql_text: str, max_rows: int, params: Dict[str, Any] | None
+) -> Tuple[str, Dict[str, Any]]:
     if not sql_text or not sql_text.strip():
         raise RuntimeError("請輸入 SQL 指令")
 
@@ -83,41 +261,353 @@ def call_sql_raw_mysql(
     binds: Dict[str, Any] = dict(params or {})
     binds.pop("max_rows", None)
 
-    sql_no_sc = _strip_trailing_semicolon(sql_norm)
+    # 陣列 bind 先以 :name 形式展開，再轉成 %(name)s
+    sql_no_sc, binds = expand_array_binds(
+        _strip_trailing_semicolon(sql_norm), binds, max_items=None
+    )
     if not re.search(r"(?is)\blimit\s+\d+\b", sql_no_sc):
-        sql_no_sc = f"{sql_no_sc} LIMIT %(max_rows)s"
+        sql_no_sc = f"{sql_no_sc}{_LIMIT_SUFFIX}"
         binds["max_rows"] = n
 
-    sql_final = _oracle_binds_to_mysql_pyformat(sql_no_sc)
+    return _oracle_binds_to_mysql_pyformat(sql_no_sc), binds
+
+
+def _page_base(sql_final: str) -> Optional[str]:
+    # 由 _prepare_raw_mysql 補上 LIMIT 的查詢才能直接接 OFFSET / 改寫成 keyset
+    if sql_final.endswith(_LIMIT_SUFFIX):
+        return sql_final[: -len(_LIMIT_SUFFIX)]
+    return None
+
+
+def _quote_ident(name: str) -> str:
+    return "`" + name.replace("`", "``") + "`"
+
+
+def _bind_name(name: str) -> str:
+    return f"%({name})s"
+
+
+@lru_cache(maxsize=256)
+def _page_sql_mysql(sql_final: str, order: Optional[paging.Order]) -> str:
+    base = _page_base(sql_final)
+    if order:
+        head = paging.split_order_by(base)[0]
+        return (
+            f"SELECT * FROM ({head}) AS page_q "
+            f"WHERE {paging.keyset_where(order, _quote_ident, _bind_name)} "
+            f"ORDER BY {paging.order_clause(order, _quote_ident)}{_LIMIT_SUFFIX}"
+        )
+    if base is not None:
+        return f"{sql_final} OFFSET %(page_offset)s"
+    # 使用者自己寫了 LIMIT：在它的結果上再分頁
+    return (
+        f"SELECT * FROM ({sql_final}) AS page_q{_LIMIT_SUFFIX} OFFSET %(page_offset)s"
+    )
+
+
+def _connection_id(conn) -> Optional[int]:
+    cid = getattr(conn, "connection_id", None)
+    if cid is None and hasattr(conn, "thread_id"):
+        cid = conn.thread_id()
+    return cid
+
+
+def _iter_raw_tuples_mysql(
+    sql_final: str,
+    binds: Dict[str, Any],
+    max_rows: int,
+    *,
+    handle: Optional[Dict[str, Any]] = None,
+    call_timeout: Optional[int] = None,
+    timings: Optional[Dict[str, Any]] = None,
+    page: Optional[Dict[str, Any]] = None,
+) -> Iterator[Tuple[List[Any], List[Tuple[Any, ...]]]]:
+    for attempt in (0, 1):
+        with stage(timings, "connect"):
+            conn = get_conn()
+        started = False
+        try:
+            with conn:
+                if timings is not None:
+                    timings["source"] = "mysql"
+                for item in _fetch_raw_tuples_mysql(
+                    conn,
+                    sql_final,
+                    binds,
+                    max_rows,
+                    handle,
+                    call_timeout,
+                    timings,
+                    page,
+                ):
+                    started = True
+                    yield item
+            return
+        except Exception as e:
+            # 池裡的連線可能已被 server 關掉；還沒輸出資料就換新連線重試一次
+            if (
+                started
+                or attempt
+                or not settings.MYSQL_POOL_ENABLED
+                or not _is_stale_error(e)
+            ):
+                raise
+            with _POOL_COND:
+                _POOL_STATS["reconnects"] += 1
+
 
+def _fetch_raw_tuples_mysql(
+    conn,
+    sql_final: str,
+    binds: Dict[str, Any],
+    max_rows: int,
+    handle: Optional[Dict[str, Any]],
+    call_timeout: Optional[int],
+    timings: Optional[Dict[str, Any]],
+    page: Optional[Dict[str, Any]] = None,
+) -> Iterator[Tuple[List[Any], List[Tuple[Any, ...]]]]:
+    sql_exec, binds_exec = sql_final, binds
+    # 分頁時多抓一列判斷頁界（見 paging.take）；使用者自己寫 LIMIT 的第一頁沒辦法多抓
+    peek = False
+    if page is not None and paging.begin(page) != "first":
+        keyset = page["mode"] == "keyset"
+        sql_exec = _page_sql_mysql(sql_final, page["order"] if keyset else None)
+        binds_exec = {**binds, "max_rows": int(max_rows) + 1}
+        if keyset:
+            binds_exec.update(paging.keyset_binds(page))
+        else:
+            binds_exec["page_offset"] = page["fetched"]
+        peek = True
+    elif page is not None and "max_rows" in binds:
+        binds_exec = {**binds, "max_rows": int(max_rows) + 1}
+        peek = True
     drv_name, mod = _import_driver()
-    rows: List[Dict[str, Any]] = []
+    if drv_name == "mysql.connector":
+        cur = conn.cursor()
+    else:
+        # 非緩衝游標：逐批從 server 取資料，不先整包載入記憶體
+        cur = conn.cursor(mod.cursors.SSCursor)
+    if handle is not None:
+        handle["conn_id"] = _connection_id(conn)
+    try:
+        if call_timeout:
+            try:
+                cur.execute(
+                    f"SET SESSION MAX_EXECUTION_TIME = {int(call_timeout) * 1000}"
+                )
+            except Exception:
+                pass
+        with stage(timings, "execute"):
+            cur.execute(sql_exec, binds_exec)
+
+        desc = list(cur.description or [])
+        size = fetch_batch_size(desc, max_rows)
+        emitted = False
+        while True:
+            with stage(timings, "fetch"):
+                batch = cur.fetchmany(size)
+            if not batch:
+                break
+            if peek:
+                batch = paging.take(page, batch, int(max_rows))
+                if not batch:
+                    break
+            if page is not None:
+                paging.track(page, _page_base(sql_final) or sql_final, desc, batch)
+            emitted = True
+            yield desc, batch
+        if not emitted:
+            yield desc, []
+    finally:
+        if handle is not None:
+            handle.pop("conn_id", None)
+        try:
+            cur.close()
+        except Exception:
+            pass
+    if call_timeout:
+        # 連線會回到連線池，把逾時設定還原
+        try:
+            with conn.cursor() as reset:
+                reset.execute("SET SESSION MAX_EXECUTION_TIME = 0")
+        except Exception:
+            pass
+    if page is not None:
+        paging.finish(page, int(max_rows), peek)
+
+
+def _iter_raw_rows_mysql(
+    sql_final: str,
+    binds: Dict[str, Any],
+    max_rows: int,
+    *,
+    timings: Optional[Dict[str, Any]] = None,
+    **kw,
+) -> Iterator[Tuple[List[str], List[Dict[str, Any]]]]:
     columns: List[str] = []
-    with get_conn() as conn:
-        if drv_name == "mysql.connector":
-            cur = conn.cursor(dictionary=True)
-        else:
+    convs = None
+    for desc, batch in _iter_raw_tuples_mysql(
+        sql_final, binds, max_rows, timings=timings, **kw
+    ):
+        with stage(timings, "convert"):
+            if convs is None:
+                columns = [d[0] for d in desc]
+                convs = column_converters(desc, batch)
+            dicts = rows_to_dicts(columns, batch, convs)
+        yield columns, dicts
+
+
+def iter_sql_raw_mysql_values(
+    sql_text: str, max_rows: int = SQL_MAX_ROWS, params: Dict[str, Any] | None = None
+) -> Iterator[Tuple[List[Any], List[Tuple[Any, ...]]]]:
+    sql_final, binds = _prepare_raw_mysql(sql_text, max_rows, params)
+    return _iter_raw_tuples_mysql(sql_final, binds, int(max_rows))
+
+
+def iter_sql_raw_mysql(
+    sql_text: str,
+    max_rows: int = SQL_MAX_ROWS,
+    params: Dict[str, Any] | None = None,
+    *,
+    handle: Optional[Dict[str, Any]] = None,
+    call_timeout: Optional[int] = None,
+    timings: Optional[Dict[str, Any]] = None,
+    page: Optional[Dict[str, Any]] = None,
+) -> Iterator[Tuple[List[str], List[Dict[str, Any]]]]:
+    sql_final, binds = _prepare_raw_mysql(sql_text, max_rows, params)
+    paging.check(page)
+    return _iter_raw_rows_mysql(
+        sql_final,
+        binds,
+        int(max_rows),
+        handle=handle,
+        call_timeout=call_timeout,
+        timings=timings,
+        page=page,
+    )
+
+
+def cancel_query_mysql(handle: Dict[str, Any]) -> bool:
+    handle["cancelled"] = True
+    cid = handle.get("conn_id")
+    if not cid:
+        return False
+    try:
+        # 另開一條連線送 KILL，不佔用（也不必等待）連線池
+        with _connect() as conn:
             cur = conn.cursor()
-        try:
-            cur.execute(sql_final, binds)
+            try:
+                cur.execute(f"KILL QUERY {int(cid)}")
+            finally:
+                cur.close()
+        return True
+    except Exception:
+        return False
+
+
+def raw_cache_key_mysql(
+    sql_text: str, max_rows: int = SQL_MAX_ROWS, params: Dict[str, Any] | None = None
+):
+    sql_final, binds = _prepare_raw_mysql(sql_text, max_rows, params)
+    return result_cache.make_key("mysql", sql_final, binds, max_rows)
 
-            if hasattr(cur, "column_names"):
-                columns = list(getattr(cur, "column_names"))
-            elif cur.description:
-                columns = [d[0] for d in cur.description]
 
-            for r in cur.fetchall():
-                if isinstance(r, dict):
-                    rows.append({k: jsonable(v) for k, v in r.items()})
-                else:
+def explain_sql_raw_mysql(
+    sql_text: str,
+    max_rows: int = SQL_MAX_ROWS,
+    params: Dict[str, Any] | None = None,
+    timings: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
 
-                    rows.append(
-                        {columns[i]: jsonable(r[i]) for i in range(len(columns))}
-                    )
+    sql_final, binds = _prepare_raw_mysql(sql_text, max_rows, params)
+    with stage(timings, "connect"):
+        conn = get_conn()
+    cost = None
+    drv_name, mod = _import_driver()
+    with conn:
+        if drv_name == "mysql.connector":
+            cur = conn.cursor()
+        else:
+            # PyMySQL 連線預設是 DictCursor，這裡依欄位順序讀取，改用一般游標
+            cur = conn.cursor(mod.cursors.Cursor)
+        try:
+            with stage(timings, "execute"):
+                cur.execute(f"EXPLAIN {sql_final}", binds)
+                names = [str(d[0]).lower() for d in cur.description or ()]
+                rows = [dict(zip(names, r)) for r in cur.fetchall()]
+                # 傳統 EXPLAIN 沒有成本；FORMAT=JSON 才有（MariaDB 等不支援時略過）
+                try:
+                    cur.execute(f"EXPLAIN FORMAT=JSON {sql_final}", binds)
+                    doc = json.loads(cur.fetchone()[0])
+                    cost = float(doc["query_block"]["cost_info"]["query_cost"])
+                except Exception:
+                    pass
         finally:
             try:
                 cur.close()
             except Exception:
                 pass
+    steps = []
+    examined: Dict[Any, int] = {}
+    for r in rows:
+        access = str(r.get("type") or "")
+        steps.append(
+            {
+                "id": r.get("id"),
+                "depth": 0,
+                "operation": f"{r.get('select_type') or ''} {access}".strip(),
+                "object": r.get("table") or "",
+                "rows": r.get("rows"),
+                "cost": None,
+                "full_scan": access.upper() == "ALL",
+                "cartesian": False,
+            }
+        )
+        # 同一個 id 的各表以巢狀迴圈連接，預估處理筆數相乘
+        if r.get("rows") is not None:
+            examined[r.get("id")] = examined.get(r.get("id"), 1) * int(r["rows"])
+    return {
+        "target": "mysql",
+        "cost": cost,
+        "rows": max(examined.values()) if examined else None,
+        "steps": steps,
+    }
 
-    return {"columns": columns, "rows": rows, "rowcount": len(rows), "binds": binds}
+
+def call_sql_raw_mysql(
+    sql_text: str,
+    max_rows: int = SQL_MAX_ROWS,
+    params: Dict[str, Any] | None = None,
+    use_cache: bool = True,
+    refresh: bool = False,
+    timings: Optional[Dict[str, Any]] = None,
+    page: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    sql_final, binds = _prepare_raw_mysql(sql_text, max_rows, params)
+    paging.check(page)
+
+    def load() -> Dict[str, Any]:
+        rows: List[Dict[str, Any]] = []
+        columns: List[str] = []
+        for columns, batch in _iter_raw_rows_mysql(
+            sql_final, binds, int(max_rows), timings=timings, page=page
+        ):
+            rows.extend(batch)
+        res = {"columns": columns, "rows": rows, "rowcount": len(rows), "binds": binds}
+        if page is not None:
+            res["page"] = dict(page)
+        return res
+
+    # 第二頁以後不走快取
+    if not use_cache or (page and page.get("mode")):
+        res = {**load(), "from_cache": False}
+    else:
+        key = result_cache.make_key("mysql", sql_final, binds, max_rows)
+        res = result_cache.cached(key, load, refresh=refresh)
+        if page is not None and res["from_cache"]:
+            paging.resume(page, res.get("page"), res["rowcount"], int(max_rows))
+    if timings is not None:
+        add_timing(timings, "total", time.perf_counter() - t0)
+        res["timings"] = timings
+    return res
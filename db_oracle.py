@@ -1,5 +1,10 @@
-import os, sys
-from typing import Optional, Tuple, Any, Dict, List
+import os, re, sys, threading, time, uuid
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
+from typing import Optional, Tuple, Any, Dict, List, Iterable, Iterator
 
 import settings
 from settings import (
@@ -7,10 +12,25 @@ from settings import (
     ORACLE_PASSWORD,
     ORACLE_DSN,
     ORACLE_SQL_SN,
+    ORACLE_SQL_SN_IN,
+    SQL_SN_CHUNK,
     SQL_MAX_ROWS,
+    SQL_ARRAYSIZE_MAX,
+    SQL_REWRITE_CACHE_SIZE,
     augment_easy_connect_with_timeout,
 )
-from sql_utils import jsonable, normalize_sql_user_friendly
+from sql_utils import (
+    column_converters,
+    expand_array_binds,
+    fetch_batch_size,
+    normalize_sql_user_friendly,
+    parameterize_literals,
+    rows_to_dicts,
+)
+import db_router
+import paging
+import result_cache
+from timing import add as add_timing, stage
 
 
 def _maybe_init_oracle():
@@ -37,11 +57,24 @@ def _maybe_init_oracle():
         pass
 
 
-_maybe_init_oracle()
+_ORACLE_INIT_LOCK = threading.Lock()
+_ORACLE_INIT_DONE = False
+
+
+def _ensure_oracle_client():
+    # Thick mode 初始化延到第一次真正用到 oracledb 時才做，不在 import 時掃描目錄
+    global _ORACLE_INIT_DONE
+    if _ORACLE_INIT_DONE:
+        return
+    with _ORACLE_INIT_LOCK:
+        if not _ORACLE_INIT_DONE:
+            _maybe_init_oracle()
+            _ORACLE_INIT_DONE = True
 
 
 def current_oracle_mode() -> str:
     try:
+        _ensure_oracle_client()
         import oracledb
 
         return "Thin" if oracledb.is_thin_mode() else "Thick"
@@ -73,86 +106,836 @@ DBS = {
 DEFAULT_DB_ALIAS = getattr(settings, "DEFAULT_DB_ALIAS", "primary")
 FALLBACK_DB_ALIAS = getattr(settings, "FALLBACK_DB_ALIAS", "vnap")
 FALLBACK_TO_VNAP = getattr(settings, "FALLBACK_TO_VNAP", True)
+DB_HEDGE_AFTER_MS = getattr(settings, "DB_HEDGE_AFTER_MS", 0)
 
 
-def get_conn(alias: Optional[str] = None):
+ORACLE_POOL_ENABLED = getattr(settings, "ORACLE_POOL_ENABLED", True)
+
+_POOLS: Dict[str, Any] = {}
+_POOL_LOCK = threading.Lock()
+_POOL_WAIT: Dict[str, Dict[str, float]] = {}
+
+
+def _import_oracledb():
+    _ensure_oracle_client()
     try:
         import oracledb
     except Exception as e:
         raise RuntimeError("缺少 oracledb，請先 pip install oracledb") from e
-    alias = alias or DEFAULT_DB_ALIAS
+    return oracledb
+
+
+def _db_cfg(alias: str) -> Dict[str, Any]:
     cfg = DBS.get(alias)
     if not cfg or not cfg.get("dsn"):
         raise RuntimeError(f"DB 設定不完整：alias={alias}")
-    return oracledb.connect(user=cfg["user"], password=cfg["password"], dsn=cfg["dsn"])
+    return cfg
 
 
-def _exec_once(sql: str, binds: Dict[str, Any], alias: str):
-    with get_conn(alias) as conn:
+def get_pool(alias: Optional[str] = None):
+    alias = alias or DEFAULT_DB_ALIAS
+    pool = _POOLS.get(alias)
+    if pool is not None:
+        return pool
+    oracledb = _import_oracledb()
+    cfg = _db_cfg(alias)
+    with _POOL_LOCK:
+        pool = _POOLS.get(alias)
+        if pool is None:
+            pool = oracledb.create_pool(
+                user=cfg["user"],
+                password=cfg["password"],
+                dsn=cfg["dsn"],
+                min=settings.ORACLE_POOL_MIN,
+                max=settings.ORACLE_POOL_MAX,
+                increment=settings.ORACLE_POOL_INCREMENT,
+                ping_interval=settings.ORACLE_POOL_PING_INTERVAL,
+                timeout=settings.ORACLE_POOL_IDLE_TIMEOUT,
+                getmode=oracledb.POOL_GETMODE_TIMEDWAIT,
+                wait_timeout=settings.ORACLE_POOL_WAIT_TIMEOUT * 1000,
+                stmtcachesize=settings.ORACLE_STMT_CACHE_SIZE,
+            )
+            _POOLS[alias] = pool
+            _POOL_WAIT[alias] = {"acquires": 0, "wait_total": 0.0, "wait_max": 0.0}
+    return pool
+
+
+def _acquire(alias: str):
+    pool = get_pool(alias)
+    t0 = time.perf_counter()
+    conn = pool.acquire()
+    waited = time.perf_counter() - t0
+    with _POOL_LOCK:
+        st = _POOL_WAIT[alias]
+        st["acquires"] += 1
+        st["wait_total"] += waited
+        st["wait_max"] = max(st["wait_max"], waited)
+    return conn
+
+
+def pool_stats(alias: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    out: Dict[str, Dict[str, Any]] = {}
+    for name, pool in list(_POOLS.items()):
+        if alias and name != alias:
+            continue
+        with _POOL_LOCK:
+            st = dict(_POOL_WAIT.get(name, {}))
+        acquires = int(st.get("acquires", 0))
+        out[name] = {
+            "open": pool.opened,
+            "busy": pool.busy,
+            "min": pool.min,
+            "max": pool.max,
+            "acquires": acquires,
+            "wait_total_ms": round(st.get("wait_total", 0.0) * 1000, 3),
+            "wait_avg_ms": round(
+                st.get("wait_total", 0.0) * 1000 / acquires if acquires else 0.0, 3
+            ),
+            "wait_max_ms": round(st.get("wait_max", 0.0) * 1000, 3),
+        }
+    return out
+
+
+def close_pools():
+    with _POOL_LOCK:
+        pools = list(_POOLS.items())
+        _POOLS.clear()
+        _POOL_WAIT.clear()
+    for _, pool in pools:
+        try:
+            pool.close(force=True)
+        except Exception:
+            pass
+
+
+def get_conn(alias: Optional[str] = None):
+    alias = alias or DEFAULT_DB_ALIAS
+    if ORACLE_POOL_ENABLED:
+        return _acquire(alias)
+    oracledb = _import_oracledb()
+    cfg = _db_cfg(alias)
+    return oracledb.connect(
+        user=cfg["user"],
+        password=cfg["password"],
+        dsn=cfg["dsn"],
+        stmtcachesize=settings.ORACLE_STMT_CACHE_SIZE,
+    )
+
+
+def _input_sizes(binds: Dict[str, Any]) -> Dict[str, Any]:
+    # datetime 明確綁成 DATE（有小數秒才用 TIMESTAMP）；TIMESTAMP 的 bind 比對 DATE 欄位時
+    # 會轉換欄位那一側，索引就用不到
+    sizes: Dict[str, Any] = {}
+    for k, v in binds.items():
+        if isinstance(v, (datetime, date)):
+            oracledb = _import_oracledb()
+            fine = isinstance(v, datetime) and v.microsecond
+            sizes[k] = oracledb.DB_TYPE_TIMESTAMP if fine else oracledb.DB_TYPE_DATE
+    return sizes
+
+
+def _decimal_output_handler(cursor, metadata):
+    # 有宣告小數位數的 NUMBER 以 Decimal 取回（預設是 float），匯出時才能保留精確值
+    oracledb = _import_oracledb()
+    if metadata.type_code is oracledb.DB_TYPE_NUMBER and (metadata.scale or 0) > 0:
+        return cursor.var(Decimal, arraysize=cursor.arraysize)
+    return None
+
+
+def _execute(cur, sql: str, binds: Dict[str, Any]):
+    sizes = _input_sizes(binds)
+    if sizes:
+        cur.setinputsizes(**sizes)
+    return cur.execute(sql, binds)
+
+
+def _exec_once(
+    sql: str,
+    binds: Dict[str, Any],
+    alias: str,
+    timings: Optional[Dict[str, Any]] = None,
+):
+    with stage(timings, "connect"):
+        conn = get_conn(alias)
+    with conn:
         with conn.cursor() as cur:
-            cur.execute(sql, binds)
+            with stage(timings, "execute"):
+                _execute(cur, sql, binds)
             cols = [d[0] for d in cur.description] if cur.description else []
-            rows = cur.fetchall() if cur.description else []
+            with stage(timings, "fetch"):
+                rows = cur.fetchall() if cur.description else []
+            if timings is not None:
+                timings["source"] = alias
             return alias, cols, rows
 
 
-def _strip_trailing_semicolon(s: str) -> str:
-    import re
+_TRAILING_SEMICOLON_RE = re.compile(r";\s*\Z")
+_SELECT_RE = re.compile(r"(?is)^\s*select\b")
+_ROW_LIMIT_ERRORS = ("ORA-00933", "ORA-00923", "ORA-32034")
 
-    return re.sub(r";\s*\Z", "", s)
+
+def _strip_trailing_semicolon(s: str) -> str:
+    return _TRAILING_SEMICOLON_RE.sub("", s)
 
 
 def _inject_first_rows_hint(s: str, nrows: int) -> str:
-    import re
+    return _SELECT_RE.sub(f"SELECT /*+ FIRST_ROWS({int(nrows)}) */", s, count=1)
 
-    return re.sub(
-        r"(?is)^\s*select\b",
-        f"SELECT /*+ FIRST_ROWS({int(nrows)}) */",
-        s,
-        count=1,
+
+@lru_cache(maxsize=SQL_REWRITE_CACHE_SIZE)
+def _row_limit_sql(sql_norm: str, n: int) -> Tuple[str, str]:
+    sql_with_hint = _inject_first_rows_hint(_strip_trailing_semicolon(sql_norm), n)
+    return (
+        f"{sql_with_hint} FETCH FIRST {n} ROWS ONLY",
+        f"SELECT * FROM ({sql_norm}) WHERE ROWNUM <= :max_rows",
     )
 
 
-def call_sql_by_sn(sn: str) -> Optional[Tuple[Any, Any, Any]]:
+# (alias, server version, SQL) -> "rownum"：記住 FETCH FIRST 被拒絕的組合
+_LIMIT_FORMS: "OrderedDict[Tuple[str, str, str], str]" = OrderedDict()
+_LIMIT_LOCK = threading.Lock()
+
 
-    _, _, rows = _exec_once(ORACLE_SQL_SN, {"sn": sn}, alias="primary")
+def _server_version(conn) -> str:
+    try:
+        return str(conn.version or "")
+    except Exception:
+        return ""
+
+
+def _limit_form(key: Tuple[str, str, str]) -> str:
+    try:
+        if int(key[1].split(".")[0]) < 12:
+            return "rownum"
+    except ValueError:
+        pass
+    with _LIMIT_LOCK:
+        form = _LIMIT_FORMS.get(key)
+        if form is not None:
+            _LIMIT_FORMS.move_to_end(key)
+    return form or "fetch"
+
+
+def _remember_limit_form(key: Tuple[str, str, str], form: str):
+    with _LIMIT_LOCK:
+        _LIMIT_FORMS[key] = form
+        _LIMIT_FORMS.move_to_end(key)
+        while len(_LIMIT_FORMS) > SQL_REWRITE_CACHE_SIZE:
+            _LIMIT_FORMS.popitem(last=False)
+
+
+def _run_row_limited(conn, alias: str, sql_norm: str, n: int, user_params, run):
+    sql_fetch, wrapped = _row_limit_sql(sql_norm, n)
+    key = (alias, _server_version(conn), sql_norm)
+    if _limit_form(key) == "rownum":
+        return run(wrapped, {**user_params, "max_rows": n})
+    try:
+        return run(sql_fetch, user_params)
+    except Exception as e:
+        s = str(e)
+
+        if not any(code in s for code in _ROW_LIMIT_ERRORS):
+            raise
+        result = run(wrapped, {**user_params, "max_rows": n})
+        _remember_limit_form(key, "rownum")
+        return result
+
+
+@lru_cache(maxsize=SQL_REWRITE_CACHE_SIZE)
+def _offset_sql(sql_norm: str) -> Tuple[str, str]:
+    return (
+        f"{sql_norm} OFFSET :page_offset ROWS FETCH NEXT :max_rows ROWS ONLY",
+        "SELECT * FROM (SELECT page_q.*, ROWNUM AS page_rn FROM "
+        f"({sql_norm}) page_q WHERE ROWNUM <= :page_end) WHERE page_rn > :page_offset",
+    )
+
+
+def _run_offset(
+    conn, alias: str, sql_norm: str, n: int, offset: int, user_params, run
+) -> bool:
+    # 回傳 True 表示用了 ROWNUM 包裝（11g 以前），結果最後多一個 PAGE_RN 欄
+    sql_offset, wrapped = _offset_sql(sql_norm)
+    wrapped_binds = {**user_params, "page_offset": offset, "page_end": offset + n}
+    key = (alias, _server_version(conn), sql_norm)
+    if _limit_form(key) == "rownum":
+        run(wrapped, wrapped_binds)
+        return True
+    try:
+        run(sql_offset, {**user_params, "page_offset": offset, "max_rows": n})
+        return False
+    except Exception as e:
+        if not any(code in str(e) for code in _ROW_LIMIT_ERRORS):
+            raise
+        run(wrapped, wrapped_binds)
+        _remember_limit_form(key, "rownum")
+        return True
+
+
+def _quote_ident(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _bind_name(name: str) -> str:
+    return f":{name}"
+
+
+@lru_cache(maxsize=SQL_REWRITE_CACHE_SIZE)
+def _keyset_sql(sql_norm: str, order: paging.Order) -> str:
+    head = paging.split_order_by(sql_norm)[0]
+    return (
+        f"SELECT * FROM ({head}) "
+        f"WHERE {paging.keyset_where(order, _quote_ident, _bind_name)} "
+        f"ORDER BY {paging.order_clause(order, _quote_ident)}"
+    )
+
+
+def _sn_route() -> List[str]:
+    return db_router.order(
+        DEFAULT_DB_ALIAS, FALLBACK_DB_ALIAS if FALLBACK_TO_VNAP else None
+    )
+
+
+def route_summary() -> str:
+    return db_router.describe(
+        DEFAULT_DB_ALIAS, FALLBACK_DB_ALIAS if FALLBACK_TO_VNAP else None
+    )
+
+
+def _breaker_error(alias: str) -> RuntimeError:
+    return RuntimeError(
+        f"{alias} 連線異常，斷路器開啟中（{db_router.DB_BREAKER_COOLDOWN}s 後重試）"
+    )
+
+
+def _exec_routed(
+    sql: str,
+    binds: Dict[str, Any],
+    aliases: List[str],
+    timings: Optional[Dict[str, Any]] = None,
+):
+    last_err: Optional[BaseException] = None
+    for alias in aliases:
+        if not db_router.allow(alias):
+            last_err = last_err or _breaker_error(alias)
+            continue
+        t0 = time.perf_counter()
+        try:
+            result = _exec_once(sql, binds, alias, timings)
+        except Exception as e:
+            if db_router.is_route_error(e):
+                db_router.record(alias, False, error=str(e))
+                last_err = e
+                continue
+            db_router.record(alias, True, time.perf_counter() - t0)
+            raise
+        db_router.record(alias, True, time.perf_counter() - t0)
+        return result
+    raise RuntimeError(f"資料庫皆無法使用（{', '.join(aliases)}）：{last_err}")
+
+
+_HEDGE_POOL: Optional[ThreadPoolExecutor] = None
+
+
+def _exec_hedged(
+    sql: str,
+    binds: Dict[str, Any],
+    aliases: List[str],
+    timings: Optional[Dict[str, Any]] = None,
+):
+    global _HEDGE_POOL
+    if DB_HEDGE_AFTER_MS <= 0 or len(aliases) < 2:
+        return _exec_routed(sql, binds, aliases, timings)
+    with _POOL_LOCK:
+        if _HEDGE_POOL is None:
+            _HEDGE_POOL = ThreadPoolExecutor(
+                max_workers=4, thread_name_prefix="db-hedge"
+            )
+    # 每個嘗試各自計時，只回報勝出者的分段時間
+    attempts: Dict[Any, Dict[str, Any]] = {}
+    t: Dict[str, Any] = {}
+    attempts[_HEDGE_POOL.submit(_exec_routed, sql, binds, aliases, t)] = t
+    done, _ = wait(attempts, timeout=DB_HEDGE_AFTER_MS / 1000)
+    if not done:
+        t = {}
+        attempts[_HEDGE_POOL.submit(_exec_routed, sql, binds, aliases[1:], t)] = t
+    first_err: Optional[BaseException] = None
+    pending = set(attempts)
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for fut in done:
+            try:
+                result = fut.result()
+            except Exception as e:
+                first_err = first_err or e
+                continue
+            if timings is not None:
+                timings.update(attempts[fut])
+            return result
+    raise first_err
+
+
+def _query_sn(
+    sn: str, timings: Optional[Dict[str, Any]] = None
+) -> Optional[Tuple[Any, Any, Any]]:
+    _, _, rows = _exec_hedged(ORACLE_SQL_SN, {"sn": sn}, _sn_route(), timings)
     return rows[0] if rows else None
 
 
-def call_sql_raw(
+def call_sql_by_sn(
+    sn: str, use_cache: bool = True, timings: Optional[Dict[str, Any]] = None
+) -> Optional[Tuple[Any, Any, Any]]:
+
+    with stage(timings, "total"):
+        if not use_cache:
+            return _query_sn(sn, timings)
+        import local_cache
+
+        row = local_cache.cached_lookup("r109", sn, lambda: _query_sn(sn, timings))
+        return tuple(row) if row else None
+
+
+def _iter_chunks(items: Iterable[str], size: int) -> Iterator[List[str]]:
+    chunk: List[str] = []
+    for it in items:
+        chunk.append(it)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def call_sql_by_sns(
+    sns: Iterable[str], chunk_size: int = SQL_SN_CHUNK
+) -> Iterator[Tuple[str, Optional[Tuple[Any, Any, Any]]]]:
+
+    size = max(1, min(int(chunk_size), 1000))
+    # 固定 bind 數量（不足補 NULL），讓每個 chunk 共用同一個 SQL 文字與游標快取
+    names = [f"sn{i}" for i in range(size)]
+    sql = ORACLE_SQL_SN_IN.format(binds=", ".join(f":{n}" for n in names))
+
+    alias = next((a for a in _sn_route() if db_router.allow(a)), None)
+    if alias is None:
+        raise _breaker_error(DEFAULT_DB_ALIAS)
+    t0, recorded = time.perf_counter(), False
+    try:
+        conn = get_conn(alias)
+        with conn:
+            with conn.cursor() as cur:
+                cur.arraysize = size
+                for chunk in _iter_chunks(sns, size):
+                    uniq = list(dict.fromkeys(chunk))
+                    binds = {
+                        n: (uniq[i] if i < len(uniq) else None)
+                        for i, n in enumerate(names)
+                    }
+                    cur.execute(sql, binds)
+                    if not recorded:
+                        db_router.record(alias, True, time.perf_counter() - t0)
+                        recorded = True
+                    found: Dict[str, Tuple[Any, Any, Any]] = {}
+                    for r in cur.fetchall():
+                        found.setdefault(r[1], tuple(r))
+                    for sn in chunk:
+                        yield sn, found.get(sn)
+    except Exception as e:
+        if db_router.is_route_error(e):
+            db_router.record(alias, False, error=str(e))
+            recorded = True
+        elif not recorded:
+            db_router.record(alias, True, time.perf_counter() - t0)
+            recorded = True
+        raise
+    finally:
+        # 每個出口都要記錄一次：半開狀態的試探旗標只有 record() 會清掉，
+        # sns 為空或呼叫端提前結束時沒有執行任何 chunk 也算成功
+        if not recorded:
+            db_router.record(alias, True, time.perf_counter() - t0)
+
+
+def _prepare_raw(
     sql_text: str,
-    max_rows: int = SQL_MAX_ROWS,
-    params: Optional[Dict[str, Any]] = None,
-) -> Dict[str, Any]:
+    max_rows: int,
+    params: Optional[Dict[str, Any]],
+    auto_bind: Optional[bool] = None,
+) -> Tuple[str, int, Dict[str, Any]]:
 
     if not sql_text.strip():
         raise RuntimeError("請輸入 SQL 指令")
 
-    import re
-
     sql_norm = normalize_sql_user_friendly(sql_text)
-    if not re.match(r"(?is)^\s*select\b", sql_norm):
+    if not _SELECT_RE.match(sql_norm):
         raise RuntimeError("只允許 SELECT 查詢（不要使用 INSERT/UPDATE/DELETE/DDL）")
 
     n = int(max_rows)
     user_params = dict(params or {})
     user_params.pop("max_rows", None)
+    if settings.SQL_AUTO_BIND if auto_bind is None else auto_bind:
+        sql_norm, literals = parameterize_literals(sql_norm)
+        user_params = {**literals, **user_params}
+    sql_norm, user_params = expand_array_binds(sql_norm, user_params)
+    return sql_norm, n, user_params
+
+
+def _iter_raw_tuples(
+    sql_norm: str,
+    n: int,
+    user_params: Dict[str, Any],
+    alias: str = "vnap",
+    *,
+    fallback: Optional[str] = None,
+    handle: Optional[Dict[str, Any]] = None,
+    call_timeout: Optional[int] = None,
+    timings: Optional[Dict[str, Any]] = None,
+    page: Optional[Dict[str, Any]] = None,
+    decimals: bool = False,
+) -> Iterator[Tuple[List[Any], List[Tuple[Any, ...]]]]:
+
+    aliases = db_router.order(alias, fallback)
+    last_err: Optional[BaseException] = None
+    for target in aliases:
+        if not db_router.allow(target):
+            last_err = last_err or _breaker_error(target)
+            continue
+        t0 = time.perf_counter()
+        started = False
+        try:
+            with stage(timings, "connect"):
+                conn = get_conn(target)
+            with conn:
+                if timings is not None:
+                    timings["source"] = target
+                if handle is not None:
+                    handle["conn"] = conn
+                    handle["alias"] = target
+                if call_timeout:
+                    conn.call_timeout = int(call_timeout) * 1000
+                try:
+                    batches = _fetch_raw_tuples(
+                        conn, target, sql_norm, n, user_params, timings, page, decimals
+                    )
+                    first = next(batches)
+                    db_router.record(target, True, time.perf_counter() - t0)
+                    started = True
+                    yield first
+                    yield from batches
+                finally:
+                    if handle is not None:
+                        handle.pop("conn", None)
+                    if call_timeout:
+                        conn.call_timeout = 0
+            return
+        except Exception as e:
+            if not db_router.is_route_error(e):
+                if not started:
+                    db_router.record(target, True, time.perf_counter() - t0)
+                raise
+            db_router.record(target, False, error=str(e))
+            # 已經輸出資料就不能換 DSN 重來
+            if started:
+                raise
+            last_err = e
+    raise RuntimeError(f"資料庫皆無法使用（{', '.join(aliases)}）：{last_err}")
+
+
+def _fetch_raw_tuples(
+    conn,
+    alias: str,
+    sql_norm: str,
+    n: int,
+    user_params: Dict[str, Any],
+    timings: Optional[Dict[str, Any]] = None,
+    page: Optional[Dict[str, Any]] = None,
+    decimals: bool = False,
+) -> Iterator[Tuple[List[Any], List[Tuple[Any, ...]]]]:
+
+    mode = paging.begin(page) if page is not None else "first"
+    # 分頁時多抓一列判斷頁界（見 paging.take）
+    limit = n + 1 if page is not None else n
+    trim = False
+    with conn.cursor() as cur:
+        if decimals:
+            cur.outputtypehandler = _decimal_output_handler
+        cur.prefetchrows = min(n + 1, SQL_ARRAYSIZE_MAX)
+        cur.arraysize = min(max(n, 1), SQL_ARRAYSIZE_MAX)
+
+        def run(sql, binds):
+            return _execute(cur, sql, binds)
+
+        with stage(timings, "execute"):
+            if mode == "keyset":
+                binds = {**user_params, **paging.keyset_binds(page)}
+                sql_page = _keyset_sql(sql_norm, page["order"])
+                _run_row_limited(conn, alias, sql_page, limit, binds, run)
+            elif mode == "offset":
+                trim = _run_offset(
+                    conn, alias, sql_norm, limit, page["fetched"], user_params, run
+                )
+            else:
+                _run_row_limited(conn, alias, sql_norm, limit, user_params, run)
+
+        desc = list(cur.description or [])
+        if trim:
+            desc = desc[:-1]
+        if not desc:
+            yield desc, []
+            return
+        cur.arraysize = fetch_batch_size(desc, n)
+        emitted = False
+        while True:
+            with stage(timings, "fetch"):
+                rows = cur.fetchmany()
+            if not rows:
+                break
+            if trim:
+                rows = [r[:-1] for r in rows]
+            if page is not None:
+                rows = paging.take(page, rows, n)
+                if not rows:
+                    break
+                paging.track(page, sql_norm, desc, rows)
+            emitted = True
+            yield desc, rows
+        if not emitted:
+            yield desc, []
+    if page is not None:
+        paging.finish(page, n)
+
+
+def _iter_raw_rows(
+    sql_norm: str,
+    n: int,
+    user_params: Dict[str, Any],
+    alias: str = "vnap",
+    *,
+    timings: Optional[Dict[str, Any]] = None,
+    **kw,
+) -> Iterator[Tuple[List[str], List[Dict[str, Any]]]]:
+
+    cols: List[str] = []
+    convs = None
+    for desc, rows in _iter_raw_tuples(
+        sql_norm, n, user_params, alias, timings=timings, **kw
+    ):
+        with stage(timings, "convert"):
+            if convs is None:
+                cols = [d[0] for d in desc]
+                convs = column_converters(desc, rows)
+            dicts = rows_to_dicts(cols, rows, convs)
+        yield cols, dicts
+
+
+def iter_sql_raw_values(
+    sql_text: str,
+    max_rows: int = SQL_MAX_ROWS,
+    params: Optional[Dict[str, Any]] = None,
+) -> Iterator[Tuple[List[Any], List[Tuple[Any, ...]]]]:
+
+    sql_norm, n, user_params = _prepare_raw(sql_text, max_rows, params)
+    return _iter_raw_tuples(sql_norm, n, user_params, decimals=True)
 
+
+def supports_native_df(exact_decimals: bool = False) -> bool:
     try:
-        sql_with_hint = _inject_first_rows_hint(_strip_trailing_semicolon(sql_norm), n)
-        sql_fetch = f"{sql_with_hint} FETCH FIRST {n} ROWS ONLY"
-        _, cols, rows = _exec_once(sql_fetch, user_params, alias="vnap")
-    except Exception as e:
-        s = str(e)
+        import oracledb
+
+        if exact_decimals and not oracledb.defaults.fetch_decimals:
+            # 驅動的 DataFrame 只有 fetch_decimals 開啟時才把 NUMBER(p,s) 轉成 decimal128
+            return False
+        return hasattr(oracledb.Connection, "fetch_df_batches")
+    except Exception:
+        return False
+
+
+def _iter_df_batches(
+    sql_norm: str, n: int, user_params: Dict[str, Any], alias: str = "vnap"
+) -> Iterator[Any]:
+
+    size = min(max(n, 1), SQL_ARRAYSIZE_MAX)
+    with get_conn(alias) as conn:
+
+        def run(sql, binds):
+            batches = conn.fetch_df_batches(sql, parameters=binds, size=size)
+            return batches, next(batches, None)
+
+        batches, first = _run_row_limited(conn, alias, sql_norm, n, user_params, run)
+        if first is None:
+            return
+        yield first
+        yield from batches
+
+
+def iter_sql_raw_df(
+    sql_text: str,
+    max_rows: int = SQL_MAX_ROWS,
+    params: Optional[Dict[str, Any]] = None,
+) -> Iterator[Any]:
+
+    if not supports_native_df():
+        raise RuntimeError("目前的 oracledb 版本不支援 fetch_df_batches")
+    sql_norm, n, user_params = _prepare_raw(sql_text, max_rows, params)
+    return _iter_df_batches(sql_norm, n, user_params)
 
-        if any(code in s for code in ("ORA-00933", "ORA-00923", "ORA-32034")):
-            wrapped = f"SELECT * FROM ({sql_norm}) WHERE ROWNUM <= :max_rows"
-            binds = {**user_params, "max_rows": n}
-            _, cols, rows = _exec_once(wrapped, binds, alias="vnap")
-        else:
-            raise
 
-    data: List[Dict[str, Any]] = [
-        {cols[i]: jsonable(r[i]) for i in range(len(cols))} for r in rows
-    ]
-    return {"columns": cols, "rows": data, "rowcount": len(data), "binds": user_params}
+def iter_sql_raw(
+    sql_text: str,
+    max_rows: int = SQL_MAX_ROWS,
+    params: Optional[Dict[str, Any]] = None,
+    *,
+    fallback: Optional[str] = None,
+    handle: Optional[Dict[str, Any]] = None,
+    call_timeout: Optional[int] = None,
+    timings: Optional[Dict[str, Any]] = None,
+    page: Optional[Dict[str, Any]] = None,
+    alias: str = "vnap",
+    auto_bind: Optional[bool] = None,
+) -> Iterator[Tuple[List[str], List[Dict[str, Any]]]]:
+
+    sql_norm, n, user_params = _prepare_raw(sql_text, max_rows, params, auto_bind)
+    paging.check(page)
+    return _iter_raw_rows(
+        sql_norm,
+        n,
+        user_params,
+        alias,
+        fallback=fallback,
+        handle=handle,
+        call_timeout=call_timeout,
+        timings=timings,
+        page=page,
+    )
+
+
+def cancel_query(handle: Dict[str, Any]) -> bool:
+    handle["cancelled"] = True
+    conn = handle.get("conn")
+    if conn is None:
+        return False
+    try:
+        conn.cancel()
+        return True
+    except Exception:
+        return False
+
+
+def raw_cache_key(
+    sql_text: str,
+    max_rows: int = SQL_MAX_ROWS,
+    params: Optional[Dict[str, Any]] = None,
+    fallback: Optional[str] = None,
+    auto_bind: Optional[bool] = None,
+):
+    sql_norm, n, user_params = _prepare_raw(sql_text, max_rows, params, auto_bind)
+    alias = "vnap" if not fallback else f"vnap>{fallback}"
+    return result_cache.make_key(
+        alias, _strip_trailing_semicolon(sql_norm), user_params, n
+    )
+
+
+_PLAN_SQL = (
+    "SELECT ID, DEPTH, OPERATION, OPTIONS, OBJECT_OWNER, OBJECT_NAME, CARDINALITY, COST"
+    " FROM PLAN_TABLE WHERE STATEMENT_ID = :sid ORDER BY ID"
+)
+_FULL_SCAN_OPS = {"TABLE ACCESS FULL", "MAT_VIEW ACCESS FULL"}
+
+
+def explain_sql_raw(
+    sql_text: str,
+    max_rows: int = SQL_MAX_ROWS,
+    params: Optional[Dict[str, Any]] = None,
+    alias: str = "vnap",
+    auto_bind: Optional[bool] = None,
+    timings: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+
+    # 對實際會送出的語句（含 FETCH FIRST / ROWNUM 改寫）做 EXPLAIN PLAN，不執行查詢
+    sql_norm, n, user_params = _prepare_raw(sql_text, max_rows, params, auto_bind)
+    sid = f"sop_{uuid.uuid4().hex[:24]}"
+    with stage(timings, "connect"):
+        conn = get_conn(alias)
+    with conn:
+        try:
+            with conn.cursor() as cur:
+
+                def run(sql, binds):
+                    explain = f"EXPLAIN PLAN SET STATEMENT_ID = '{sid}' FOR {sql}"
+                    return _execute(cur, explain, binds)
+
+                with stage(timings, "execute"):
+                    _run_row_limited(conn, alias, sql_norm, n, user_params, run)
+                    cur.execute(_PLAN_SQL, {"sid": sid})
+                    rows = cur.fetchall()
+        finally:
+            # 寫進 PLAN_TABLE 的列直接回滾，連線回到連線池時不留交易
+            conn.rollback()
+    steps = []
+    for step_id, depth, op, options, owner, name, card, cost in rows:
+        operation = f"{op} {options or ''}".strip()
+        steps.append(
+            {
+                "id": step_id,
+                "depth": depth or 0,
+                "operation": operation,
+                "object": ".".join(p for p in (owner, name) if p),
+                "rows": card,
+                "cost": cost,
+                "full_scan": operation in _FULL_SCAN_OPS,
+                "cartesian": operation == "MERGE JOIN CARTESIAN",
+            }
+        )
+    # rows 取各步驟 CARDINALITY 的最大值（資料庫要處理的最大中間結果），不是回傳筆數：
+    # 計畫是對加了 FETCH FIRST / ROWNUM 的語句取得的，最上層的筆數不會超過 max_rows
+    cards = [s["rows"] for s in steps if s["rows"] is not None]
+    return {
+        "target": alias,
+        "cost": steps[0]["cost"] if steps else None,
+        "rows": max(cards) if cards else None,
+        "steps": steps,
+    }
+
+
+def call_sql_raw(
+    sql_text: str,
+    max_rows: int = SQL_MAX_ROWS,
+    params: Optional[Dict[str, Any]] = None,
+    fallback: Optional[str] = None,
+    use_cache: bool = True,
+    refresh: bool = False,
+    timings: Optional[Dict[str, Any]] = None,
+    page: Optional[Dict[str, Any]] = None,
+    auto_bind: Optional[bool] = None,
+) -> Dict[str, Any]:
+
+    t0 = time.perf_counter()
+    sql_norm, n, user_params = _prepare_raw(sql_text, max_rows, params, auto_bind)
+    paging.check(page)
+
+    def load() -> Dict[str, Any]:
+        cols: List[str] = []
+        data: List[Dict[str, Any]] = []
+        for cols, batch in _iter_raw_rows(
+            sql_norm, n, user_params, fallback=fallback, timings=timings, page=page
+        ):
+            data.extend(batch)
+        res = {
+            "columns": cols,
+            "rows": data,
+            "rowcount": len(data),
+            "binds": user_params,
+        }
+        if page is not None:
+            res["page"] = dict(page)
+        return res
+
+    # 第二頁以後不走快取
+    if not use_cache or (page and page.get("mode")):
+        res = {**load(), "from_cache": False}
+    else:
+        key = raw_cache_key(sql_text, max_rows, params, fallback, auto_bind)
+        res = result_cache.cached(key, load, refresh=refresh)
+        if page is not None and res["from_cache"]:
+            paging.resume(page, res.get("page"), res["rowcount"], n)
+    if timings is not None:
+        add_timing(timings, "total", time.perf_counter() - t0)
+        res["timings"] = timings
+    return res
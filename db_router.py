@@ -0,0 +1,128 @@
+import re, threading, time
+from typing import Any, Dict, List, Optional
+
+import settings
+
+
+DB_BREAKER_FAILURES = getattr(settings, "DB_BREAKER_FAILURES", 3)
+DB_BREAKER_COOLDOWN = getattr(settings, "DB_BREAKER_COOLDOWN", 30)
+
+# 連線層級的錯誤才算 DSN 不健康；SQL 語法、權限等錯誤代表伺服器有回應
+_ROUTE_ERROR_RE = re.compile(
+    r"DPY-(?:4011|4024|6000|6005)|ORA-(?:12\d{3}|03113|03114|03135|02396|01033|01034)"
+)
+
+_lock = threading.Lock()
+_health: Dict[str, Dict[str, Any]] = {}
+_last_alias: Optional[str] = None
+
+
+def is_route_error(e: BaseException) -> bool:
+    return bool(_ROUTE_ERROR_RE.search(str(e))) or isinstance(
+        e, (TimeoutError, ConnectionError)
+    )
+
+
+def _state(alias: str) -> Dict[str, Any]:
+    st = _health.get(alias)
+    if st is None:
+        st = {
+            "failures": 0,
+            "open_until": 0.0,
+            "trial": False,
+            "latency_ms": None,
+            "ok": 0,
+            "errors": 0,
+            "last_error": "",
+        }
+        _health[alias] = st
+    return st
+
+
+def allow(alias: str) -> bool:
+    now = time.monotonic()
+    with _lock:
+        st = _state(alias)
+        if st["failures"] < DB_BREAKER_FAILURES:
+            return True
+        if now < st["open_until"] or st["trial"]:
+            return False
+        # 半開：冷卻結束後只放行一個試探請求
+        st["trial"] = True
+        return True
+
+
+def record(alias: str, ok: bool, latency: float = 0.0, error: str = ""):
+    global _last_alias
+    with _lock:
+        st = _state(alias)
+        st["trial"] = False
+        if ok:
+            _last_alias = alias
+            st["ok"] += 1
+            st["failures"] = 0
+            ms = latency * 1000
+            prev = st["latency_ms"]
+            st["latency_ms"] = ms if prev is None else prev * 0.8 + ms * 0.2
+        else:
+            st["errors"] += 1
+            st["failures"] += 1
+            st["last_error"] = error[:200]
+            if st["failures"] >= DB_BREAKER_FAILURES:
+                st["open_until"] = time.monotonic() + DB_BREAKER_COOLDOWN
+
+
+def is_open(alias: str) -> bool:
+    with _lock:
+        st = _state(alias)
+        return (
+            st["failures"] >= DB_BREAKER_FAILURES
+            and time.monotonic() < st["open_until"]
+        )
+
+
+def order(preferred: str, fallback: Optional[str] = None) -> List[str]:
+    aliases = [preferred]
+    if fallback and fallback != preferred:
+        aliases.append(fallback)
+    healthy = [a for a in aliases if not is_open(a)]
+    return healthy + [a for a in aliases if a not in healthy]
+
+
+def status() -> Dict[str, Dict[str, Any]]:
+    now = time.monotonic()
+    out: Dict[str, Dict[str, Any]] = {}
+    with _lock:
+        for alias, st in _health.items():
+            out[alias] = {
+                "state": (
+                    "open"
+                    if st["failures"] >= DB_BREAKER_FAILURES and now < st["open_until"]
+                    else (
+                        "half-open"
+                        if st["failures"] >= DB_BREAKER_FAILURES
+                        else "closed"
+                    )
+                ),
+                "latency_ms": (
+                    None if st["latency_ms"] is None else round(st["latency_ms"], 1)
+                ),
+                "ok": st["ok"],
+                "errors": st["errors"],
+                "last_error": st["last_error"],
+            }
+    return out
+
+
+def describe(preferred: str, fallback: Optional[str] = None) -> str:
+    st = status()
+    parts = []
+    for alias in order(preferred, fallback):
+        info = st.get(alias)
+        if not info:
+            parts.append(f"{alias}(未使用)")
+            continue
+        lat = "" if info["latency_ms"] is None else f" {info['latency_ms']}ms"
+        parts.append(f"{alias}({info['state']}{lat})")
+    last = f"  last={_last_alias}" if _last_alias else ""
+    return " → ".join(parts) + last
@@ -0,0 +1,280 @@
+import queue, threading, time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from settings import SQL_MAX_ROWS
+from timing import add as add_timing, rounded
+
+SOURCE_COLUMN = "SOURCE_DB"
+MYSQL_TARGET = "mysql"
+
+# 每個目標最多先排幾批在佇列裡；消費端慢時生產端會等待，不會整包堆在記憶體
+_QUEUE_BATCHES = 4
+
+
+def available_targets() -> List[str]:
+    from db_oracle import DBS
+
+    return [a for a, cfg in DBS.items() if cfg.get("dsn")] + [MYSQL_TARGET]
+
+
+def parse_targets(text: str) -> List[str]:
+    # "primary,vnap,mysql"；"all" = 所有已設定 DSN 的 Oracle 別名加上 MySQL
+    out: List[str] = []
+    for t in (text or "").replace(" ", ",").split(","):
+        t = t.strip().lower()
+        for name in available_targets() if t == "all" else [t] if t else []:
+            if name not in out:
+                out.append(name)
+    return out
+
+
+def _check_targets(targets: Sequence[str]) -> List[str]:
+    from db_oracle import DBS
+
+    targets = list(dict.fromkeys(targets))
+    if not targets:
+        raise RuntimeError("請指定至少一個查詢目標")
+    known = list(DBS) + [MYSQL_TARGET]
+    unknown = [t for t in targets if t not in known]
+    if unknown:
+        raise RuntimeError(
+            f"未知的查詢目標：{', '.join(unknown)}（可用：{', '.join(known)}）"
+        )
+    return targets
+
+
+def _iter_target(
+    target: str,
+    sql_text: str,
+    max_rows: int,
+    params: Optional[Dict[str, Any]],
+    call_timeout: Optional[int],
+    handle: Dict[str, Any],
+    timings: Dict[str, Any],
+) -> Iterator[Tuple[List[str], List[Dict[str, Any]]]]:
+    if target == MYSQL_TARGET:
+        from db_mysql import iter_sql_raw_mysql
+
+        return iter_sql_raw_mysql(
+            sql_text,
+            max_rows,
+            params,
+            handle=handle,
+            call_timeout=call_timeout,
+            timings=timings,
+        )
+    from db_oracle import iter_sql_raw
+
+    # 明確指定的目標不做 DSN 備援，否則同一份資料可能被查兩次
+    return iter_sql_raw(
+        sql_text,
+        max_rows,
+        params,
+        alias=target,
+        handle=handle,
+        call_timeout=call_timeout,
+        timings=timings,
+    )
+
+
+def _cancel(target: str, handle: Dict[str, Any]):
+    try:
+        if target == MYSQL_TARGET:
+            from db_mysql import cancel_query_mysql
+
+            cancel_query_mysql(handle)
+        else:
+            from db_oracle import cancel_query
+
+            cancel_query(handle)
+    except Exception:
+        pass
+
+
+def _put(out: "queue.Queue", stop: threading.Event, item) -> bool:
+    while not stop.is_set():
+        try:
+            out.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _run_target(
+    target: str,
+    query: Tuple[Any, ...],
+    handle: Dict[str, Any],
+    st: Dict[str, Any],
+    out: "queue.Queue",
+    stop: threading.Event,
+):
+    t0 = time.perf_counter()
+    timings: Dict[str, Any] = {}
+    try:
+        it = _iter_target(target, *query, handle, timings)
+        try:
+            for cols, rows in it:
+                st["rows"] += len(rows)
+                if not _put(out, stop, (target, cols, rows)):
+                    st["status"] = "cancelled"
+                    break
+            else:
+                st["status"] = "ok"
+        finally:
+            it.close()
+    except Exception as e:
+        st["status"] = "cancelled" if stop.is_set() else "error"
+        st["error"] = (
+            str(e) if isinstance(e, RuntimeError) else f"{type(e).__name__}: {e}"
+        )
+    finally:
+        add_timing(timings, "total", time.perf_counter() - t0)
+        st["timings"] = rounded(timings)
+        _put(out, stop, (target, None, None))
+
+
+def iter_sql_raw_fanout(
+    sql_text: str,
+    targets: Sequence[str],
+    max_rows: int = SQL_MAX_ROWS,
+    params: Optional[Dict[str, Any]] = None,
+    *,
+    dedup: Optional[Sequence[str]] = None,
+    call_timeout: Optional[int] = None,
+    status: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Iterator[Tuple[List[str], List[Dict[str, Any]]]]:
+    # 同一個 SELECT 同時送到多個目標，先回來的批次先輸出；max_rows 為每個目標的上限。
+    # 每列加上 SOURCE_DB 欄；各目標的結果寫入 status（與 handle / timings 相同由呼叫端提供），
+    # 單一目標失敗不影響其他目標，全部失敗才拋出 RuntimeError
+    targets = _check_targets(targets)
+    if not sql_text or not sql_text.strip():
+        raise RuntimeError("請輸入 SQL 指令")
+    status = {} if status is None else status
+    for t in targets:
+        status[t] = {"status": "running", "rows": 0, "kept": 0, "error": None}
+
+    out: "queue.Queue" = queue.Queue(maxsize=_QUEUE_BATCHES * len(targets))
+    stop = threading.Event()
+    handles: Dict[str, Dict[str, Any]] = {t: {} for t in targets}
+    query = (sql_text, int(max_rows), params, call_timeout)
+    for t in targets:
+        threading.Thread(
+            target=_run_target,
+            args=(t, query, handles[t], status[t], out, stop),
+            name=f"fanout-{t}",
+            daemon=True,
+        ).start()
+    return _merge(targets, out, stop, handles, status, dedup)
+
+
+def _merge(
+    targets: List[str],
+    out: "queue.Queue",
+    stop: threading.Event,
+    handles: Dict[str, Dict[str, Any]],
+    status: Dict[str, Dict[str, Any]],
+    dedup: Optional[Sequence[str]],
+) -> Iterator[Tuple[List[str], List[Dict[str, Any]]]]:
+
+    # 欄名不分大小寫合併（Oracle 大寫、MySQL 保留原樣）；以第一次出現的寫法為準
+    columns = [SOURCE_COLUMN]
+    canon = {SOURCE_COLUMN.upper(): SOURCE_COLUMN}
+    seen = set() if dedup else None
+    pending = len(targets)
+    try:
+        while pending:
+            target, cols, rows = out.get()
+            if cols is None:
+                pending -= 1
+                continue
+            rename = {}
+            for c in cols:
+                name = canon.get(str(c).upper())
+                if name is None:
+                    canon[str(c).upper()] = c
+                    columns.append(c)
+                elif name != c:
+                    rename[c] = name
+            keys = None
+            if seen is not None:
+                keys = [canon.get(str(k).upper()) for k in dedup]
+                missing = [k for k, c in zip(dedup, keys) if c is None]
+                if missing:
+                    raise RuntimeError(f"去重欄位不存在：{', '.join(missing)}")
+            batch = []
+            for r in rows:
+                if rename:
+                    r = {rename.get(k, k): v for k, v in r.items()}
+                if keys is not None:
+                    key = tuple(r.get(k) for k in keys)
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                batch.append({SOURCE_COLUMN: target, **r})
+            status[target]["kept"] += len(batch)
+            if batch:
+                yield list(columns), batch
+    finally:
+        if pending:
+            # 消費端提前結束或合併出錯：通知各目標停止並取消仍在執行的查詢
+            stop.set()
+            for t in targets:
+                if status[t]["status"] == "running":
+                    _cancel(t, handles[t])
+
+    failed = [t for t in targets if status[t]["status"] == "error"]
+    if failed and len(failed) == len(targets):
+        detail = "；".join(f"{t}：{status[t]['error']}" for t in failed)
+        raise RuntimeError(f"所有目標皆查詢失敗（{detail}）")
+
+
+def call_sql_raw_fanout(
+    sql_text: str,
+    targets: Sequence[str],
+    max_rows: int = SQL_MAX_ROWS,
+    params: Optional[Dict[str, Any]] = None,
+    dedup: Optional[Sequence[str]] = None,
+    call_timeout: Optional[int] = None,
+    timings: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+
+    t0 = time.perf_counter()
+    status: Dict[str, Dict[str, Any]] = {}
+    cols: List[str] = [SOURCE_COLUMN]
+    data: List[Dict[str, Any]] = []
+    for cols, batch in iter_sql_raw_fanout(
+        sql_text,
+        targets,
+        max_rows,
+        params,
+        dedup=dedup,
+        call_timeout=call_timeout,
+        status=status,
+    ):
+        data.extend(batch)
+    res = {
+        "columns": cols,
+        "rows": data,
+        "rowcount": len(data),
+        "binds": dict(params or {}),
+        "targets": status,
+    }
+    if timings is not None:
+        add_timing(timings, "total", time.perf_counter() - t0)
+        res["timings"] = timings
+    return res
+
+
+def format_status(status: Dict[str, Dict[str, Any]]) -> str:
+    lines = []
+    for t, st in status.items():
+        ms = st.get("timings", {}).get("total_ms")
+        took = f" {ms:.0f}ms" if ms is not None else ""
+        if st["status"] == "error":
+            lines.append(f"[{t}] 失敗{took}：{st['error']}")
+        else:
+            dropped = st["rows"] - st["kept"]
+            extra = f"（重複略過 {dropped}）" if dropped else ""
+            lines.append(f"[{t}] {st['status']} {st['rows']} 筆{extra}{took}")
+    return "\n".join(lines)
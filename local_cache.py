@@ -0,0 +1,148 @@
+import json, os, sqlite3, threading, time
+from typing import Any, Callable, Optional, Tuple
+
+import settings
+
+
+LOCAL_DB = getattr(settings, "LOCAL_DB", "local_cache.db")
+CACHE_ENABLED = getattr(settings, "CACHE_ENABLED", True)
+CACHE_TTL = getattr(settings, "CACHE_TTL_HOURS", 6) * 3600
+CACHE_STALE = getattr(settings, "CACHE_STALE_HOURS", 24) * 3600
+CACHE_MAX_ENTRIES = getattr(settings, "CACHE_MAX_ENTRIES", 50000)
+
+_EVICT_EVERY = 256
+
+_local = threading.local()
+_lock = threading.Lock()
+_refreshing = set()
+_puts = 0
+
+
+def _conn() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        return conn
+    path = os.path.abspath(LOCAL_DB)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=5, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS sn_cache ("
+        " sn TEXT NOT NULL,"
+        " source TEXT NOT NULL,"
+        " payload TEXT NOT NULL,"
+        " fetched_at REAL NOT NULL,"
+        " accessed_at REAL NOT NULL,"
+        " PRIMARY KEY (sn, source))"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS ix_sn_cache_accessed ON sn_cache (accessed_at)"
+    )
+    _local.conn = conn
+    return conn
+
+
+def cache_get(source: str, sn: str) -> Optional[Tuple[Any, float]]:
+    conn = _conn()
+    row = conn.execute(
+        "SELECT payload, fetched_at FROM sn_cache WHERE sn = ? AND source = ?",
+        (sn, source),
+    ).fetchone()
+    if not row:
+        return None
+    now = time.time()
+    conn.execute(
+        "UPDATE sn_cache SET accessed_at = ? WHERE sn = ? AND source = ?",
+        (now, sn, source),
+    )
+    return json.loads(row[0]), now - row[1]
+
+
+def cache_put(source: str, sn: str, value: Any):
+    global _puts
+    now = time.time()
+    payload = json.dumps(value, ensure_ascii=False, default=str)
+    conn = _conn()
+    conn.execute(
+        "INSERT OR REPLACE INTO sn_cache (sn, source, payload, fetched_at, accessed_at)"
+        " VALUES (?, ?, ?, ?, ?)",
+        (sn, source, payload, now, now),
+    )
+    with _lock:
+        _puts += 1
+        due = _puts % _EVICT_EVERY == 0
+    if due:
+        evict()
+
+
+def evict(max_entries: Optional[int] = None) -> int:
+    limit = CACHE_MAX_ENTRIES if max_entries is None else int(max_entries)
+    conn = _conn()
+    total = conn.execute("SELECT COUNT(*) FROM sn_cache").fetchone()[0]
+    extra = total - limit
+    if extra <= 0:
+        return 0
+    conn.execute(
+        "DELETE FROM sn_cache WHERE rowid IN ("
+        " SELECT rowid FROM sn_cache ORDER BY accessed_at LIMIT ?)",
+        (extra,),
+    )
+    return extra
+
+
+def purge(source: Optional[str] = None) -> int:
+    conn = _conn()
+    if source:
+        cur = conn.execute("DELETE FROM sn_cache WHERE source = ?", (source,))
+    else:
+        cur = conn.execute("DELETE FROM sn_cache")
+    return cur.rowcount
+
+
+def _refresh(source: str, sn: str, loader: Callable[[], Any]):
+    key = (source, sn)
+    try:
+        value = loader()
+        if value is not None:
+            cache_put(source, sn, value)
+    except Exception:
+        pass
+    finally:
+        with _lock:
+            _refreshing.discard(key)
+
+
+def cached_lookup(
+    source: str, sn: str, loader: Callable[[], Any], *, refresh: bool = False
+) -> Any:
+    if not CACHE_ENABLED:
+        return loader()
+    hit = None
+    if not refresh:
+        try:
+            hit = cache_get(source, sn)
+        except Exception:
+            hit = None
+    if hit is not None:
+        value, age = hit
+        if age <= CACHE_TTL:
+            return value
+        if age <= CACHE_TTL + CACHE_STALE:
+            key = (source, sn)
+            with _lock:
+                start = key not in _refreshing
+                _refreshing.add(key)
+            if start:
+                threading.Thread(
+                    target=_refresh, args=(source, sn, loader), daemon=True
+                ).start()
+            return value
+
+    value = loader()
+    if value is not None:
+        try:
+            cache_put(source, sn, value)
+        except Exception:
+            pass
+    return value
@@ -0,0 +1,279 @@
+import hmac, json, sys, threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from settings import (
+    SERVE_HOST,
+    SERVE_PORT,
+    SERVE_WORKERS,
+    SERVE_TOKEN,
+    SERVE_MAX_ROWS,
+    SQL_MAX_ROWS,
+)
+from sql_utils import parse_bind_params
+
+
+_MAX_BODY = 1024 * 1024
+
+
+class _PooledHTTPServer(HTTPServer):
+    # 固定大小的執行緒池處理請求；同時查詢數有上限，DB 連線數也跟著受控
+    def __init__(self, addr, handler, workers: int):
+        super().__init__(addr, handler)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, workers), thread_name_prefix="serve"
+        )
+
+    def process_request(self, request, client_address):
+        self._executor.submit(self._work, request, client_address)
+
+    def _work(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _one(q: Dict[str, list], name: str, default: Any = None) -> Any:
+    v = q.get(name)
+    return v[0] if v else default
+
+
+def _flag(v: Any) -> bool:
+    if isinstance(v, str):
+        return v.strip().lower() in ("1", "true", "yes", "on")
+    return bool(v)
+
+
+def _sql_sn(req: Dict[str, Any]) -> Dict[str, Any]:
+    from db_oracle import call_sql_by_sn
+
+    sn = str(req.get("sn") or "").strip().strip("{}")
+    if not sn:
+        raise RuntimeError("請提供 sn")
+    timings: Dict[str, Any] = {}
+    row = call_sql_by_sn(sn, use_cache=not _flag(req.get("no_cache")), timings=timings)
+    out = None
+    if row:
+        out = {"MODEL_NAME": row[0], "SHIPPING_SN": row[1], "DATA1": row[2]}
+    return {"sn": sn, "row": out, "timings": timings}
+
+
+def _api(req: Dict[str, Any]) -> Dict[str, Any]:
+    from api_client import api_summary, call_api, summarize_api_payload
+
+    sn = str(req.get("sn") or "").strip().strip("{}")
+    if not sn:
+        raise RuntimeError("請提供 sn")
+    # 預設只回摘要（串流解析，不建立完整文件）；full=1 才附上完整 payload
+    full = _flag(req.get("full"))
+    timings: Dict[str, Any] = {}
+    payload = call_api(
+        sn,
+        use_cache=not _flag(req.get("no_cache")),
+        timings=timings,
+        summary_only=not full,
+    )
+    out = {
+        "sn": sn,
+        "summary": summarize_api_payload(payload),
+        "fields": api_summary(payload),
+        "timings": timings,
+    }
+    if full:
+        out["payload"] = payload
+    return out
+
+
+def _max_rows(v: Any) -> int:
+    if v is None or v == "":
+        return min(SQL_MAX_ROWS, SERVE_MAX_ROWS)
+    try:
+        n = int(v)
+    except (TypeError, ValueError):
+        raise RuntimeError(f"max_rows 必須是正整數：{v!r}") from None
+    if n <= 0:
+        raise RuntimeError(f"max_rows 必須是正整數：{v!r}")
+    return min(n, SERVE_MAX_ROWS)
+
+
+def _raw_args(req: Dict[str, Any]) -> Tuple[str, int, Dict[str, Any]]:
+    sql = str(req.get("sql") or "")
+    max_rows = _max_rows(req.get("max_rows"))
+    params = req.get("params") or {}
+    if isinstance(params, str):
+        params = parse_bind_params(params)
+    return sql, max_rows, params
+
+
+def _sql_raw(req: Dict[str, Any]) -> Dict[str, Any]:
+    from db_oracle import call_sql_raw
+
+    sql, max_rows, params = _raw_args(req)
+    return call_sql_raw(
+        sql,
+        max_rows=max_rows,
+        params=params,
+        fallback=req.get("fallback") or None,
+        use_cache=not _flag(req.get("no_cache")),
+        refresh=_flag(req.get("refresh")),
+        timings={},
+        auto_bind=_flag(req["auto_bind"]) if "auto_bind" in req else None,
+    )
+
+
+def _mysql_raw(req: Dict[str, Any]) -> Dict[str, Any]:
+    from db_mysql import call_sql_raw_mysql
+
+    sql, max_rows, params = _raw_args(req)
+    return call_sql_raw_mysql(
+        sql,
+        max_rows=max_rows,
+        params=params,
+        use_cache=not _flag(req.get("no_cache")),
+        refresh=_flag(req.get("refresh")),
+        timings={},
+    )
+
+
+def _health(req: Dict[str, Any]) -> Dict[str, Any]:
+    import result_cache
+
+    out: Dict[str, Any] = {"status": "ok", "result_cache": result_cache.stats()}
+    if "db_oracle" in sys.modules:
+        db_oracle = sys.modules["db_oracle"]
+        out["pools"] = db_oracle.pool_stats()
+        out["route"] = db_oracle.route_summary()
+    if "db_mysql" in sys.modules:
+        out["mysql_pool"] = sys.modules["db_mysql"].mysql_pool_stats()
+    return out
+
+
+ROUTES: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    "/health": _health,
+    "/sql_sn": _sql_sn,
+    "/api": _api,
+    "/sql_raw": _sql_raw,
+    "/mysql_raw": _mysql_raw,
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "sop-probe"
+    # 閒置的 keep-alive 連線過久會佔住 worker
+    timeout = 15
+    # 標頭與本文分兩次寫出，不關 Nagle 會被延遲 ACK 卡住約 40ms
+    disable_nagle_algorithm = True
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send(self, status: int, body: Dict[str, Any]):
+        data = json.dumps(body, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _authorized(self) -> bool:
+        if not SERVE_TOKEN:
+            return True
+        return hmac.compare_digest(self.headers.get("X-Token", ""), SERVE_TOKEN)
+
+    def _dispatch(self, req: Dict[str, Any]):
+        path = urlsplit(self.path).path.rstrip("/") or "/"
+        fn = ROUTES.get(path)
+        if fn is None:
+            self._send(404, {"error": f"未知的路徑：{path}", "routes": list(ROUTES)})
+            return
+        if not self._authorized():
+            self._send(401, {"error": "X-Token 不正確"})
+            return
+        try:
+            self._send(200, fn(req))
+        except RuntimeError as e:
+            self._send(400, {"error": str(e)})
+        except Exception as e:
+            self._send(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def do_GET(self):
+        q = parse_qs(urlsplit(self.path).query)
+        self._dispatch({k: _one(q, k) for k in q})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > _MAX_BODY:
+            self._send(413, {"error": "請求內容過大"})
+            self.close_connection = True
+            return
+        raw = self.rfile.read(length) if length else b""
+        try:
+            req = json.loads(raw.decode("utf-8")) if raw else {}
+        except ValueError:
+            self._send(400, {"error": "請求內容不是合法的 JSON"})
+            return
+        if not isinstance(req, dict):
+            self._send(400, {"error": "請求內容必須是 JSON 物件"})
+            return
+        q = parse_qs(urlsplit(self.path).query)
+        self._dispatch({**{k: _one(q, k) for k in q}, **req})
+
+
+def _warm_up():
+    # 先建立 Oracle 連線池與 API session，第一個請求就不必等連線
+    try:
+        import db_oracle
+
+        db_oracle.get_pool()
+    except Exception as e:
+        print(f"[serve] Oracle 連線池預熱失敗：{e}", file=sys.stderr)
+    try:
+        import api_client
+
+        api_client._get_session()
+    except Exception as e:
+        print(f"[serve] API session 初始化失敗：{e}", file=sys.stderr)
+
+
+def make_server(
+    host: str = SERVE_HOST, port: int = SERVE_PORT, workers: int = SERVE_WORKERS
+) -> HTTPServer:
+    return _PooledHTTPServer((host, port), _Handler, workers)
+
+
+def serve(
+    host: Optional[str] = None,
+    port: Optional[int] = None,
+    workers: Optional[int] = None,
+):
+    server = make_server(
+        host or SERVE_HOST, port or SERVE_PORT, workers or SERVE_WORKERS
+    )
+    threading.Thread(target=_warm_up, daemon=True).start()
+    addr, bound = server.server_address[:2]
+    print(
+        f"查詢服務啟動：http://{addr}:{bound}  路徑：{', '.join(ROUTES)}"
+        f"  workers={workers or SERVE_WORKERS}"
+        f"  token={'on' if SERVE_TOKEN else 'off'}",
+        file=sys.stderr,
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if "db_oracle" in sys.modules:
+            sys.modules["db_oracle"].close_pools()
+        if "db_mysql" in sys.modules:
+            sys.modules["db_mysql"].close_mysql_pool()
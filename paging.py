@@ -0,0 +1,285 @@
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# 分頁狀態放在呼叫端傳入的 dict（與 handle / timings 相同），同一個 dict 再傳一次就取下一頁：
+#   mode     None = 第一頁；"keyset" = 以上一頁最後一列的排序值續查；"offset" = 跳過已取得的筆數
+#   order    ((欄位位置, 欄位名, 是否 DESC), ...)；None 表示不能用 keyset
+#   last     上一頁最後一列的排序欄位值（驅動回傳的原始型別，直接當 bind 用）
+#   fetched  累計筆數；page_rows 本頁筆數；done 已經沒有下一頁
+# 分頁查詢每頁多抓一列（n + 1），那一列只用來判斷頁界（見 take / finish），不輸出
+
+Order = Tuple[Tuple[int, str, bool], ...]
+
+_ORDER_BY_RE = re.compile(r"(?i)\border\s+by\b")
+_IDENT = r'(?:"[^"]+"|`[^`]+`|\w+)'
+_ORDER_ITEM_RE = re.compile(
+    rf"(?is)^\s*((?:{_IDENT}\s*\.\s*)*)({_IDENT})\s*(asc|desc)?\s*$"
+)
+_SELECT_RE = re.compile(r"(?i)\bselect\b(?:\s+(?:distinct|unique|all)\b)?")
+_FROM_RE = re.compile(r"(?i)\bfrom\b")
+_FROM_END_RE = re.compile(
+    r"(?i)\b(?:where|group|having|order|union|intersect|minus|except|connect"
+    r"|start|fetch|offset|limit|for)\b"
+)
+_JOIN_RE = re.compile(r"(?i),|\bjoin\b")
+_COLUMN_RE = re.compile(rf"(?s)^(?:{_IDENT}\s*\.\s*)*({_IDENT})$")
+_ALIAS_RE = re.compile(rf"(?is)\s(?:as\s+)?({_IDENT})$")
+
+
+def _mask(sql: str) -> str:
+    # 字串、引號識別字、註解（含 hint）與括號內的內容換成空白，只留最外層結構；長度不變
+    out = list(sql)
+    i, n, depth = 0, len(sql), 0
+    while i < n:
+        ch = sql[i]
+        if ch in "'\"`":
+            end = sql.find(ch, i + 1)
+            end = n - 1 if end < 0 else end
+            out[i : end + 1] = " " * (end + 1 - i)
+            i = end + 1
+            continue
+        if sql.startswith("--", i):
+            end = sql.find("\n", i)
+            end = n if end < 0 else end
+            out[i:end] = " " * (end - i)
+            i = end
+            continue
+        if sql.startswith("/*", i):
+            end = sql.find("*/", i + 2)
+            end = n if end < 0 else end + 2
+            out[i:end] = " " * (end - i)
+            i = end
+            continue
+        if ch == "(":
+            depth += 1
+            if depth > 1:
+                out[i] = " "
+        elif ch == ")":
+            if depth > 1:
+                out[i] = " "
+            depth = max(0, depth - 1)
+        elif depth:
+            out[i] = " "
+        i += 1
+    return "".join(out)
+
+
+@lru_cache(maxsize=256)
+def split_order_by(
+    sql: str,
+) -> Optional[Tuple[str, Tuple[Tuple[str, bool, bool, bool], ...]]]:
+    # 拆出最外層、位於結尾的 ORDER BY；只接受單純欄位（可加 ASC/DESC），其餘回傳 None。
+    # 每項為 (欄位名, 是否加引號, 是否 DESC, 是否帶表格前置詞)
+    masked = _mask(sql)
+    found = None
+    for found in _ORDER_BY_RE.finditer(masked):
+        pass
+    if found is None:
+        return None
+    tail, masked_tail = sql[found.end() :], masked[found.end() :]
+    parts, start = [], 0
+    for pos, ch in enumerate(masked_tail):
+        if ch == ",":
+            parts.append(tail[start:pos])
+            start = pos + 1
+    parts.append(tail[start:])
+
+    items = []
+    for part in parts:
+        m = _ORDER_ITEM_RE.match(part)
+        if not m:
+            return None
+        name = m.group(2)
+        quoted = name[0] in '"`'
+        desc = (m.group(3) or "").lower() == "desc"
+        items.append((name[1:-1] if quoted else name, quoted, desc, bool(m.group(1))))
+    return sql[: found.start()].rstrip(), tuple(items)
+
+
+def _unquote(name: str) -> str:
+    return name[1:-1] if name[0] in '"`' else name
+
+
+@lru_cache(maxsize=256)
+def _select_list(sql: str) -> Optional[Tuple[Tuple[Optional[str], ...], bool]]:
+    # 最外層 SELECT 清單每一項的輸出名稱（"*" / "t.*" 為 "*"，運算式沒有別名時為 None），
+    # 以及 FROM 是否只有單一來源；解析不出來回傳 None
+    masked = _mask(sql)
+    sel = _SELECT_RE.search(masked)
+    frm = _FROM_RE.search(masked, sel.end()) if sel else None
+    if frm is None:
+        return None
+    parts, start = [], sel.end()
+    for pos in range(sel.end(), frm.start()):
+        if masked[pos] == ",":
+            parts.append((sql[start:pos].strip(), masked[start:pos].strip()))
+            start = pos + 1
+    parts.append(
+        (sql[start : frm.start()].strip(), masked[start : frm.start()].strip())
+    )
+
+    names: List[Optional[str]] = []
+    for text, masked_text in parts:
+        if masked_text.endswith("*"):
+            names.append("*")
+            continue
+        m = _COLUMN_RE.match(text) or _ALIAS_RE.search(text)
+        names.append(_unquote(m.group(1)) if m else None)
+    tail = masked[frm.end() :]
+    end = _FROM_END_RE.search(tail)
+    single = not _JOIN_RE.search(tail[: end.start()] if end else tail)
+    return tuple(names), single
+
+
+def _is_output_column(sql: str, name: str, idx: int) -> bool:
+    # ORDER BY 的欄名必須明確就是結果的第 idx 欄：下一頁是包一層
+    # SELECT * FROM (...) 以輸出欄位排序，若原本排的是同名的來源欄位會跳列或重複
+    parsed = _select_list(sql)
+    if parsed is None:
+        return False
+    names, single = parsed
+    hits = [
+        i
+        for i, n in enumerate(names)
+        if n not in (None, "*") and n.upper() == name.upper()
+    ]
+    if "*" not in names:
+        return hits == [idx]
+    # 有 * 時位置對不上，只接受單一來源且欄名只能來自 *
+    return not hits and single
+
+
+def keyset_order(sql: str, description: Sequence[Any]) -> Optional[Order]:
+    # keyset 只在排序欄位都出現在結果、名稱不重複且宣告為 NOT NULL 時使用；
+    # 可為 NULL 的欄位在 WHERE col > :k 下會漏掉 NULL 那幾列
+    split = split_order_by(sql)
+    if not split or not description:
+        return None
+    names = [str(d[0]) for d in description]
+    if len({c.upper() for c in names}) != len(names):
+        return None
+    order = []
+    for name, quoted, desc, qualified in split[1]:
+        if qualified:
+            # a.id / b.id 這類帶前置詞的排序鍵無法對回結果欄位
+            return None
+        if not quoted and name.isdigit():
+            idx = int(name) - 1
+            if not 0 <= idx < len(names):
+                return None
+        else:
+            hits = [
+                i
+                for i, c in enumerate(names)
+                if (c == name if quoted else c.upper() == name.upper())
+            ]
+            if len(hits) != 1 or not _is_output_column(split[0], name, hits[0]):
+                return None
+            idx = hits[0]
+        d = description[idx]
+        if len(d) < 7 or d[6] is not False:
+            return None
+        order.append((idx, names[idx], desc))
+    return tuple(order)
+
+
+def keyset_where(
+    order: Order, quote: Callable[[str], str], bind: Callable[[str], str]
+) -> str:
+    # (a > :k0) OR (a = :k0 AND b > :k1) ...；ASC/DESC 混用也成立，Oracle 也沒有列值比較語法
+    terms = []
+    for i, (_, name, desc) in enumerate(order):
+        conds = [f"{quote(order[j][1])} = {bind(f'page_k{j}')}" for j in range(i)]
+        conds.append(f"{quote(name)} {'<' if desc else '>'} {bind(f'page_k{i}')}")
+        terms.append("(" + " AND ".join(conds) + ")")
+    return " OR ".join(terms)
+
+
+def order_clause(order: Order, quote: Callable[[str], str]) -> str:
+    return ", ".join(
+        f"{quote(name)}{' DESC' if desc else ''}" for _, name, desc in order
+    )
+
+
+def keyset_binds(page: Dict[str, Any]) -> Dict[str, Any]:
+    return {f"page_k{i}": v for i, v in enumerate(page["last"])}
+
+
+def check(page: Optional[Dict[str, Any]]):
+    if page is not None and page.get("done"):
+        raise RuntimeError("已經沒有下一頁")
+
+
+def begin(page: Dict[str, Any]) -> str:
+    page["page_rows"] = 0
+    return page.get("mode") or "first"
+
+
+def track(
+    page: Dict[str, Any],
+    sql: str,
+    description: Sequence[Any],
+    rows: Sequence[Sequence[Any]],
+):
+    if "order" not in page:
+        page["order"] = keyset_order(sql, description)
+    page["page_rows"] += len(rows)
+    page["fetched"] = page.get("fetched", 0) + len(rows)
+    order = page["order"]
+    if not order or not rows:
+        return
+    prev = page.get("last")
+    for r in rows:
+        key = tuple(r[i] for i, _, _ in order)
+        # 排序值重複（不唯一）時 keyset 會在頁界漏列或重複，改用 OFFSET
+        if key == prev or None in key:
+            page["order"] = None
+            return
+        prev = key
+    page["last"] = prev
+
+
+def take(
+    page: Dict[str, Any], rows: Sequence[Sequence[Any]], n: int
+) -> Sequence[Sequence[Any]]:
+    # 本頁只輸出 n 筆；多抓到的下一列記在 page["boundary"]，由 finish 判斷
+    room = n - page["page_rows"]
+    if len(rows) <= room:
+        return rows
+    page["boundary"] = rows[room]
+    return rows[:room]
+
+
+def finish(page: Dict[str, Any], n: int, peeked: bool = True):
+    # peeked=False：查詢沒有多抓一列（例如使用者自己寫了 LIMIT），只能以筆數判斷
+    boundary = page.pop("boundary", None)
+    if not peeked:
+        page["done"] = page["page_rows"] < n
+    else:
+        page["done"] = boundary is None
+        order = page.get("order")
+        if order and boundary is not None:
+            # 下一頁第一列與本頁最後一列排序值相同：WHERE k > :last 會漏掉這些同值的列
+            if tuple(boundary[i] for i, _, _ in order) == page.get("last"):
+                page["order"] = None
+    page["mode"] = "keyset" if page.get("order") else "offset"
+
+
+def resume(
+    page: Dict[str, Any], saved: Optional[Dict[str, Any]], rowcount: int, n: int
+):
+    # 第一頁由快取取得時沿用當時記下的狀態；沒有記錄就從已取得的筆數以 OFFSET 續查
+    page.clear()
+    if saved:
+        page.update(saved)
+    else:
+        page.update(
+            {
+                "mode": "offset",
+                "order": None,
+                "fetched": rowcount,
+                "page_rows": rowcount,
+            }
+        )
+        page["done"] = rowcount < n
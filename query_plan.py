@@ -0,0 +1,102 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import settings
+from fanout import MYSQL_TARGET
+from settings import SQL_MAX_ROWS
+
+PLAN_COLUMNS = ["ID", "OPERATION", "OBJECT", "ROWS", "COST", "NOTE"]
+
+
+def explain(
+    sql_text: str,
+    target: str = "vnap",
+    max_rows: int = SQL_MAX_ROWS,
+    params: Optional[Dict[str, Any]] = None,
+    *,
+    auto_bind: Optional[bool] = None,
+    timings: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    # target 與 fanout 相同：Oracle 別名或 "mysql"
+    if target == MYSQL_TARGET:
+        from db_mysql import explain_sql_raw_mysql
+
+        return explain_sql_raw_mysql(sql_text, max_rows, params, timings=timings)
+    from db_oracle import explain_sql_raw
+
+    return explain_sql_raw(
+        sql_text,
+        max_rows,
+        params,
+        alias=target,
+        auto_bind=auto_bind,
+        timings=timings,
+    )
+
+
+def guard_enabled() -> bool:
+    return bool(settings.SQL_PLAN_MAX_COST or settings.SQL_PLAN_MAX_ROWS)
+
+
+def plan_warnings(plan: Dict[str, Any]) -> List[str]:
+    # 超過 SQL_PLAN_MAX_COST / SQL_PLAN_MAX_ROWS 的項目；空清單表示可直接執行。
+    # plan["rows"] 是預估要處理的最大中間筆數，不是回傳筆數（見 settings）
+    out = []
+    cost, rows = plan.get("cost"), plan.get("rows")
+    max_cost, max_rows = settings.SQL_PLAN_MAX_COST, settings.SQL_PLAN_MAX_ROWS
+    if max_cost and cost is not None and cost > max_cost:
+        out.append(f"預估成本 {_num(cost)} 超過門檻 {max_cost}")
+    if max_rows and rows is not None and rows > max_rows:
+        out.append(f"預估處理筆數 {_num(rows)} 超過門檻 {max_rows}")
+    return out
+
+
+def _num(v: Any) -> str:
+    if v is None:
+        return "-"
+    return f"{v:,.0f}" if isinstance(v, (int, float)) else str(v)
+
+
+def _note(step: Dict[str, Any]) -> str:
+    if step.get("cartesian"):
+        return "笛卡兒積"
+    if step.get("full_scan"):
+        return "全表掃描"
+    return ""
+
+
+def plan_rows(plan: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "ID": s["id"],
+            "OPERATION": "  " * int(s.get("depth") or 0) + s["operation"],
+            "OBJECT": s["object"],
+            "ROWS": _num(s["rows"]),
+            "COST": _num(s["cost"]),
+            "NOTE": _note(s),
+        }
+        for s in plan.get("steps", [])
+    ]
+
+
+def plan_lines(plan: Dict[str, Any]) -> List[Tuple[str, bool]]:
+    # (文字, 是否醒目標示)；全表掃描與笛卡兒積的步驟要標示
+    lines = [
+        (
+            f"[PLAN] {plan.get('target')}  cost={_num(plan.get('cost'))}"
+            f"  rows(max)={_num(plan.get('rows'))}",
+            False,
+        )
+    ]
+    for r in plan_rows(plan):
+        text = (
+            f"{r['ID']!s:>3}  {r['OPERATION']:<36} {r['OBJECT']:<28}"
+            f" rows={r['ROWS']:<10} cost={r['COST']}"
+        )
+        if r["NOTE"]:
+            text += f"  <-- {r['NOTE']}"
+        lines.append((text, bool(r["NOTE"])))
+    return lines
+
+
+def format_plan(plan: Dict[str, Any]) -> str:
+    return "\n".join(text for text, _ in plan_lines(plan))
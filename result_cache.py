@@ -0,0 +1,125 @@
+import sys, threading, time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import settings
+
+
+RESULT_CACHE_ENABLED = getattr(settings, "RESULT_CACHE_ENABLED", True)
+RESULT_CACHE_TTL = getattr(settings, "RESULT_CACHE_TTL", 300)
+RESULT_CACHE_MAX_BYTES = getattr(settings, "RESULT_CACHE_MAX_BYTES", 256 * 1024**2)
+
+_SIZE_SAMPLE = 64
+
+_lock = threading.Lock()
+_entries: "OrderedDict[Hashable, Tuple[float, int, Dict[str, Any]]]" = OrderedDict()
+_bytes = 0
+_stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+
+def _freeze(v: Any) -> Hashable:
+    if isinstance(v, dict):
+        return tuple(sorted((str(k), _freeze(x)) for k, x in v.items()))
+    if isinstance(v, (list, tuple, set)):
+        return tuple(_freeze(x) for x in v)
+    try:
+        hash(v)
+        return v
+    except TypeError:
+        return repr(v)
+
+
+def make_key(
+    alias: str, sql_norm: str, binds: Optional[Dict[str, Any]], max_rows: int
+) -> Hashable:
+    return (alias, sql_norm, _freeze(binds or {}), int(max_rows))
+
+
+def _estimate_bytes(result: Dict[str, Any]) -> int:
+    # 只量前幾列再乘上筆數；欄名字串由所有 dict 共用，不重複計算
+    rows = result.get("rows") or []
+    sample = rows[:_SIZE_SAMPLE]
+    per_row = 0
+    for r in sample:
+        per_row += sys.getsizeof(r)
+        vals = r.values() if isinstance(r, dict) else r
+        per_row += sum(sys.getsizeof(v) for v in vals)
+    if sample:
+        per_row = per_row // len(sample)
+    return sys.getsizeof(rows) + per_row * len(rows) + 1024
+
+
+def _drop(key: Hashable):
+    global _bytes
+    _, size, _ = _entries.pop(key)
+    _bytes -= size
+
+
+def get(key: Hashable) -> Optional[Dict[str, Any]]:
+    if not RESULT_CACHE_ENABLED:
+        return None
+    now = time.monotonic()
+    with _lock:
+        hit = _entries.get(key)
+        if hit is not None and hit[0] <= now:
+            _drop(key)
+            _stats["expired"] += 1
+            hit = None
+        if hit is None:
+            _stats["misses"] += 1
+            return None
+        _entries.move_to_end(key)
+        _stats["hits"] += 1
+        return hit[2]
+
+
+def put(key: Hashable, result: Dict[str, Any]) -> bool:
+    global _bytes
+    if not RESULT_CACHE_ENABLED or RESULT_CACHE_TTL <= 0:
+        return False
+    size = _estimate_bytes(result)
+    if size > RESULT_CACHE_MAX_BYTES:
+        return False
+    with _lock:
+        if key in _entries:
+            _drop(key)
+        while _entries and _bytes + size > RESULT_CACHE_MAX_BYTES:
+            _drop(next(iter(_entries)))
+            _stats["evictions"] += 1
+        _entries[key] = (time.monotonic() + RESULT_CACHE_TTL, size, result)
+        _bytes += size
+    return True
+
+
+def cached(
+    key: Hashable, loader: Callable[[], Dict[str, Any]], *, refresh: bool = False
+) -> Dict[str, Any]:
+    # 命中時回傳的 rows 與快取共用同一份，呼叫端請勿修改
+    hit = None if refresh else get(key)
+    if hit is not None:
+        return {**hit, "from_cache": True}
+    result = loader()
+    put(key, result)
+    return {**result, "from_cache": False}
+
+
+def clear() -> int:
+    global _bytes
+    with _lock:
+        n = len(_entries)
+        _entries.clear()
+        _bytes = 0
+    return n
+
+
+def stats() -> Dict[str, Any]:
+    with _lock:
+        total = _stats["hits"] + _stats["misses"]
+        return {
+            **_stats,
+            "hit_ratio": round(_stats["hits"] / total, 3) if total else None,
+            "entries": len(_entries),
+            "bytes": _bytes,
+            "max_bytes": RESULT_CACHE_MAX_BYTES,
+            "ttl": RESULT_CACHE_TTL,
+        }
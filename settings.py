@@ -9,6 +9,17 @@ USE_SYSTEM_PROXY = os.getenv("USE_SYSTEM_PROXY", "1") == "1"
 API_HOST_HEADER = os.getenv("API_HOST_HEADER", "").strip()
 API_VERIFY = os.getenv("API_VERIFY", "0").strip()
 API_CA = os.getenv("API_CA", "").strip()
+API_WORKERS = int(os.getenv("API_WORKERS", "8"))
+# 每秒最多送出幾個 API 請求；0 = 不限制
+API_RATE_LIMIT = float(os.getenv("API_RATE_LIMIT", "10"))
+# 記住上次成功的 API 端點多久（秒）；逾時後背景重新探測優先端點
+API_STICKY_TTL = int(os.getenv("API_STICKY_TTL", "300"))
+# 連不上的端點暫時略過多久（秒）
+API_DEAD_TTL = int(os.getenv("API_DEAD_TTL", "60"))
+API_PROBE_TIMEOUT = int(os.getenv("API_PROBE_TIMEOUT", "3"))
+# 同時競速多個 API 端點：先送優先端點，API_RACE_HEDGE_MS 內沒回應再送下一個，取最先成功者
+API_RACE = os.getenv("API_RACE", "0") == "1"
+API_RACE_HEDGE_MS = int(os.getenv("API_RACE_HEDGE_MS", "300"))
 
 
 os.environ.setdefault("NO_PROXY", "10.0.0.0/8,127.0.0.1,localhost")
@@ -22,7 +33,30 @@ ORACLE_DSN = os.getenv("ORACLE_DSN", "10.220.130.221:1521/vnsfc")
 ORACLE_SQL_SN = (
     "SELECT MODEL_NAME, SHIPPING_SN, DATA1 FROM sfism4.R109 WHERE SHIPPING_SN = :sn"
 )
+ORACLE_SQL_SN_IN = (
+    "SELECT MODEL_NAME, SHIPPING_SN, DATA1 FROM sfism4.R109 WHERE SHIPPING_SN IN ({binds})"
+)
+# Oracle IN 清單最多 1000 個項目
+SQL_SN_CHUNK = min(int(os.getenv("SQL_SN_CHUNK", "1000")), 1000)
 SQL_MAX_ROWS = int(os.getenv("SQL_MAX_ROWS", "200"))
+# fetchmany 每批大約多少 bytes；依欄寬換算 arraysize
+SQL_FETCH_TARGET_BYTES = int(os.getenv("SQL_FETCH_TARGET_BYTES", str(2 * 1024 * 1024)))
+SQL_ARRAYSIZE_MAX = int(os.getenv("SQL_ARRAYSIZE_MAX", "10000"))
+# 單次 SQL 指令逾時（秒）；0 = 不限制
+SQL_CALL_TIMEOUT = int(os.getenv("SQL_CALL_TIMEOUT", "0"))
+# SQL 改寫結果與 FETCH FIRST / ROWNUM 可用性快取的筆數上限
+SQL_REWRITE_CACHE_SIZE = int(os.getenv("SQL_REWRITE_CACHE_SIZE", "512"))
+# SQL Raw 把 WHERE 等條件中的字串／數字常值自動換成 bind，只差常值的查詢可共用游標（預設關閉）
+SQL_AUTO_BIND = os.getenv("SQL_AUTO_BIND", "0") == "1"
+# 每條 Oracle 連線保留幾個已解析的游標（python-oracledb 預設 20）
+ORACLE_STMT_CACHE_SIZE = int(os.getenv("ORACLE_STMT_CACHE_SIZE", "20"))
+# SQL Raw 執行前先看執行計畫，預估成本／筆數超過門檻時要求確認；0 = 不檢查。
+# 筆數是計畫中最大的中間結果（Oracle 各步驟 CARDINALITY 最大值、MySQL 各表預估筆數相乘），
+# 不是回傳筆數，笛卡兒積這類查詢即使有 max_rows 限制也會超過門檻
+SQL_PLAN_MAX_COST = int(os.getenv("SQL_PLAN_MAX_COST", "0"))
+SQL_PLAN_MAX_ROWS = int(os.getenv("SQL_PLAN_MAX_ROWS", "0"))
+ARROW_ROW_GROUP_ROWS = int(os.getenv("ARROW_ROW_GROUP_ROWS", "100000"))
+PARQUET_COMPRESSION = os.getenv("PARQUET_COMPRESSION", "zstd").strip()
 
 
 ORACLE2_USER = os.getenv("ORACLE2_USER", "CQYR")
@@ -33,10 +67,42 @@ ORACLE2_DSN = os.getenv("ORACLE2_DSN", "//10.220.130.100:1903/VNAP")
 DEFAULT_DB_ALIAS = os.getenv("DEFAULT_DB_ALIAS", "primary")
 FALLBACK_DB_ALIAS = os.getenv("FALLBACK_DB_ALIAS", "vnap")
 FALLBACK_TO_VNAP = os.getenv("FALLBACK_TO_VNAP", "1") == "1"
+# 連續幾次連線錯誤後開啟斷路器，以及斷路冷卻秒數
+DB_BREAKER_FAILURES = int(os.getenv("DB_BREAKER_FAILURES", "3"))
+DB_BREAKER_COOLDOWN = int(os.getenv("DB_BREAKER_COOLDOWN", "30"))
+# SN 查詢主要 DSN 超過幾毫秒未回應就同時送到備援 DSN；0 = 不啟用
+DB_HEDGE_AFTER_MS = int(os.getenv("DB_HEDGE_AFTER_MS", "0"))
+
+
+ORACLE_POOL_ENABLED = os.getenv("ORACLE_POOL_ENABLED", "1") == "1"
+ORACLE_POOL_MIN = int(os.getenv("ORACLE_POOL_MIN", "1"))
+ORACLE_POOL_MAX = int(os.getenv("ORACLE_POOL_MAX", "4"))
+ORACLE_POOL_INCREMENT = int(os.getenv("ORACLE_POOL_INCREMENT", "1"))
+# 0 = 每次取用都 ping；負值 = 不 ping
+ORACLE_POOL_PING_INTERVAL = int(os.getenv("ORACLE_POOL_PING_INTERVAL", "60"))
+ORACLE_POOL_IDLE_TIMEOUT = int(os.getenv("ORACLE_POOL_IDLE_TIMEOUT", "300"))
+ORACLE_POOL_WAIT_TIMEOUT = int(os.getenv("ORACLE_POOL_WAIT_TIMEOUT", "20"))
 
 
 LOCAL_DB = os.getenv("LOCAL_DB", "local_cache.db")
 CACHE_TTL_HOURS = int(os.getenv("CACHE_TTL_HOURS", "6"))
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "1") == "1"
+# 過期後仍可先回傳舊值、背景重新查詢的時間窗（小時）
+CACHE_STALE_HOURS = int(os.getenv("CACHE_STALE_HOURS", "24"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "50000"))
+# SQL Raw 結果的記憶體快取（同一程序內重複查詢直接回傳）；TTL 秒數，0 = 不快取
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "1") == "1"
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", "300"))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_MB", "256")) * 1024 * 1024
+
+
+# --serve 查詢服務；對外開放時請設定 SERVE_TOKEN（請求需帶 X-Token 標頭）
+SERVE_HOST = os.getenv("SERVE_HOST", "127.0.0.1")
+SERVE_PORT = int(os.getenv("SERVE_PORT", "8765"))
+SERVE_WORKERS = int(os.getenv("SERVE_WORKERS", "16"))
+SERVE_TOKEN = os.getenv("SERVE_TOKEN", "").strip()
+# 單一請求 max_rows 的上限，超過時以上限查詢
+SERVE_MAX_ROWS = int(os.getenv("SERVE_MAX_ROWS", "10000"))
 
 
 def augment_easy_connect_with_timeout(dsn: str, timeout: int = 20) -> str:
@@ -62,3 +128,9 @@ MYSQL_USER = os.getenv("MYSQL_USER", "root").strip()
 MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD", "apple586").strip()
 MYSQL_TIMEOUT = int(os.getenv("MYSQL_TIMEOUT", "20"))
 MYSQL_CHARSET = os.getenv("MYSQL_CHARSET", "utf8mb4").strip()
+MYSQL_POOL_ENABLED = os.getenv("MYSQL_POOL_ENABLED", "1") == "1"
+MYSQL_POOL_SIZE = int(os.getenv("MYSQL_POOL_SIZE", "4"))
+# 閒置超過幾秒的連線取用前先 ping；閒置超過 IDLE_TIMEOUT 直接重連（需小於 server 的 wait_timeout）
+MYSQL_POOL_PING_INTERVAL = int(os.getenv("MYSQL_POOL_PING_INTERVAL", "60"))
+MYSQL_POOL_IDLE_TIMEOUT = int(os.getenv("MYSQL_POOL_IDLE_TIMEOUT", "300"))
+MYSQL_POOL_WAIT_TIMEOUT = int(os.getenv("MYSQL_POOL_WAIT_TIMEOUT", "20"))
@@ -1,19 +1,12 @@
 import json
 import argparse
-import csv, os
+import csv, os, sys
 
 from sql_utils import parse_bind_params
 from settings import SQL_MAX_ROWS
-from api_client import call_api, summarize_api_payload
-from db_oracle import call_sql_by_sn, call_sql_raw
+from timing import format_timings, stage
 
-try:
-    from db_mysql import call_sql_raw_mysql
-
-    _HAS_MYSQL = True
-except Exception:
-    _HAS_MYSQL = False
-from ui_tk import App, require_login
+# 其餘模組（requests、oracledb、tkinter…）依模式延遲載入，讓 --cli 單次呼叫啟動更快
 
 
 def _write_csv(columns, rows, path):
@@ -26,38 +19,404 @@ def _write_csv(columns, rows, path):
             w.writerow(["" if r.get(c) is None else r.get(c) for c in (columns or [])])
 
 
+def _export_columnar(export, args, binds):
+
+    for fmt, path in (("parquet", args.out_parquet), ("arrow", args.out_arrow)):
+        if not path:
+            continue
+        cols, total = export(
+            args.sql, path, fmt=fmt, max_rows=args.max_rows, params=binds
+        )
+        print(f"{fmt.capitalize()} 已輸出：{os.path.abspath(path)}（{total} 筆）")
+
+
+def _check_plan(args, target, binds) -> bool:
+    # --plan 只輸出執行計畫；設定了 SQL_PLAN_MAX_COST / SQL_PLAN_MAX_ROWS 時先 EXPLAIN，
+    # 超過門檻要確認（或加 --yes）才執行。回傳是否繼續執行查詢
+    from query_plan import explain, format_plan, guard_enabled, plan_warnings
+
+    if not args.plan and not guard_enabled():
+        return True
+    try:
+        plan = explain(
+            args.sql,
+            target,
+            args.max_rows,
+            binds,
+            auto_bind=getattr(args, "auto_bind", False) or None,
+        )
+    except Exception as e:
+        if args.plan:
+            raise
+        print(f"[plan] 無法取得執行計畫，直接執行：{e}", file=sys.stderr)
+        return True
+    if args.plan:
+        print(format_plan(plan))
+        return False
+    warnings = plan_warnings(plan)
+    if not warnings or args.yes:
+        return True
+    print(format_plan(plan), file=sys.stderr)
+    for w in warnings:
+        print(f"[plan] {w}", file=sys.stderr)
+    if not sys.stdin.isatty():
+        print("[plan] 未執行；確認無誤後加上 --yes 再執行", file=sys.stderr)
+        return False
+    return input("確定要執行？[y/N] ").strip().lower() in ("y", "yes")
+
+
+def _write_csv_stream(batches, path):
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    columns, total, width = [], 0, None
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        w = csv.writer(f)
+        for cols, rows in batches:
+            if width is None:
+                columns = list(cols or [])
+                width = len(columns)
+                w.writerow([str(c) for c in columns])
+            elif len(cols or []) > len(columns):
+                # 多目標查詢時後到的目標會帶來新欄位（只會附加在後面）
+                columns = list(cols)
+            w.writerows(
+                ["" if r.get(c) is None else r.get(c) for c in columns] for r in rows
+            )
+            total += len(rows)
+    if width is not None and len(columns) > width:
+        _rewrite_csv_header(path, columns)
+    return columns, total
+
+
+def _rewrite_csv_header(path, columns):
+    # 換成最終的欄位表頭，較早寫出的列補齊欄數；逐列複製，不整份載入記憶體
+    tmp = f"{path}.tmp"
+    with open(path, newline="", encoding="utf-8-sig") as src, open(
+        tmp, "w", newline="", encoding="utf-8-sig"
+    ) as dst:
+        r, w = csv.reader(src), csv.writer(dst)
+        next(r, None)
+        w.writerow([str(c) for c in columns])
+        n = len(columns)
+        w.writerows(row + [""] * (n - len(row)) for row in r)
+    os.replace(tmp, path)
+
+
+def _read_sns(path):
+
+    f = sys.stdin if path == "-" else open(path, encoding="utf-8-sig")
+    try:
+        for line in f:
+            for tok in line.replace(",", " ").split():
+                sn = tok.strip().strip("{}")
+                if sn:
+                    yield sn
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def _write_sn_rows_csv(results, path=None):
+
+    cols = ["SN", "MODEL_NAME", "SHIPPING_SN", "DATA1", "STATUS"]
+    if path:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        f = open(path, "w", newline="", encoding="utf-8-sig")
+    else:
+        f = sys.stdout
+    total = found = 0
+    try:
+        w = csv.writer(f)
+        w.writerow(cols)
+        for sn, row in results:
+            total += 1
+            if row:
+                found += 1
+                w.writerow([sn, row[0], row[1], row[2], "found"])
+            else:
+                w.writerow([sn, "", "", "", "not found"])
+    finally:
+        if f is not sys.stdout:
+            f.close()
+    return total, found
+
+
+def _write_api_results(results, out_csv=None, out_jsonl=None):
+
+    from api_client import summarize_api_payload
+
+    targets = []
+    if out_csv:
+        os.makedirs(os.path.dirname(os.path.abspath(out_csv)), exist_ok=True)
+        fc = open(out_csv, "w", newline="", encoding="utf-8-sig")
+        wc = csv.writer(fc)
+        wc.writerow(["SN", "OK", "SUMMARY", "ERROR"])
+        targets.append(fc)
+    if out_jsonl:
+        os.makedirs(os.path.dirname(os.path.abspath(out_jsonl)), exist_ok=True)
+        fj = open(out_jsonl, "w", encoding="utf-8")
+        targets.append(fj)
+    elif not out_csv:
+        fj = sys.stdout
+    total = failed = 0
+    try:
+        for sn, payload, err in results:
+            total += 1
+            summary = ""
+            if err is None:
+                summary = " | ".join(summarize_api_payload(payload).splitlines())
+            else:
+                failed += 1
+                err = " ".join(err.split())
+            if out_csv:
+                wc.writerow([sn, err is None, summary, err or ""])
+                fc.flush()
+            if out_jsonl or not out_csv:
+                rec = {"sn": sn, "ok": err is None, "summary": summary, "error": err}
+                fj.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                fj.flush()
+    finally:
+        for f in targets:
+            f.close()
+    return total, failed
+
+
+def _print_timings(timings):
+    if timings is not None:
+        print(f"[TIME] {format_timings(timings)}", file=sys.stderr)
+
+
+def _print_cache_stats():
+    import result_cache
+
+    print(json.dumps(result_cache.stats(), ensure_ascii=False, indent=2))
+
+
+def _run_fanout(args, timings):
+    if not args.sql:
+        print('請用 --sql "SELECT ..." 提供查詢指令')
+        return
+    from fanout import (
+        call_sql_raw_fanout,
+        format_status,
+        iter_sql_raw_fanout,
+        parse_targets,
+    )
+
+    binds = parse_bind_params(args.params)
+    targets = parse_targets(args.targets)
+    # 每個目標各自看執行計畫：--plan 印出全部後結束；門檻檢查有一個不通過就不執行
+    if args.plan:
+        for t in targets:
+            _check_plan(args, t, binds)
+        return
+    if not all(_check_plan(args, t, binds) for t in targets):
+        return
+    dedup = [c.strip() for c in (args.dedup or "").split(",") if c.strip()] or None
+    if args.out_csv:
+        status = {}
+        with stage(timings, "total"):
+            cols, total = _write_csv_stream(
+                iter_sql_raw_fanout(
+                    args.sql,
+                    targets,
+                    args.max_rows,
+                    binds,
+                    dedup=dedup,
+                    status=status,
+                ),
+                args.out_csv,
+            )
+        print(f"CSV 已輸出：{os.path.abspath(args.out_csv)}")
+        res = {"columns": cols, "rowcount": total, "binds": binds, "targets": status}
+    else:
+        res = call_sql_raw_fanout(
+            args.sql, targets, args.max_rows, binds, dedup=dedup, timings=timings
+        )
+    print(json.dumps(res, ensure_ascii=False, indent=2, default=str))
+    print(format_status(res["targets"]), file=sys.stderr)
+    _print_timings(timings)
+
+
 def main():
     p = argparse.ArgumentParser(
         description="SOP 資訊檢視工具（API / SQL by SN / SQL Raw）"
     )
     p.add_argument("--sn", help="序號（可帶或不帶大括號）")
+    p.add_argument(
+        "--sn_file",
+        "--sn-file",
+        dest="sn_file",
+        help="批次序號檔（每行一個或以逗號分隔；- 代表 stdin）",
+    )
     p.add_argument(
         "--mode", choices=["api", "sql_sn", "sql_raw", "mysql_raw"], default="api"
     )
     p.add_argument("--sql", help="直接執行的 SELECT 指令（僅 SQL Raw 模式）")
+    p.add_argument(
+        "--fallback",
+        choices=["primary", "vnap"],
+        help="SQL Raw 連線失敗或斷路時改查的 DB（語句需在兩邊都可執行）",
+    )
+    p.add_argument(
+        "--targets",
+        help="同一 SELECT 同時查詢多個目標並合併（primary,vnap,mysql 或 all）；"
+        "每列加上 SOURCE_DB 欄，max_rows 為各目標上限",
+    )
+    p.add_argument("--dedup", help="--targets 合併時依這些欄位去重（逗號分隔）")
     p.add_argument("--params", help='綁定參數，JSON 或 "k=v,k2=v2"', default="")
+    p.add_argument(
+        "--plan",
+        action="store_true",
+        help="只顯示 SQL 的執行計畫（Oracle EXPLAIN PLAN / MySQL EXPLAIN），不執行查詢",
+    )
+    p.add_argument(
+        "--yes",
+        action="store_true",
+        help="預估成本／筆數超過 SQL_PLAN_MAX_COST / SQL_PLAN_MAX_ROWS 時不詢問直接執行",
+    )
+    p.add_argument(
+        "--auto_bind",
+        action="store_true",
+        help="SQL Raw 將條件中的常值自動改為 bind（預設依 SQL_AUTO_BIND）",
+    )
     p.add_argument(
         "--max_rows", type=int, default=SQL_MAX_ROWS, help="SQL 指令最大筆數"
     )
-    p.add_argument("--out_csv", help="將結果匯出為 CSV 檔案（僅 SQL 模式）")
+    p.add_argument("--out_csv", help="將結果匯出為 CSV 檔案（SQL 模式或批次 API）")
+    p.add_argument("--out_parquet", help="將 SQL 結果匯出為 Parquet（保留欄位型別）")
+    p.add_argument("--out_arrow", help="將 SQL 結果匯出為 Arrow IPC 檔（保留欄位型別）")
+    p.add_argument("--out_jsonl", help="批次 API 結果輸出為 JSONL（每行一個 SN）")
+    p.add_argument(
+        "--workers", type=int, help="批次 API 同時查詢數；--serve 時為服務執行緒數"
+    )
+    p.add_argument("--rate", type=float, help="批次 API 每秒最多請求數（0 = 不限制）")
     p.add_argument("--cli", action="store_true", help="命令列輸出（不啟動 GUI）")
+    p.add_argument(
+        "--pool_stats",
+        action="store_true",
+        help="查詢後輸出連線池統計（Oracle / MySQL）",
+    )
+    p.add_argument(
+        "--no_cache",
+        action="store_true",
+        help="略過本機 SN 快取與結果快取，直接查詢來源",
+    )
+    p.add_argument(
+        "--refresh", action="store_true", help="SQL Raw 忽略結果快取重新查詢並更新快取"
+    )
+    p.add_argument(
+        "--cache_stats", action="store_true", help="查詢後輸出結果快取命中統計"
+    )
+    p.add_argument(
+        "--purge_cache", action="store_true", help="清除本機 SN 快取（LOCAL_DB）"
+    )
+    p.add_argument(
+        "--serve",
+        action="store_true",
+        help="啟動 HTTP/JSON 查詢服務（共用連線池與快取）",
+    )
+    p.add_argument("--host", help="--serve 監聽位址（預設 SERVE_HOST）")
+    p.add_argument("--port", type=int, help="--serve 監聽埠（預設 SERVE_PORT）")
+    p.add_argument(
+        "--profile",
+        action="store_true",
+        help="輸出各階段耗時（connect/execute/fetch/convert/total）",
+    )
+    p.add_argument("--cprofile", help="以 cProfile 執行並將統計寫入此檔（pstats 格式）")
     args = p.parse_args()
 
+    if args.cprofile:
+        import cProfile, pstats
+
+        prof = cProfile.Profile()
+        try:
+            prof.runcall(_run, args)
+        finally:
+            prof.dump_stats(args.cprofile)
+            stats = pstats.Stats(prof, stream=sys.stderr)
+            stats.sort_stats("cumulative").print_stats(25)
+            print(f"cProfile 已輸出：{os.path.abspath(args.cprofile)}", file=sys.stderr)
+        return
+    _run(args)
+
+
+def _run(args):
+    timings = {} if args.profile else None
+
+    if args.serve:
+        from lookup_service import serve
+
+        serve(args.host, args.port, args.workers)
+        return
+
+    if args.purge_cache:
+        import local_cache
+
+        n = local_cache.purge()
+        print(f"已清除本機快取 {n} 筆：{os.path.abspath(local_cache.LOCAL_DB)}")
+        if not args.sn and not args.sql:
+            return
+
+    if args.cli and args.targets:
+        _run_fanout(args, timings)
+        return
+
     if getattr(args, "cli", False) and args.mode == "mysql_raw":
         if not args.sql:
             print('請用 --sql "SELECT ..." 提供查詢指令')
             return
+        try:
+            from db_mysql import (
+                call_sql_raw_mysql,
+                iter_sql_raw_mysql,
+                mysql_pool_stats,
+            )
+
+            _HAS_MYSQL = True
+        except Exception:
+            _HAS_MYSQL = False
         if not _HAS_MYSQL:
             print(
                 "未找到 MySQL 支援，請安裝 mysql-connector-python 或 PyMySQL 後再試。"
             )
             return
         binds = parse_bind_params(args.params)
-        res = call_sql_raw_mysql(args.sql, max_rows=args.max_rows, params=binds)
+        if not _check_plan(args, "mysql", binds):
+            return
+        if args.out_parquet or args.out_arrow:
+            from arrow_export import export_mysql
+
+            _export_columnar(export_mysql, args, binds)
+            if not args.out_csv:
+                return
         if args.out_csv:
-            _write_csv(res.get("columns", []), res.get("rows", []), args.out_csv)
+            with stage(timings, "total"):
+                cols, total = _write_csv_stream(
+                    iter_sql_raw_mysql(
+                        args.sql, max_rows=args.max_rows, params=binds, timings=timings
+                    ),
+                    args.out_csv,
+                )
             print(f"CSV 已輸出到 {os.path.abspath(args.out_csv)}")
-        print(json.dumps(res, ensure_ascii=False, indent=2))
+            res = {"columns": cols, "rowcount": total, "binds": binds}
+            print(json.dumps(res, ensure_ascii=False, indent=2, default=str))
+            _print_timings(timings)
+            return
+        res = call_sql_raw_mysql(
+            args.sql,
+            max_rows=args.max_rows,
+            params=binds,
+            use_cache=not args.no_cache,
+            refresh=args.refresh,
+            timings=timings,
+        )
+        print(json.dumps(res, ensure_ascii=False, indent=2, default=str))
+        _print_timings(timings)
+        if args.pool_stats:
+            print(json.dumps(mysql_pool_stats(), ensure_ascii=False, indent=2))
+        if args.cache_stats:
+            _print_cache_stats()
         return
 
     if args.cli:
@@ -66,29 +425,104 @@ def main():
             if not args.sql:
                 print('請用 --sql "SELECT ..." 提供查詢指令')
                 return
+            from db_oracle import call_sql_raw, iter_sql_raw, pool_stats
+
             binds = parse_bind_params(args.params)
-            res = call_sql_raw(args.sql, max_rows=args.max_rows, params=binds)
+            if not _check_plan(args, "vnap", binds):
+                return
+            if args.out_parquet or args.out_arrow:
+                from arrow_export import export_oracle
+
+                _export_columnar(export_oracle, args, binds)
+                if not args.out_csv:
+                    return
             if args.out_csv:
-                _write_csv(res.get("columns", []), res.get("rows", []), args.out_csv)
+                with stage(timings, "total"):
+                    cols, total = _write_csv_stream(
+                        iter_sql_raw(
+                            args.sql,
+                            max_rows=args.max_rows,
+                            params=binds,
+                            fallback=args.fallback,
+                            timings=timings,
+                            auto_bind=args.auto_bind or None,
+                        ),
+                        args.out_csv,
+                    )
                 print(f"CSV 已輸出：{os.path.abspath(args.out_csv)}")
-            print(json.dumps(res, ensure_ascii=False, indent=2))
+                res = {"columns": cols, "rowcount": total, "binds": binds}
+            else:
+                res = call_sql_raw(
+                    args.sql,
+                    max_rows=args.max_rows,
+                    params=binds,
+                    fallback=args.fallback,
+                    use_cache=not args.no_cache,
+                    refresh=args.refresh,
+                    timings=timings,
+                    auto_bind=args.auto_bind or None,
+                )
+            print(json.dumps(res, ensure_ascii=False, indent=2, default=str))
+            _print_timings(timings)
+            if args.pool_stats:
+                print(json.dumps(pool_stats(), ensure_ascii=False, indent=2))
+            if args.cache_stats:
+                _print_cache_stats()
+            return
+
+        if args.mode == "api" and args.sn_file:
+            from api_client import call_api_many
+
+            # 批次只輸出摘要，邊下載邊解析即可，不必建立完整文件
+            kw = {"use_cache": not args.no_cache, "summary_only": True}
+            if args.workers:
+                kw["workers"] = args.workers
+            if args.rate is not None:
+                kw["rate_limit"] = args.rate
+            total, failed = _write_api_results(
+                call_api_many(_read_sns(args.sn_file), **kw),
+                out_csv=args.out_csv,
+                out_jsonl=args.out_jsonl,
+            )
+            print(f"共 {total} 筆，失敗 {failed} 筆", file=sys.stderr)
             return
 
         if args.mode == "api":
             if not args.sn:
                 print("請用 --sn 輸入序號")
                 return
-            payload = call_api(args.sn.strip("{}"))
+            from api_client import call_api, summarize_api_payload
+
+            payload = call_api(
+                args.sn.strip("{}"), use_cache=not args.no_cache, timings=timings
+            )
             print(summarize_api_payload(payload))
             print("\n完整 JSON")
             print(json.dumps(payload, ensure_ascii=False, indent=2))
+            _print_timings(timings)
+            return
+
+        if args.mode == "sql_sn" and args.sn_file:
+            from db_oracle import call_sql_by_sns
+
+            total, found = _write_sn_rows_csv(
+                call_sql_by_sns(_read_sns(args.sn_file)), args.out_csv
+            )
+            msg = f"共 {total} 筆，找到 {found} 筆，查無 {total - found} 筆"
+            if args.out_csv:
+                msg += f"；CSV 已輸出：{os.path.abspath(args.out_csv)}"
+            print(msg, file=sys.stderr)
             return
 
         if args.mode == "sql_sn":
             if not args.sn:
                 print("請用 --sn 輸入序號")
                 return
-            row = call_sql_by_sn(args.sn.strip("{}"))
+            from db_oracle import call_sql_by_sn, pool_stats
+
+            row = call_sql_by_sn(
+                args.sn.strip("{}"), use_cache=not args.no_cache, timings=timings
+            )
             if row:
                 out = {"MODEL_NAME": row[0], "SHIPPING_SN": row[1], "DATA1": row[2]}
                 if args.out_csv:
@@ -99,8 +533,13 @@ def main():
                 print(json.dumps(out, ensure_ascii=False, indent=2))
             else:
                 print("查無資料")
+            _print_timings(timings)
+            if args.pool_stats:
+                print(json.dumps(pool_stats(), ensure_ascii=False, indent=2))
             return
 
+    from ui_tk import App, require_login
+
     if not require_login():
         return
     App().mainloop()
@@ -1,10 +1,22 @@
 import json, re
 from datetime import datetime, date
+from functools import lru_cache
 from decimal import Decimal
-from typing import Dict, Any
+from typing import Dict, Any, Callable, List, Optional, Sequence, Tuple
+
+from settings import SQL_ARRAYSIZE_MAX, SQL_FETCH_TARGET_BYTES
+
+
+_JSON_SCALARS = (str, int, float, bool, type(None))
 
 
 def jsonable(v):
+    if type(v) in _JSON_SCALARS:
+        return v
+    if isinstance(v, (datetime, date)):
+        return v.isoformat()
+    if isinstance(v, Decimal):
+        return float(v)
     try:
         json.dumps(v)
         return v
@@ -16,43 +28,421 @@ def jsonable(v):
         return str(v)
 
 
+def _iso(v):
+    return None if v is None else v.isoformat()
+
+
+def _to_float(v):
+    return None if v is None else float(v)
+
+
+_ORACLE_PASSTHROUGH = {
+    "VARCHAR",
+    "NVARCHAR",
+    "CHAR",
+    "NCHAR",
+    "LONG",
+    "ROWID",
+    "NUMBER",
+    "BINARY_DOUBLE",
+    "BINARY_FLOAT",
+    "BINARY_INTEGER",
+    "BOOLEAN",
+}
+_ORACLE_ISO = {"DATE", "TIMESTAMP", "TIMESTAMP_TZ", "TIMESTAMP_LTZ"}
+
+# MySQL FIELD_TYPE 代碼（mysql.connector / PyMySQL 相同）
+_MYSQL_PASSTHROUGH = {1, 2, 3, 4, 5, 8, 9, 13, 15, 16, 245, 253, 254}
+_MYSQL_ISO = {7, 10, 12, 14}
+_MYSQL_DECIMAL = {0, 246}
+
+
+def _column_converter(d) -> Optional[Callable[[Any], Any]]:
+    code = d[1]
+    if isinstance(code, int):
+        if code in _MYSQL_PASSTHROUGH:
+            return None
+        if code in _MYSQL_ISO:
+            return _iso
+        if code in _MYSQL_DECIMAL:
+            return _to_float
+        return jsonable
+    name = str(getattr(code, "name", code)).upper()
+    if name.startswith("DB_TYPE_"):
+        name = name[len("DB_TYPE_") :]
+    if name in _ORACLE_PASSTHROUGH:
+        return None
+    if name in _ORACLE_ISO:
+        return _iso
+    return jsonable
+
+
+def column_converters(
+    description: Sequence[Any], sample: Sequence[Sequence[Any]] = ()
+) -> List[Optional[Callable[[Any], Any]]]:
+
+    convs = [_column_converter(d) for d in description or ()]
+    # 以第一批資料驗證：型別與 description 不符的欄位改用依實際型別挑選的轉換器
+    for i, conv in enumerate(convs):
+        if conv is None:
+            kinds = {type(r[i]) for r in sample} - set(_JSON_SCALARS)
+            if kinds and all(issubclass(k, Decimal) for k in kinds):
+                convs[i] = _to_float
+            elif kinds and all(issubclass(k, (datetime, date)) for k in kinds):
+                convs[i] = _iso
+            elif kinds:
+                convs[i] = jsonable
+        elif conv is not jsonable:
+            for r in sample:
+                v = r[i]
+                if v is None:
+                    continue
+                try:
+                    conv(v)
+                except Exception:
+                    convs[i] = jsonable
+                break
+    return convs
+
+
+def rows_to_dicts(
+    columns: List[str],
+    rows: Sequence[Sequence[Any]],
+    converters: List[Optional[Callable[[Any], Any]]],
+) -> List[Dict[str, Any]]:
+
+    active = [(i, f) for i, f in enumerate(converters) if f is not None]
+    if not active:
+        return [dict(zip(columns, r)) for r in rows]
+    out = []
+    for r in rows:
+        vals = list(r)
+        for i, f in active:
+            vals[i] = f(vals[i])
+        out.append(dict(zip(columns, vals)))
+    return out
+
+
+def fetch_batch_size(description, max_rows: int) -> int:
+    # 依 cursor.description 的欄寬估算每列位元組，每批抓取約 SQL_FETCH_TARGET_BYTES；
+    # 沒有欄寬（LOB、部分 MySQL 驅動）以 32 bytes 計
+    row_bytes = 0
+    for d in description or ():
+        size = (d[3] if len(d) > 3 else None) or (d[2] if len(d) > 2 else None)
+        row_bytes += min(size, 4000) if size and size > 0 else 32
+    by_width = SQL_FETCH_TARGET_BYTES // max(row_bytes, 1)
+    return max(1, min(int(max_rows), SQL_ARRAYSIZE_MAX, max(100, by_width)))
+
+
+_TRAILING_SEMICOLON_RE = re.compile(r";\s*\Z")
+_SELEC_RE = re.compile(r"(?is)^\s*selec\b")
+_TO_NUMBER_RE = re.compile(r"(?is)\bTO[\s_]*NUMBER\s*\(")
+_UNDERSCORE_GAP_RE = re.compile(r"(?is)(\w)\s*_\s*(\w)")
+_BLANKS_RE = re.compile(r"[ \t]+")
+
+
+@lru_cache(maxsize=512)
 def normalize_sql_user_friendly(sql_text: str) -> str:
     s = sql_text.strip()
-    s = re.sub(r";\s*\Z", "", s)
-    s = re.sub(r"(?is)^\s*selec\b", "SELECT", s)
-    s = re.sub(r"(?is)\bTO[\s_]*NUMBER\s*\(", "TO_NUMBER(", s)
-    s = re.sub(r"(?is)(\w)\s*_\s*(\w)", r"\1_\2", s)
-    s = re.sub(r"[ \t]+", " ", s)
+    s = _TRAILING_SEMICOLON_RE.sub("", s)
+    s = _SELEC_RE.sub("SELECT", s)
+    s = _TO_NUMBER_RE.sub("TO_NUMBER(", s)
+    s = _UNDERSCORE_GAP_RE.sub(r"\1_\2", s)
+    s = _BLANKS_RE.sub(" ", s)
     return s
 
 
+# 常值換成 bind：只處理 WHERE / HAVING / ON / CONNECT BY / START WITH 裡比較運算子兩側與 IN 清單的常值。
+# 註解、hint、引號識別字、q'[...]' / N'...'、既有 bind 原樣保留；DATE / TIMESTAMP / INTERVAL 常值、
+# 函式參數（可能對應函式索引）、SELECT 清單、GROUP BY、ORDER BY 都不改
+_SQL_TOKEN_RE = re.compile(
+    r"""
+    (?P<skip>--[^\n]*
+      |/\*.*?(?:\*/|\Z)
+      |"[^"]*"?
+      |[nN]?[qQ]'(?:\[.*?\]|\{.*?\}|<.*?>|\(.*?\)|(?P<qd>\S).*?(?P=qd))'
+      |[nN]'(?:[^']|'')*'?
+      |:[\w$#]+)
+    |(?P<str>'(?:[^']|'')*'?)
+    |(?P<word>[^\W\d][\w$#]*)
+    |(?P<num>(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?[fFdD]?)
+    |(?P<op><>|!=|\^=|<=|>=|=|<|>)
+    |(?P<punct>\S)
+    """,
+    re.S | re.X,
+)
+# 這些關鍵字開始新的子句；值為該子句的常值是否可換成 bind
+_SQL_CLAUSES = {
+    "WHERE": True,
+    "HAVING": True,
+    "ON": True,
+    "CONNECT": True,
+    "START": True,
+    "SELECT": False,
+    "FROM": False,
+    "JOIN": False,
+    "GROUP": False,
+    "ORDER": False,
+    "UNION": False,
+    "INTERSECT": False,
+    "MINUS": False,
+    "EXCEPT": False,
+    "FETCH": False,
+    "OFFSET": False,
+    "FOR": False,
+    "WITH": False,
+}
+_SQL_COMPARE_WORDS = {"LIKE", "BETWEEN"}
+_SQL_TYPED_LITERALS = {"DATE", "TIMESTAMP", "INTERVAL"}
+
+
+def _literal_value(kind: str, text: str):
+    if kind == "str":
+        return text[1:-1].replace("''", "'")
+    if any(c in text for c in ".eE"):
+        return Decimal(text)
+    return int(text)
+
+
+@lru_cache(maxsize=512)
+def _parameterize(sql: str) -> Tuple[str, Tuple[Tuple[str, Any], ...]]:
+    toks = [
+        (m.lastgroup if m.lastgroup != "qd" else "skip", m.group(), m.start(), m.end())
+        for m in _SQL_TOKEN_RE.finditer(sql)
+    ]
+    used = {t[1][1:].lower() for t in toks if t[0] == "skip" and t[1][:1] == ":"}
+    names: Dict[Tuple[type, Any], str] = {}
+    out: List[str] = []
+    last = 0
+    # 每層括號一組狀態：[子句可否換 bind, 括號前的字, 等待 BETWEEN ... AND]
+    stack: List[List[Any]] = [[False, None, False]]
+    for i, (kind, text, start, end) in enumerate(toks):
+        top = stack[-1]
+        if kind == "word":
+            u = text.upper()
+            if u in _SQL_CLAUSES:
+                top[0] = _SQL_CLAUSES[u]
+            elif u == "BETWEEN":
+                top[2] = True
+            continue
+        if text == "(":
+            prev = toks[i - 1] if i else None
+            owner = prev[1].upper() if prev and prev[0] == "word" else None
+            stack.append([top[0], owner, False])
+            continue
+        if text == ")":
+            if len(stack) > 1:
+                stack.pop()
+            continue
+        if kind not in ("str", "num") or not top[0]:
+            continue
+        if kind == "str" and (len(text) < 2 or not text.endswith("'")):
+            continue
+        if kind == "num" and text[-1] in "fFdD":
+            continue
+        j = i - 1
+        if j >= 0 and toks[j][1] in "+-" and j >= 1 and toks[j - 1][0] == "op":
+            j -= 1
+        prev = toks[j] if j >= 0 else ("", "", 0, 0)
+        nxt = toks[i + 1] if i + 1 < len(toks) else ("", "", 0, 0)
+        pw = prev[1].upper() if prev[0] == "word" else ""
+        if pw in _SQL_TYPED_LITERALS:
+            continue
+        if pw == "AND" and top[2]:
+            top[2] = False
+        elif not (
+            prev[0] == "op"
+            or pw in _SQL_COMPARE_WORDS
+            or nxt[0] == "op"
+            or (top[1] == "IN" and prev[1] in "(," and nxt[1] in ",)")
+        ):
+            continue
+        value = _literal_value(kind, text)
+        key = (type(value), value)
+        name = names.get(key)
+        if name is None:
+            n = len(names)
+            while f"lit{n}" in used:
+                n += 1
+            name = names[key] = f"lit{n}"
+            used.add(name)
+        out.append(sql[last:start])
+        out.append(f":{name}")
+        last = end
+    if not names:
+        return sql, ()
+    out.append(sql[last:])
+    return "".join(out), tuple((n, k[1]) for k, n in names.items())
+
+
+def parameterize_literals(sql: str) -> Tuple[str, Dict[str, Any]]:
+    # 把 SQL 中的字串／數字常值抽成 :lit0、:lit1…，回傳改寫後的 SQL 與對應的 bind；
+    # 形狀相同、只差常值的查詢會得到同一段 SQL，可共用 shared pool 的游標與驅動端的 statement cache
+    sql_out, binds = _parameterize(sql)
+    return sql_out, dict(binds)
+
+
+_ISO_DATETIME_RE = re.compile(
+    r"(\d{4}-\d{2}-\d{2})(?:[T ](\d{2}:\d{2}(?::\d{2})?)(?:\.(\d{1,6}))?)?"
+)
+# name、name:type、name[]、name:type[]；陣列的值以 | 分隔
+_BIND_KEY_RE = re.compile(r"([^\W\d][\w$#]*)\s*(?::\s*(\w+))?\s*(\[\])?")
+
+
+def _parse_datetime(v: str) -> Optional[datetime]:
+    m = _ISO_DATETIME_RE.fullmatch(v)
+    if not m:
+        return None
+    day, clock, frac = m.groups()
+    try:
+        dt = datetime.fromisoformat(f"{day} {clock or '00:00'}")
+    except ValueError:
+        return None
+    return dt.replace(microsecond=int(frac.ljust(6, "0"))) if frac else dt
+
+
+def _to_datetime(v) -> datetime:
+    if isinstance(v, datetime):
+        return v
+    if isinstance(v, date):
+        return datetime(v.year, v.month, v.day)
+    dt = _parse_datetime(str(v).strip())
+    if dt is None:
+        raise ValueError(v)
+    return dt
+
+
+def _to_bool(v) -> bool:
+    s = str(v).strip().lower()
+    if s in ("1", "true", "yes", "y"):
+        return True
+    if s in ("0", "false", "no", "n"):
+        return False
+    raise ValueError(v)
+
+
+_BIND_CASTS: Dict[str, Callable[[Any], Any]] = {
+    "str": str,
+    "int": int,
+    "float": float,
+    "number": lambda v: Decimal(str(v)),
+    "date": lambda v: _to_datetime(v).replace(microsecond=0),
+    "timestamp": _to_datetime,
+    "bool": _to_bool,
+}
+
+
+def _cast_bind(name: str, kind: str, v: Any) -> Any:
+    cast = _BIND_CASTS.get(kind.lower())
+    if cast is None:
+        raise RuntimeError(f"未知的綁定型別：{kind}（可用：{', '.join(_BIND_CASTS)}）")
+    try:
+        return cast(v)
+    except (ValueError, ArithmeticError):
+        raise RuntimeError(f"綁定參數 {name} 無法轉成 {kind}：{v}") from None
+
+
+def _infer_bind(v: str) -> Any:
+    if re.fullmatch(r"-?\d+", v):
+        return int(v)
+    if re.fullmatch(r"-?\d+\.\d*", v):
+        return float(v)
+    if v.lower() in ("true", "false"):
+        return v.lower() == "true"
+    if v.lower() in ("null", "none"):
+        return None
+    dt = _parse_datetime(v)
+    return v if dt is None else dt
+
+
+def _bind_text(name: str, kind: Optional[str], v: str) -> Any:
+    # 加了引號的值一律是字串（保留前導 0、看起來像日期的文字）
+    v = v.strip()
+    quoted = len(v) >= 2 and v[0] == v[-1] and v[0] in "'\""
+    if quoted:
+        v = v[1:-1]
+    if not kind:
+        return v if quoted else _infer_bind(v)
+    if not quoted and v.lower() in ("null", "none"):
+        return None
+    return _cast_bind(name, kind, v)
+
+
+def _bind_value(key: str, v: Any, from_text: bool) -> Tuple[str, Any]:
+    m = _BIND_KEY_RE.fullmatch(key.strip())
+    if not m:
+        key = key.strip()
+        return key, _bind_text(key, None, v) if from_text else v
+    name, kind, array = m.groups()
+    if array and from_text:
+        return name, [_bind_text(name, kind, x) for x in v.split("|")]
+    if from_text:
+        return name, _bind_text(name, kind, v)
+    if not kind:
+        return name, v
+    if isinstance(v, list):
+        return name, [None if x is None else _cast_bind(name, kind, x) for x in v]
+    return name, None if v is None else _cast_bind(name, kind, v)
+
+
 def parse_bind_params(text: str) -> Dict[str, Any]:
+    # k=v 形式依內容推斷型別：整數、小數、true/false、null、ISO 日期時間（轉成 datetime）；
+    # 可用 k:type=v 指定型別（str/int/float/number/date/timestamp/bool），k[]=a|b|c 為陣列 bind。
+    # JSON 形式的值沿用 JSON 型別，鍵同樣可加 :type
     s = (text or "").strip()
     if not s:
         return {}
     if s.startswith("{") and s.endswith("}"):
         try:
             obj = json.loads(s)
-            return obj if isinstance(obj, dict) else {}
         except Exception:
-            pass
+            obj = None
+        if obj is not None:
+            if not isinstance(obj, dict):
+                return {}
+            return dict(_bind_value(k, v, False) for k, v in obj.items())
     params: Dict[str, Any] = {}
     parts = re.split(r"[,\n;]+", s)
     for part in parts:
         if not part.strip() or "=" not in part:
             continue
         k, v = part.split("=", 1)
-        k = k.strip()
-        v = v.strip().strip('"').strip("'")
-        if re.fullmatch(r"-?\d+", v):
-            val = int(v)
-        elif re.fullmatch(r"-?\d+\.\d*", v):
-            val = float(v)
-        elif v.lower() in ("true", "false"):
-            val = v.lower() == "true"
-        elif v.lower() in ("null", "none"):
-            val = None
-        else:
-            val = v
+        k, val = _bind_value(k, v, True)
         params[k] = val
     return params
+
+
+# 陣列 bind 展開成 :name_0, :name_1…；項目數補到固定級距（重複最後一個值，不影響 IN 的結果），
+# 長度不同的清單也能共用同一段 SQL
+_ARRAY_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1000)
+
+
+def expand_array_binds(
+    sql: str, params: Dict[str, Any], max_items: Optional[int] = 1000
+) -> Tuple[str, Dict[str, Any]]:
+
+    arrays = {k.lower(): k for k, v in params.items() if isinstance(v, (list, tuple))}
+    if not arrays:
+        return sql, params
+    binds = {k: v for k, v in params.items() if k.lower() not in arrays}
+    out: List[str] = []
+    last = 0
+    for m in _SQL_TOKEN_RE.finditer(sql):
+        text = m.group()
+        if m.lastgroup != "skip" or text[:1] != ":":
+            continue
+        key = arrays.get(text[1:].lower())
+        if key is None:
+            continue
+        values = list(params[key]) or [None]
+        if max_items and len(values) > max_items:
+            raise RuntimeError(f"陣列 bind {key} 超過 {max_items} 個項目")
+        size = next((b for b in _ARRAY_BUCKETS if b >= len(values)), len(values))
+        values += [values[-1]] * (size - len(values))
+        names = [f"{key}_{i}" for i in range(size)]
+        binds.update(zip(names, values))
+        out.append(sql[last : m.start()])
+        out.append(", ".join(f":{n}" for n in names))
+        last = m.end()
+    out.append(sql[last:])
+    return "".join(out), binds
@@ -0,0 +1,80 @@
+import paging
+
+
+def _desc(*cols):
+    # cursor.description 的前七欄；第七欄 False 表示 NOT NULL
+    return [(c, None, None, None, None, None, False) for c in cols]
+
+
+def test_keyset_plain_column():
+    sql = "SELECT id, name FROM t ORDER BY id DESC"
+    assert paging.keyset_order(sql, _desc("ID", "NAME")) == ((0, "ID", True),)
+
+
+def test_keyset_alias_and_position():
+    sql = "SELECT a.id, b.id AS bid FROM a JOIN b ON a.k = b.k ORDER BY bid, 1"
+    order = paging.keyset_order(sql, _desc("ID", "BID"))
+    assert order == ((1, "BID", False), (0, "ID", False))
+
+
+def test_keyset_rejects_qualified_sort_key():
+    # ORDER BY b.id 排的是第二欄，但以欄名比對會對到第一欄 ID
+    sql = "SELECT a.id, b.id AS bid FROM a JOIN b ON a.k = b.k ORDER BY b.id"
+    assert paging.keyset_order(sql, _desc("ID", "BID")) is None
+
+
+def test_keyset_matches_select_list_alias():
+    # ORDER BY 的名稱先對應到 SELECT 清單的別名；運算式裡出現同名欄位時無法確定
+    sql = "SELECT code AS id, name FROM t ORDER BY id"
+    assert paging.keyset_order(sql, _desc("ID", "NAME")) == ((0, "ID", False),)
+    sql = "SELECT code AS cid, id2 AS id FROM t ORDER BY id"
+    assert paging.keyset_order(sql, _desc("CID", "ID")) == ((1, "ID", False),)
+    sql = "SELECT x + id, id FROM t ORDER BY id"
+    assert paging.keyset_order(sql, _desc("X+ID", "ID")) is None
+
+
+def test_keyset_star_only_for_single_source():
+    sql = "SELECT * FROM t ORDER BY id"
+    assert paging.keyset_order(sql, _desc("ID", "NAME")) == ((0, "ID", False),)
+    sql = "SELECT a.*, b.name FROM a JOIN b ON a.k = b.k ORDER BY id"
+    assert paging.keyset_order(sql, _desc("ID", "K", "NAME")) is None
+
+
+def test_keyset_rejects_nullable_column():
+    sql = "SELECT id FROM t ORDER BY id"
+    desc = [("ID", None, None, None, None, None, True)]
+    assert paging.keyset_order(sql, desc) is None
+
+
+def _page(sql, desc, fetched, n):
+    # 模擬一次分頁查詢：fetched 為資料庫回傳的 n + 1 筆以內的列
+    page = {}
+    paging.begin(page)
+    rows = paging.take(page, fetched, n)
+    paging.track(page, sql, desc, rows)
+    paging.finish(page, n)
+    return page, rows
+
+
+def test_keyset_falls_back_when_tie_on_page_boundary():
+    # 第 3 列（本頁最後一列）與多抓的第 4 列排序值相同，頁內看不出重複
+    sql = "SELECT id, grp FROM t ORDER BY grp"
+    fetched = [(1, "a"), (2, "b"), (3, "c"), (4, "c")]
+    page, rows = _page(sql, _desc("ID", "GRP"), fetched, 3)
+    assert rows == fetched[:3]
+    assert page["mode"] == "offset"
+    assert page["fetched"] == 3 and not page["done"]
+
+
+def test_keyset_kept_when_boundary_differs():
+    sql = "SELECT id, grp FROM t ORDER BY grp"
+    fetched = [(1, "a"), (2, "b"), (3, "c"), (4, "d")]
+    page, _ = _page(sql, _desc("ID", "GRP"), fetched, 3)
+    assert page["mode"] == "keyset" and page["last"] == ("c",)
+    assert not page["done"] and "boundary" not in page
+
+
+def test_done_when_no_row_beyond_page():
+    sql = "SELECT id FROM t ORDER BY id"
+    page, rows = _page(sql, _desc("ID"), [(1,), (2,), (3,)], 3)
+    assert len(rows) == 3 and page["done"]
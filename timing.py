@@ -0,0 +1,45 @@
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+STAGES = ("connect", "execute", "fetch", "convert", "render", "total")
+
+
+def add(timings: Optional[Dict[str, Any]], name: str, seconds: float):
+    if timings is None:
+        return
+    key = f"{name}_ms"
+    timings[key] = timings.get(key, 0.0) + seconds * 1000
+
+
+@contextmanager
+def stage(timings: Optional[Dict[str, Any]], name: str):
+    if timings is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        add(timings, name, time.perf_counter() - t0)
+
+
+def rounded(timings: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        k: round(v, 1) if k.endswith("_ms") and isinstance(v, float) else v
+        for k, v in timings.items()
+    }
+
+
+def format_timings(timings: Optional[Dict[str, Any]]) -> str:
+    if not timings:
+        return ""
+    parts = [
+        f"{name} {timings[name + '_ms']:.0f}ms"
+        for name in STAGES
+        if name + "_ms" in timings
+    ]
+    for key in ("source", "url"):
+        if timings.get(key):
+            parts.append(f"{key}={timings[key]}")
+    return " · ".join(parts)
@@ -1,4 +1,4 @@
-import json, tkinter as tk
+import json, queue, threading, time, tkinter as tk
 from tkinter import ttk, messagebox, simpledialog, filedialog
 from datetime import datetime
 from settings import (
@@ -11,16 +11,35 @@ from settings import (
     API_VERIFY,
     API_CA,
     SQL_MAX_ROWS,
+    SQL_CALL_TIMEOUT,
     ORACLE_DSN,
     ORACLE2_DSN,
     DEFAULT_DB_ALIAS,
     FALLBACK_DB_ALIAS,
     augment_easy_connect_with_timeout,
 )
-from db_oracle import call_sql_by_sn, call_sql_raw, current_oracle_mode
+from db_oracle import (
+    call_sql_by_sn,
+    cancel_query,
+    current_oracle_mode,
+    iter_sql_raw,
+    raw_cache_key,
+    route_summary,
+)
+import paging
+from query_plan import (
+    PLAN_COLUMNS,
+    explain,
+    guard_enabled,
+    plan_lines,
+    plan_rows,
+    plan_warnings,
+)
+import result_cache
+from timing import add as add_timing, format_timings
 
 try:
-    from db_mysql import call_sql_raw_mysql
+    from db_mysql import cancel_query_mysql, iter_sql_raw_mysql, raw_cache_key_mysql
 
     _HAS_MYSQL = True
 except Exception:
@@ -35,7 +54,11 @@ class App(tk.Tk):
 
         self._last_columns = []
         self._last_rows = []
-        self._last_table_text = ""
+        self._tbl_offset = 0
+        self._tbl_slots = []
+        self._last_query = None
+        self._page = None
+        self._job = None
         self._build()
 
     def _build(self):
@@ -74,7 +97,18 @@ class App(tk.Tk):
             variable=self.mode,
             command=self._update_mode_ui,
         ).pack(side="left", padx=5)
-        ttk.Button(row2, text="查詢", command=self.on_query).pack(side="left", padx=10)
+        self.btn_query = ttk.Button(row2, text="查詢", command=self.on_query)
+        self.btn_query.pack(side="left", padx=10)
+        self.btn_plan = ttk.Button(row2, text="執行計畫", command=self.on_plan)
+        self.btn_plan.pack(side="left", padx=(0, 5))
+        self.btn_cancel = ttk.Button(
+            row2, text="取消", command=self.on_cancel, state="disabled"
+        )
+        self.btn_cancel.pack(side="left", padx=(0, 5))
+        self.btn_next = ttk.Button(
+            row2, text="下一頁", command=self.on_next_page, state="disabled"
+        )
+        self.btn_next.pack(side="left", padx=(0, 5))
         ttk.Button(row2, text="清空", command=self.on_clear).pack(side="left")
         ttk.Button(row2, text="複製結果", command=self.on_copy_table).pack(
             side="left", padx=5
@@ -82,12 +116,28 @@ class App(tk.Tk):
         ttk.Button(row2, text="匯出CSV", command=self.on_export_csv).pack(
             side="left", padx=5
         )
+        ttk.Button(row2, text="匯出Parquet", command=self.on_export_parquet).pack(
+            side="left", padx=5
+        )
         ttk.Label(row2, text="最大筆數").pack(side="left", padx=(20, 2))
         self.max_rows_var = tk.IntVar(value=SQL_MAX_ROWS)
         self.spin_max = ttk.Spinbox(
             row2, from_=10, to=100000, textvariable=self.max_rows_var, width=8
         )
         self.spin_max.pack(side="left")
+        ttk.Label(row2, text="逾時(秒)").pack(side="left", padx=(10, 2))
+        self.timeout_var = tk.IntVar(value=SQL_CALL_TIMEOUT)
+        ttk.Spinbox(
+            row2, from_=0, to=3600, textvariable=self.timeout_var, width=6
+        ).pack(side="left")
+        self.refresh_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(row2, text="強制重新查詢", variable=self.refresh_var).pack(
+            side="left", padx=(10, 0)
+        )
+        self.status_var = tk.StringVar(value="")
+        ttk.Label(row2, textvariable=self.status_var, foreground="gray").pack(
+            side="left", padx=10
+        )
 
         row3 = ttk.Frame(frm)
         row3.pack(fill="both", pady=(8, 5))
@@ -103,19 +153,22 @@ class App(tk.Tk):
         self.txt.tag_configure("summary", foreground="blue")
         self.txt.tag_configure("error", foreground="red")
         self.txt.tag_configure("hint", foreground="gray")
+        self.txt.tag_configure("warn", foreground="#c05000")
 
         tbl_wrap = ttk.Frame(frm)
         tbl_wrap.pack(fill="both", expand=True, pady=(0, 8))
         self.tbl = ttk.Treeview(tbl_wrap, columns=(), show="headings")
+        # 虛擬化表格：Treeview 只保留可見範圍的列，捲軸由 _on_tbl_yview 換算位移
         self.tbl_scroll_y = ttk.Scrollbar(
-            tbl_wrap, orient="vertical", command=self.tbl.yview
+            tbl_wrap, orient="vertical", command=self._on_tbl_yview
         )
         self.tbl_scroll_x = ttk.Scrollbar(
             tbl_wrap, orient="horizontal", command=self.tbl.xview
         )
-        self.tbl.configure(
-            yscrollcommand=self.tbl_scroll_y.set, xscrollcommand=self.tbl_scroll_x.set
-        )
+        self.tbl.configure(xscrollcommand=self.tbl_scroll_x.set)
+        self.tbl.bind("<Configure>", lambda e: self._render_table_window())
+        for seq in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tbl.bind(seq, self._on_tbl_wheel)
         self.tbl.pack(side="left", fill="both", expand=True)
         self.tbl_scroll_y.pack(side="right", fill="y")
         self.tbl_scroll_x.pack(side="bottom", fill="x")
@@ -140,6 +193,7 @@ class App(tk.Tk):
             f"verify={'CA:'+API_CA if API_CA else ('True' if API_VERIFY=='1' else 'False')} "
             f"sni_adapter={'on' if API_HOST_HEADER else 'off'}",
             f"[SQL] default={DEFAULT_DB_ALIAS}  fallback={FALLBACK_DB_ALIAS}  mode={mode}",
+            f"[SQL] route={route_summary()}",
             f"[SQL] primary_dsn={dsn_primary}",
             f"[SQL] vnap_dsn={dsn_vnap}",
             f"[SQL RAW] 僅允許 SELECT；優先使用 FETCH FIRST {self.max_rows_var.get()} ROWS ONLY；"
@@ -158,20 +212,82 @@ class App(tk.Tk):
         self.tbl["columns"] = ()
         for i in self.tbl.get_children(""):
             self.tbl.delete(i)
+        self._tbl_slots = []
+        self._tbl_offset = 0
+        self.tbl_scroll_y.set(0, 1)
 
-    def _set_table(self, columns, rows, *, max_col_chars=60):
+    def _tbl_visible_rows(self):
+        try:
+            rowh = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        except (TypeError, ValueError):
+            rowh = 20
+        return max(1, self.tbl.winfo_height() // rowh - 1)
+
+    def _render_table_window(self):
+        rows, cols = self._last_rows, self._last_columns
+        n = len(rows)
+        visible = self._tbl_visible_rows()
+        self._tbl_offset = max(0, min(self._tbl_offset, n - visible))
+        want = max(0, min(visible, n - self._tbl_offset))
+
+        while len(self._tbl_slots) < want:
+            self._tbl_slots.append(self.tbl.insert("", "end", values=()))
+        while len(self._tbl_slots) > want:
+            self.tbl.delete(self._tbl_slots.pop())
+        for i, iid in enumerate(self._tbl_slots):
+            r = rows[self._tbl_offset + i]
+            self.tbl.item(iid, values=[r.get(c, "") for c in cols])
+
+        if n:
+            self.tbl_scroll_y.set(self._tbl_offset / n, (self._tbl_offset + want) / n)
+        else:
+            self.tbl_scroll_y.set(0, 1)
+
+    def _on_tbl_yview(self, *args):
+        if not args:
+            return
+        n = len(self._last_rows)
+        if args[0] == "moveto":
+            self._tbl_offset = int(float(args[1]) * n)
+        elif args[0] == "scroll":
+            step = int(args[1])
+            if args[2] == "pages":
+                step *= max(1, self._tbl_visible_rows() - 1)
+            self._tbl_offset += step
+        self._render_table_window()
+
+    def _on_tbl_wheel(self, event):
+        if getattr(event, "num", None) == 4:
+            step = -3
+        elif getattr(event, "num", None) == 5:
+            step = 3
+        else:
+            step = -3 if event.delta > 0 else 3
+        self._tbl_offset += step
+        self._render_table_window()
+        return "break"
+
+    @staticmethod
+    def _width_sample(rows, size):
+        if len(rows) <= size:
+            return rows
+        half = size // 2
+        stride = max(1, (len(rows) - half) // half)
+        return rows[:half] + rows[half::stride][:half]
+
+    def _set_table(self, columns, rows, *, max_col_chars=60, width_sample=200):
 
-        for i in self.tbl.get_children(""):
-            self.tbl.delete(i)
+        self._clear_table()
         self.tbl["columns"] = columns or ()
 
         self._last_columns = list(columns or [])
         self._last_rows = list(rows or [])
 
+        sample = self._width_sample(self._last_rows, width_sample)
         widths = []
         for c in columns or ():
             max_len = len(str(c))
-            for r in rows or []:
+            for r in sample:
                 val = r.get(c, "")
                 if val is None:
                     val = ""
@@ -181,19 +297,25 @@ class App(tk.Tk):
             self.tbl.heading(c, text=str(c))
             self.tbl.column(c, width=widths[-1], anchor="w", stretch=True)
 
-        for r in rows or []:
-            vals = [r.get(c, "") for c in (columns or ())]
-            self.tbl.insert("", "end", values=vals)
+        self._render_table_window()
 
-        lines = []
-        if columns:
-            lines.append("\t".join(str(c) for c in columns))
-            for r in rows or []:
-                lines.append("\t".join(str(r.get(c, "")) for c in columns))
-        self._last_table_text = "\n".join(lines)
+    def _append_table(self, rows):
+        # 表格是虛擬化的，追加只需延長資料並重畫可見範圍；欄寬沿用第一頁
+        self._last_rows.extend(rows)
+        self._render_table_window()
+
+    def _table_tsv(self):
+        cols = self._last_columns
+        if not cols:
+            return ""
+        lines = ["\t".join(str(c) for c in cols)]
+        lines.extend(
+            "\t".join(str(r.get(c, "")) for c in cols) for r in self._last_rows
+        )
+        return "\n".join(lines)
 
     def on_copy_table(self):
-        text = getattr(self, "_last_table_text", "")
+        text = self._table_tsv()
         if not text:
 
             text = self.txt.get("1.0", "end").strip()
@@ -209,7 +331,13 @@ class App(tk.Tk):
         self._clear_table()
         self._last_columns = []
         self._last_rows = []
-        self._last_table_text = ""
+        self._page = None
+        self._update_next_btn()
+
+    def _update_next_btn(self):
+        page = self._page
+        ok = self._job is None and bool(page) and not page.get("done")
+        self.btn_next.configure(state="normal" if ok else "disabled")
 
     def on_export_csv(self):
         cols = getattr(self, "_last_columns", [])
@@ -236,12 +364,307 @@ class App(tk.Tk):
         except Exception as e:
             messagebox.showerror("錯誤", f"匯出失敗：{e}")
 
+    def on_export_parquet(self):
+        cols = getattr(self, "_last_columns", [])
+        rows = getattr(self, "_last_rows", [])
+        if not cols:
+            messagebox.showinfo("提示", "沒有可匯出的表格資料")
+            return
+        path = filedialog.asksaveasfilename(
+            title="匯出 Parquet",
+            defaultextension=".parquet",
+            filetypes=[("Parquet", "*.parquet"), ("All Files", "*.*")],
+        )
+        if not path:
+            return
+        try:
+            import arrow_export
+
+            q = self._last_query
+            # 載入過下一頁時，重新查詢的筆數涵蓋畫面上所有頁
+            n = max(q[2], len(rows)) if q else 0
+            # SQL 指令模式直接從游標重新取出具型別的欄位；其他模式匯出畫面上的資料
+            if q and q[0] == "sql_raw":
+                _, total = arrow_export.export_oracle(q[1], path, max_rows=n)
+            elif q and q[0] == "mysql_raw":
+                _, total = arrow_export.export_mysql(q[1], path, max_rows=n)
+            else:
+                _, total = arrow_export.export_rows(cols, rows, path)
+            messagebox.showinfo("提示", f"已匯出 Parquet（{total} 筆）")
+        except Exception as e:
+            messagebox.showerror("錯誤", f"匯出失敗：{e}")
+
+    def _start_job(self, kind, work, render):
+        handle = {"rows": 0}
+        job = {"kind": kind, "handle": handle, "queue": queue.Queue(), "render": render}
+
+        def run():
+            try:
+                job["queue"].put(("ok", work(handle)))
+            except Exception as e:
+                job["queue"].put(("error", e))
+
+        self._job = job
+        self.btn_query.configure(state="disabled")
+        self.btn_plan.configure(state="disabled")
+        self.btn_next.configure(state="disabled")
+        self.btn_cancel.configure(state="normal")
+        self.status_var.set("查詢中…")
+        threading.Thread(target=run, daemon=True).start()
+        self.after(100, self._poll_job)
+
+    def _poll_job(self):
+        job = self._job
+        if job is None:
+            return
+        try:
+            status, payload = job["queue"].get_nowait()
+        except queue.Empty:
+            self.status_var.set(f"查詢中… 已取得 {job['handle'].get('rows', 0)} 筆")
+            self.after(100, self._poll_job)
+            return
+
+        self._job = None
+        self.btn_query.configure(state="normal")
+        self.btn_plan.configure(state="normal")
+        self.btn_cancel.configure(state="disabled")
+        self.status_var.set("")
+        if status == "ok":
+            try:
+                job["render"](payload)
+            except Exception as e:
+                self.txt.insert("end", f"查詢失敗：{e}\n", "error")
+            if isinstance(payload, dict) and payload.get("partial"):
+                # 抓取途中取消：畫面上是已取得的部分結果，不是完整結果
+                self.txt.insert(
+                    "end", f"查詢已取消（已取得 {payload['rowcount']} 筆）\n", "error"
+                )
+        elif job["handle"].get("cancelled"):
+            self.txt.insert("end", "查詢已取消\n", "error")
+        else:
+            self.txt.insert("end", f"查詢失敗：{payload}\n", "error")
+        self._update_next_btn()
+
+    def on_cancel(self):
+        job = self._job
+        if job is None:
+            return
+        cancel = cancel_query_mysql if job["kind"] == "mysql_raw" else cancel_query
+        self.status_var.set("取消中…")
+        threading.Thread(target=cancel, args=(job["handle"],), daemon=True).start()
+
+    def _raw_work(self, iter_fn, key_fn, sql_raw, max_rows, page):
+        timeout = self.timeout_var.get()
+        refresh = self.refresh_var.get()
+        self.refresh_var.set(False)
+        # 只有第一頁走快取；下一頁以 page 記下的位置續查
+        first = not page.get("mode")
+
+        def work(handle):
+            t0 = time.perf_counter()
+            timings = {}
+            key = key_fn(sql_raw, max_rows=max_rows) if first else None
+            hit = None if refresh or not first else result_cache.get(key)
+            if hit is not None:
+                paging.resume(page, hit.get("page"), hit["rowcount"], max_rows)
+                add_timing(timings, "total", time.perf_counter() - t0)
+                return {**hit, "from_cache": True, "timings": timings}
+            cols, rows = [], []
+            for cols, batch in iter_fn(
+                sql_raw,
+                max_rows=max_rows,
+                handle=handle,
+                call_timeout=timeout,
+                timings=timings,
+                page=page,
+            ):
+                rows.extend(batch)
+                handle["rows"] = len(rows)
+                if handle.get("cancelled"):
+                    break
+            res = {"columns": cols, "rows": rows, "rowcount": len(rows)}
+            if handle.get("cancelled"):
+                page["done"] = True
+                res["partial"] = True
+            elif first:
+                result_cache.put(key, {**res, "page": dict(page)})
+            add_timing(timings, "total", time.perf_counter() - t0)
+            return {**res, "from_cache": False, "timings": timings}
+
+        return work
+
+    def _raw_fns(self, m):
+        if m == "mysql_raw":
+            return iter_sql_raw_mysql, raw_cache_key_mysql
+        return iter_sql_raw, raw_cache_key
+
+    def _render_raw(self, res):
+        timings = res.get("timings") or {}
+        t0 = time.perf_counter()
+        self._set_table(res.get("columns", []), res.get("rows", []))
+        add_timing(timings, "render", time.perf_counter() - t0)
+
+        partial = "（已取消，部分結果）" if res.get("partial") else ""
+        header = (
+            f"[ROWS] {res['rowcount']}{partial}  [COLUMNS] {', '.join(res['columns'])}"
+        )
+        if res.get("from_cache"):
+            st = result_cache.stats()
+            header += f"  [CACHE] 命中（hits={st['hits']} misses={st['misses']}）"
+        header += f"\n[TIME] {format_timings(timings)}"
+        self.txt.insert("end", header + "\n", "summary")
+
+    def _render_page(self, res):
+        timings = res.get("timings") or {}
+        t0 = time.perf_counter()
+        self._append_table(res.get("rows", []))
+        add_timing(timings, "render", time.perf_counter() - t0)
+
+        total = len(self._last_rows)
+        page = self._page or {}
+        more = "" if page.get("done") else "（還有下一頁）"
+        if res.get("partial"):
+            more = "（已取消，部分結果）"
+        self.txt.insert(
+            "end",
+            f"[PAGE] +{res['rowcount']} 筆，累計 {total} 筆{more}"
+            f"  mode={page.get('mode')}\n[TIME] {format_timings(timings)}\n",
+            "summary",
+        )
+
+    def on_next_page(self):
+        q, page = self._last_query, self._page
+        if self._job is not None or not q or not page or page.get("done"):
+            return
+        m, sql_raw, max_rows = q
+        iter_fn, key_fn = self._raw_fns(m)
+        self.txt.insert("end", f"載入下一頁（{max_rows} 筆）\n")
+        self._start_job(
+            m,
+            self._raw_work(iter_fn, key_fn, sql_raw, max_rows, page),
+            self._render_page,
+        )
+
+    def _plan_work(self, m, sql_raw, max_rows, quiet=False):
+        target = "mysql" if m == "mysql_raw" else "vnap"
+
+        def work(handle):
+            try:
+                plan = explain(sql_raw, target, max_rows)
+            except Exception as e:
+                # 執行前的檢查取不到計畫（例如沒有 PLAN_TABLE 權限）不擋查詢
+                if not quiet:
+                    raise
+                plan = {"error": str(e)}
+            if handle.get("cancelled"):
+                plan["cancelled"] = True
+            return plan
+
+        return work
+
+    def _render_plan(self, plan):
+        self._set_table(PLAN_COLUMNS, plan_rows(plan))
+        for text, warn in plan_lines(plan):
+            self.txt.insert("end", text + "\n", "warn" if warn else "summary")
+        for w in plan_warnings(plan):
+            self.txt.insert("end", f"[PLAN] {w}\n", "error")
+
+    def on_plan(self):
+        if self._job is not None:
+            return
+        m = self.mode.get()
+        sql_raw = self.txt_sql.get("1.0", "end").strip()
+        if m not in ("sql_raw", "mysql_raw") or not sql_raw:
+            messagebox.showinfo("提示", "請切換到 SQL 指令模式並輸入 SELECT")
+            return
+        if m == "mysql_raw" and not _HAS_MYSQL:
+            messagebox.showerror(
+                "錯誤",
+                "未找到 MySQL 支援，請安裝 mysql-connector-python 或 PyMySQL。",
+            )
+            return
+        self.on_clear()
+        self._last_query = None
+        self.txt.insert("end", "取得執行計畫中\n\n")
+        self._start_job(
+            m, self._plan_work(m, sql_raw, self.max_rows_var.get()), self._render_plan
+        )
+
+    def _start_raw(self, m, sql_raw):
+        max_rows = self._last_query[2]
+        work = self._raw_work(*self._raw_fns(m), sql_raw, max_rows, self._page)
+
+        def run():
+            self._start_job(m, work, self._render_raw)
+
+        if not guard_enabled():
+            run()
+            return
+        # 設定了成本／筆數門檻：先 EXPLAIN，超過門檻要確認才真正執行
+        self._start_job(
+            m,
+            self._plan_work(m, sql_raw, max_rows, quiet=True),
+            lambda plan: self._confirm_plan(plan, run),
+        )
+
+    def _confirm_plan(self, plan, run):
+        if plan.get("cancelled"):
+            self.txt.insert("end", "查詢已取消\n", "error")
+            self._page = None
+            return
+        if plan.get("error"):
+            self.txt.insert(
+                "end", f"[PLAN] 無法取得執行計畫，直接執行：{plan['error']}\n", "hint"
+            )
+            run()
+            return
+        warnings = plan_warnings(plan)
+        if warnings:
+            for text, warn in plan_lines(plan):
+                self.txt.insert("end", text + "\n", "warn" if warn else "hint")
+            if not messagebox.askyesno(
+                "確認執行", "\n".join(warnings) + "\n\n確定要執行這個查詢？"
+            ):
+                self.txt.insert("end", "已取消執行\n", "error")
+                self._page = None
+                return
+        run()
+
+    def _render_sn(self, sn, row, timings=None):
+        if row:
+            model, shipping_sn, data1 = row
+            out = {
+                "MODEL_NAME": model,
+                "SHIPPING_SN": shipping_sn,
+                "DATA1": data1,
+                "queried_at": datetime.now().isoformat(timespec="seconds"),
+            }
+
+            self._set_table(["MODEL_NAME", "SHIPPING_SN", "DATA1"], [out])
+
+            self.txt.insert(
+                "end",
+                "[ROWS] 1  [COLUMNS] MODEL_NAME, SHIPPING_SN, DATA1\n"
+                f"[TIME] {format_timings(timings)}\n",
+                "summary",
+            )
+        else:
+            self.txt.insert("end", f"查無此 SN：{sn}\n", "error")
+
     def on_query(self):
+        if self._job is not None:
+            return
         m = self.mode.get()
         sn = self.sn_var.get().strip().strip("{}")
         sql_raw = self.txt_sql.get("1.0", "end").strip()
         self.on_clear()
         self._insert_hint_header()
+        self._last_query = (
+            (m, sql_raw, self.max_rows_var.get())
+            if m in ("sql_raw", "mysql_raw")
+            else None
+        )
+        self._page = {} if self._last_query else None
 
         if m == "mysql_raw":
             if not sql_raw:
@@ -254,53 +677,26 @@ class App(tk.Tk):
                 )
                 return
             self.txt.insert("end", "查詢中（MySQL）\n\n")
-            res = call_sql_raw_mysql(sql_raw, max_rows=self.max_rows_var.get())
-            header = (
-                f"[ROWS] {res['rowcount']}  [COLUMNS] {', '.join(res['columns'])}\n"
-            )
-            self.txt.insert("end", header, "summary")
-            self._set_table(res.get("columns", []), res.get("rows", []))
+            self._start_raw(m, sql_raw)
             return
 
-        try:
-            if m == "sql_sn":
-                if not sn:
-                    messagebox.showinfo("提示", "請輸入 SN")
-                    return
-                self.txt.insert("end", f"查詢中（SQL by SN）：{sn}\n\n")
-                row = call_sql_by_sn(sn)
-                if row:
-                    model, shipping_sn, data1 = row
-                    out = {
-                        "MODEL_NAME": model,
-                        "SHIPPING_SN": shipping_sn,
-                        "DATA1": data1,
-                        "queried_at": datetime.now().isoformat(timespec="seconds"),
-                    }
-
-                    self._set_table(["MODEL_NAME", "SHIPPING_SN", "DATA1"], [out])
-
-                    self.txt.insert(
-                        "end",
-                        "[ROWS] 1  [COLUMNS] MODEL_NAME, SHIPPING_SN, DATA1\n",
-                        "summary",
-                    )
-                else:
-                    self.txt.insert("end", f"查無此 SN：{sn}\n", "error")
-            else:
-                if not sql_raw:
-                    messagebox.showinfo("提示", "請輸入 SQL 指令（限 SELECT）")
-                    return
-                self.txt.insert("end", "查詢中（SQL 指令）\n\n")
-                res = call_sql_raw(sql_raw, max_rows=self.max_rows_var.get())
-                header = (
-                    f"[ROWS] {res['rowcount']}  [COLUMNS] {', '.join(res['columns'])}\n"
-                )
-                self.txt.insert("end", header, "summary")
-
-                self._set_table(res.get("columns", []), res.get("rows", []))
-        except Exception as e:
-            self.txt.insert("end", f"查詢失敗：{e}\n", "error")
+        if m == "sql_sn":
+            if not sn:
+                messagebox.showinfo("提示", "請輸入 SN")
+                return
+            self.txt.insert("end", f"查詢中（SQL by SN）：{sn}\n\n")
+            timings = {}
+            self._start_job(
+                m,
+                lambda h: call_sql_by_sn(sn, timings=timings),
+                lambda row: self._render_sn(sn, row, timings),
+            )
+        else:
+            if not sql_raw:
+                messagebox.showinfo("提示", "請輸入 SQL 指令（限 SELECT）")
+                return
+            self.txt.insert("end", "查詢中（SQL 指令）\n\n")
+            self._start_raw(m, sql_raw)
 
 
 def require_login(